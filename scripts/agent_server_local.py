@@ -0,0 +1,143 @@
+"""
+Runs the ASGI agent server (services/agent_lambda/asgi.py) under uvicorn
+against local fakes: fake Bedrock and S3 Vectors plus the stub search APIs,
+so nothing touches AWS, SerpAPI or Tavily.
+
+    python scripts/agent_server_local.py --port 8080             # serve until Ctrl-C
+    python scripts/agent_server_local.py --load 200 --concurrency 64
+
+With --load N it fires N /chat requests at --concurrency (a --repeat share of
+them re-asking earlier questions), then prints throughput, client-side
+latency percentiles, status counts, Bedrock call counts and the server's
+/metrics as JSON, and exits.
+
+uvicorn and httpx are needed locally; uvicorn is not part of the Lambda image.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+TOPICS = ["machine learning", "data engineering", "cloud security", "NLP", "computer vision",
+          "distributed systems", "product analytics", "MLOps", "robotics", "bioinformatics"]
+ROLES = ["engineer", "analyst", "researcher", "scientist", "architect"]
+
+
+def make_questions(n: int, repeat: float, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        if out and rng.random() < repeat:
+            out.append(rng.choice(out))
+        else:
+            out.append(f"Which UTD courses prepare me for a {rng.choice(TOPICS)} "
+                       f"{rng.choice(ROLES)} role in Dallas? (#{i})")
+    return out
+
+
+def _pct(samples: list, p: float) -> float:
+    if not samples:
+        return 0.0
+    s = sorted(samples)
+    return round(1000 * s[min(len(s) - 1, int(p * len(s)))], 1)
+
+
+async def load(base: str, questions: list, concurrency: int) -> dict:
+    import httpx
+
+    sem = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async with httpx.AsyncClient(base_url=base, timeout=120,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def one(q):
+            async with sem:
+                t0 = time.perf_counter()
+                r = await client.post("/chat", json={"question": q})
+                latencies.append(time.perf_counter() - t0)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(q) for q in questions))
+        wall = time.perf_counter() - t0
+        server_metrics = (await client.get("/metrics")).json()
+
+    return {
+        "requests": len(questions),
+        "distinct_questions": len(set(questions)),
+        "concurrency": concurrency,
+        "wall_sec": round(wall, 3),
+        "throughput_rps": round(len(questions) / wall, 1),
+        "latency_ms": {"p50": _pct(latencies, 0.50), "p95": _pct(latencies, 0.95), "p99": _pct(latencies, 0.99)},
+        "status": statuses,
+        "metrics": server_metrics,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=0, help="0 = any free port")
+    ap.add_argument("--load", type=int, default=0, help="requests to fire; 0 = just serve")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--repeat", type=float, default=0.2, help="share of requests repeating a question")
+    ap.add_argument("--embed-window-ms", type=float, default=5.0, help="EMBED_BATCH_WINDOW_MS; 0 disables")
+    ap.add_argument("--max-concurrency", type=int, default=0, help="SERVER_MAX_CONCURRENCY override")
+    ap.add_argument("--max-queue", type=int, default=-1, help="SERVER_MAX_QUEUE override")
+    ap.add_argument("--model-latency-ms", type=float, default=60)
+    ap.add_argument("--token-ms", type=float, default=0)
+    ap.add_argument("--tool-latency-ms", type=float, default=150)
+    args = ap.parse_args()
+
+    # must be set before rag / asgi read their config at import
+    os.environ["EMBED_BATCH_WINDOW_MS"] = str(args.embed_window_ms)
+    if args.max_concurrency:
+        os.environ["SERVER_MAX_CONCURRENCY"] = str(args.max_concurrency)
+    if args.max_queue >= 0:
+        os.environ["SERVER_MAX_QUEUE"] = str(args.max_queue)
+
+    from stream_harness import setup
+
+    stub = setup(args)
+    import rag.s3_vector as rag
+    import uvicorn
+    import asgi
+
+    config = uvicorn.Config(asgi.application, host="127.0.0.1", port=args.port,
+                            log_level="warning", lifespan="on", backlog=4096)
+    server = uvicorn.Server(config)
+
+    if not args.load:
+        print(f"agent ASGI server with local fakes on :{args.port or 'auto'}")
+        try:
+            server.run()
+        finally:
+            stub.shutdown()
+        return
+
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.02)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    report = asyncio.run(load(f"http://127.0.0.1:{port}", make_questions(args.load, args.repeat),
+                              args.concurrency))
+    report["embed_window_ms"] = args.embed_window_ms
+    report["bedrock_calls"] = dict(rag.embedder.client.calls)
+    print(json.dumps(report, indent=2))
+
+    server.should_exit = True
+    thread.join(timeout=10)
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark the shared streaming chunker against the ingest lambda's original
+char-based _chunk_text on a synthetic multi-MB catalog dump. Time is the
+best of --repeat runs. Peak memory is what the chunker allocates on top of
+the input; the streamed run only ever holds one 1 MiB piece, so its peak stays
+flat while the others grow with the dump.
+
+    python scripts/bench_chunking.py --mb 64
+    python scripts/bench_chunking.py --file all_2025-01-01T00-00-00Z.md
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "shared"))
+
+from agent_core.chunking import iter_chunks  # noqa: E402
+
+
+def legacy_chunk_text(text: str, max_chars: int, overlap_chars: int):
+    """
+    The ingest lambda's original implementation, kept here as the baseline.
+    """
+    text = text.replace("\r\n", "\n")
+    chunks = []
+    n = len(text)
+    start = 0
+    while start < n:
+        end = min(n, start + max_chars)
+        if end < n:
+            back = text.rfind("\n", start, end)
+            if back != -1 and back > start + int(max_chars * 0.6):
+                end = back
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= n:
+            break
+        start = max(0, end - overlap_chars)
+    return chunks
+
+
+def synthetic_catalog(target_bytes: int, seed: int = 7) -> str:
+    rnd = random.Random(seed)
+    words = ("data", "machine", "learning", "systems", "analysis", "design", "theory",
+             "students", "project", "statistical", "methods", "applications", "prerequisite")
+    subjects = ("CS", "BUAN", "MIS", "SE", "STAT", "EE", "ACCT", "FIN")
+    parts, size, n = [], 0, 0
+    while size < target_bytes:
+        subj = rnd.choice(subjects)
+        num = 5000 + n % 2000
+        page = [f"\n\n### SOURCE: https://catalog.utdallas.edu/2025/graduate/courses/{subj.lower()}{num}\n",
+                f"#### {subj} {num} - Course {n}\n\n"]
+        for _ in range(rnd.randint(2, 6)):
+            page.append(" ".join(rnd.choice(words) for _ in range(rnd.randint(30, 120))) + "\n\n")
+        page.append("\n---\n")
+        block = "".join(page)
+        parts.append(block)
+        size += len(block)
+        n += 1
+    return "".join(parts)
+
+
+def stream(text: str, piece: int):
+    for i in range(0, len(text), piece):
+        yield text[i : i + piece]
+
+
+def measure(label, fn, repeat: int):
+    # time and memory in separate passes: tracemalloc distorts timings
+    secs = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        n = fn()
+        secs = min(secs, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"impl": label, "chunks": n, "seconds": round(secs, 3), "peak_mb": round(peak / 2**20, 2)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", type=float, default=32.0)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--file", default="")
+    ap.add_argument("--max-chars", type=int, default=3500)
+    ap.add_argument("--overlap-chars", type=int, default=300)
+    args = ap.parse_args()
+
+    text = Path(args.file).read_text(encoding="utf-8") if args.file else synthetic_catalog(int(args.mb * 2**20))
+    mb = len(text.encode("utf-8")) / 2**20
+    max_tokens, overlap_tokens = args.max_chars // 4, args.overlap_chars // 4
+
+    results = [
+        measure("legacy_chunk_text", lambda: len(legacy_chunk_text(text, args.max_chars, args.overlap_chars)),
+                args.repeat),
+        measure("iter_chunks(whole)", lambda: sum(1 for _ in iter_chunks([text], max_tokens, overlap_tokens)),
+                args.repeat),
+        # 1 MiB pieces, as a ranged S3 reader would deliver them
+        measure("iter_chunks(stream)",
+                lambda: sum(1 for _ in iter_chunks(stream(text, 2**20), max_tokens, overlap_tokens)), args.repeat),
+    ]
+    for r in results:
+        r["mb_per_sec"] = round(mb / r["seconds"], 2) if r["seconds"] else None
+        print(json.dumps({"input_mb": round(mb, 2), **r}))
+
+
+if __name__ == "__main__":
+    main()
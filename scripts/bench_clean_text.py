@@ -0,0 +1,87 @@
+"""
+Microbenchmark: the legacy clean_text (five regex passes plus split/join,
+strips all punctuation) against the single-pass markdown cleaner, on
+html2text-style catalog pages with links, nav lists, stray tags and
+whitespace noise. Runs both over the whole dump and page by page, and
+checks which one keeps the "### SOURCE:" headers the chunker splits on.
+
+    python scripts/bench_clean_text.py --mb 8 --repeat 3
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "services" / "scraper_lambda" / "src"))
+
+from helper.clean_data import clean_markdown, clean_text  # noqa: E402
+
+WORDS = ("data", "machine", "learning", "systems", "analysis", "design", "theory", "students",
+         "project", "statistical", "methods", "applications", "prerequisite", "semester", "credit")
+
+
+def synthetic_page(rnd: random.Random, n: int) -> str:
+    subj = rnd.choice(("cs", "buan", "mis", "se", "stat"))
+    num = 5000 + n % 2000
+    url = f"https://catalog.utdallas.edu/2025/graduate/courses/{subj}{num}"
+    lines = [f"\n\n### SOURCE: {url}\n", f"#### {subj.upper()} {num} - Course {n}  \n\n"]
+    lines += [f"  * [Program {i}](https://catalog.utdallas.edu/2025/graduate/programs/p{i} \"Program {i}\")\n"
+              for i in range(rnd.randint(10, 30))]
+    lines.append("\n\n\n")
+    for _ in range(rnd.randint(2, 6)):
+        body = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(30, 120)))
+        lines.append(f"**{subj.upper()} {num}**\xa0{body}   see {url}#details <span>(3-0)</span>  \n\n\n")
+    lines.append(f"Prerequisite: [{subj.upper()} {num - 1}]({url[:-4]}{num - 1}) or consent.\u200b\n")
+    lines.append("\n---\n")
+    return "".join(lines)
+
+
+def corpus(target_bytes: int) -> list:
+    rnd = random.Random(7)
+    pages, size = [], 0
+    while size < target_bytes:
+        p = synthetic_page(rnd, len(pages))
+        pages.append(p)
+        size += len(p)
+    return pages
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", type=float, default=8)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    pages = corpus(int(args.mb * 1024 * 1024))
+    whole = "".join(pages)
+    mb = len(whole.encode("utf-8")) / 1024 / 1024
+
+    report = {"mb": round(mb, 2), "pages": len(pages)}
+    for name, fn in (("legacy_clean_text", clean_text), ("clean_markdown", clean_markdown)):
+        t_whole = best_of(args.repeat, lambda: fn(whole))
+        t_pages = best_of(args.repeat, lambda: [fn(p) for p in pages])
+        out = fn(whole)
+        report[name] = {
+            "whole_sec": round(t_whole, 3),
+            "whole_mb_per_sec": round(mb / t_whole, 1),
+            "per_page_sec": round(t_pages, 3),
+            "output_mb": round(len(out.encode("utf-8")) / 1024 / 1024, 2),
+            "source_headers_kept": out.count("### SOURCE:"),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Cold-start benchmark for the agent Lambda, meant to be tracked in CI.
+
+Each run is a fresh interpreter. The interpreter runs `python -X importtime
+-c "import app"` for the import profile, then a handler harness that times:
+
+- `import app`;
+- a rejected request (no question);
+- the first real invocation, which compiles the graph;
+- a warm second invocation;
+- what boto3 adds once a real client is needed.
+
+The harness uses fake Bedrock / S3 Vectors and the stub search API, so no AWS
+calls or credentials are involved. The module prints medians over --runs as
+JSON. With --max-import-ms / --max-first-invoke-ms it exits 1 when a median
+is over budget.
+
+    python scripts/bench_cold_start.py --runs 5
+    python scripts/bench_cold_start.py --preload graph      # AGENT_PRELOAD=graph
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+AGENT = ROOT / "services" / "agent_lambda"
+WATCH = ("langgraph", "langchain_core", "boto3", "botocore", "requests", "numpy")
+
+
+def _env(preload: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": os.pathsep.join([str(AGENT), str(ROOT / "shared"), str(ROOT / "scripts")]),
+        "AWS_DEFAULT_REGION": env.get("AWS_DEFAULT_REGION", "us-east-1"),
+        "AGENT_PRELOAD": preload,
+        "S3V_INDEX_ARN": "arn:aws:s3vectors:local:000000000000:bucket/fake/index/fake",
+        "SERPAPI_KEY": "stub",
+        "TAVILY_API_KEY": "stub",
+    })
+    return env
+
+
+def import_profile(env: dict) -> dict:
+    """
+    Parse -X importtime: total for `app`, and cumulative time for the
+    heavy packages (absent = not imported at all).
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=AGENT, env=env,
+                          capture_output=True, text=True, check=True)
+    total, packages, self_times = 0, {}, []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        name, cum_ms = name.strip(), int(cum_us) / 1000
+        self_times.append((int(self_us) / 1000, name))
+        if name == "app":
+            total = cum_ms
+        if name in WATCH:
+            packages[name] = round(cum_ms, 1)
+    top = sorted(self_times, reverse=True)[:8]
+    return {"import_app_ms": round(total, 1), "packages_ms": packages,
+            "top_self_ms": {n: round(t, 1) for t, n in top}}
+
+
+def _child(latency_ms: float):
+    # fresh interpreter: everything below is the cold path
+    t0 = time.perf_counter()
+    import app
+    t_import = time.perf_counter() - t0
+
+    from fakes import FakeBedrock, FakeS3Vectors, fake_embedding
+    from stub_search_api import start_stub
+    import rag.s3_vector as rag
+    from agent_core import aws
+    from agent_core.embedding_client import EmbeddingClient
+    from agent_core.vector_store import S3VectorsStore
+
+    stub, base, _ = start_stub(0, latency_ms)
+    import tools.serpapi_jobs as jobs
+    import tools.tavily_search as web
+    jobs.SERPAPI_ENDPOINT = f"{base}/search.json"
+    web.TAVILY_SEARCH_ENDPOINT = f"{base}/search"
+
+    bedrock = FakeBedrock(latency_ms=latency_ms)
+    vectors = FakeS3Vectors(latency_ms=latency_ms)
+    vectors.put_vectors(vectors=[{"key": "doc:0", "data": {"float32": fake_embedding("CS 6375 Machine Learning")},
+                                  "metadata": {"text": "CS 6375 Machine Learning"}}])
+    aws.set_client("bedrock-runtime", bedrock)
+    rag.embedder = EmbeddingClient(client=bedrock)
+    rag.vector_store = S3VectorsStore(client=vectors, index_arn=os.environ["S3V_INDEX_ARN"])
+
+    def call(question):
+        t = time.perf_counter()
+        resp = app.lambda_handler({"body": json.dumps({"question": question})}, None)
+        return time.perf_counter() - t, resp["statusCode"]
+
+    t_bad, _ = call("")
+    t_first, status = call("Which courses fit an ML career?")
+    t_warm, _ = call("Which courses help with data engineering jobs?")
+
+    t = time.perf_counter()
+    aws.get_client("s3")
+    t_boto = time.perf_counter() - t
+    stub.shutdown()
+    print(json.dumps({
+        "import_ms": 1000 * t_import, "bad_request_ms": 1000 * t_bad,
+        "first_invoke_ms": 1000 * t_first, "warm_invoke_ms": 1000 * t_warm,
+        "first_boto3_client_ms": 1000 * t_boto, "status": status,
+    }))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--preload", default="", help="AGENT_PRELOAD value, e.g. graph or graph,context")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="fake Bedrock / search latency")
+    ap.add_argument("--max-import-ms", type=float, default=0.0)
+    ap.add_argument("--max-first-invoke-ms", type=float, default=0.0)
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        _child(args.latency_ms)
+        return
+
+    env = _env(args.preload)
+    profiles, runs = [], []
+    for _ in range(args.runs):
+        profiles.append(import_profile(env))
+        proc = subprocess.run([sys.executable, __file__, "--child", "--latency-ms", str(args.latency_ms)],
+                              cwd=AGENT, env=env, capture_output=True, text=True)
+        if proc.returncode:
+            sys.stderr.write(proc.stderr)
+            sys.exit(proc.returncode)
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    def med(values):
+        return round(statistics.median(values), 1)
+
+    report = {
+        "runs": args.runs,
+        "preload": args.preload or None,
+        "python": sys.version.split()[0],
+        "importtime": {
+            "import_app_ms": med([p["import_app_ms"] for p in profiles]),
+            "packages_ms": profiles[-1]["packages_ms"],
+            "top_self_ms": profiles[-1]["top_self_ms"],
+        },
+        "handler": {k: med([r[k] for r in runs]) for k in runs[0] if k.endswith("_ms")},
+    }
+    print(json.dumps(report, indent=2))
+
+    over = []
+    if args.max_import_ms and report["handler"]["import_ms"] > args.max_import_ms:
+        over.append(f"import {report['handler']['import_ms']}ms > {args.max_import_ms}ms")
+    if args.max_first_invoke_ms and report["handler"]["first_invoke_ms"] > args.max_first_invoke_ms:
+        over.append(f"first invoke {report['handler']['first_invoke_ms']}ms > {args.max_first_invoke_ms}ms")
+    if over:
+        print("FAIL: " + "; ".join(over), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
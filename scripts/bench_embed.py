@@ -0,0 +1,45 @@
+"""
+Throughput benchmark for the shared embedding client's batch path (used by
+ingest) against a fake Bedrock client.
+
+    python scripts/bench_embed.py --chunks 400 --latency-ms 60 --throttle-above 6
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "shared"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from agent_core.embedding_client import EmbeddingClient  # noqa: E402
+from fakes import FakeBedrock  # noqa: E402
+
+
+def run(label: str, client, texts, concurrency: int) -> dict:
+    embedder = EmbeddingClient("fake-titan", client=client, concurrency=concurrency, backoff_base=0.02)
+    vecs = embedder.embed_batch(texts)
+    assert len(vecs) == len(texts)
+    out = {"mode": label, "concurrency": concurrency, **embedder.stats.as_dict()}
+    print(json.dumps(out))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=200)
+    ap.add_argument("--latency-ms", type=float, default=50)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--throttle-above", type=int, default=0)
+    args = ap.parse_args()
+
+    texts = [f"chunk {i} " + "x" * (i % 50) for i in range(args.chunks)]
+    client = FakeBedrock(args.latency_ms, throttle_above=args.throttle_above)
+
+    serial = run("serial", client, texts, 1)
+    pooled = run("pooled", client, texts, args.concurrency)
+    print(json.dumps({"speedup": round(pooled["texts_per_sec"] / serial["texts_per_sec"], 2)}))
+
+
+if __name__ == "__main__":
+    main()
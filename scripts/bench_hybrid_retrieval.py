@@ -0,0 +1,195 @@
+"""
+Vector-only vs hybrid (BM25 + vector, reciprocal rank fusion) retrieval on a
+synthetic catalog and a fixed question set: course-code questions written the
+ways students type them ("CS 6375", "cs6375", "BUAN-6341") plus topical ones.
+Vectors live in a LocalVectorStore and lexical segments in a
+LocalLexicalStore, both built the way ingest builds them, and queries go
+through rag.s3_vector's own _query_chunks / _hybrid_chunks.
+
+The embedding is the hashed bag of words from fakes.py with numbers removed,
+standing in for an embedding model that has no real notion of course codes
+(the failure mode this index exists for). Reports recall@TOP_K (the target
+course's page among the returned chunks), per-query latency, and lexical
+snapshot size plus cold-load time.
+
+    python scripts/bench_hybrid_retrieval.py --courses 600
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "shared"))
+sys.path.insert(0, str(ROOT / "services" / "agent_lambda"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from fakes import fake_embedding  # noqa: E402
+
+SUBJECTS = ("CS", "BUAN", "MIS", "SE", "STAT", "ACCT", "FIN", "EE")
+TOPICS = {
+    "machine learning": "supervised models classification regression neural networks training",
+    "natural language processing": "text parsing language models tokens sentiment translation",
+    "database systems": "relational queries transactions indexing storage sql",
+    "big data": "distributed processing spark hadoop clusters streaming pipelines",
+    "computer networks": "routing protocols packets tcp congestion wireless",
+    "operating systems": "processes scheduling memory paging file systems kernels",
+    "software testing": "verification unit tests coverage defects quality assurance",
+    "statistical inference": "estimation hypothesis tests confidence intervals likelihood",
+    "financial accounting": "ledgers statements reporting audits balance sheets",
+    "corporate finance": "valuation capital budgeting risk portfolio markets",
+    "signal processing": "filters fourier sampling spectra transforms",
+    "business analytics": "dashboards forecasting optimization decision models data",
+}
+FILLER = "students graduate course semester credit hours project lectures assignments exams instructor"
+
+
+def semantic_embedding(text: str) -> list:
+    return fake_embedding(re.sub(r"\d+", " ", text))
+
+
+def make_catalog(n: int, seed: int = 3):
+    rnd = random.Random(seed)
+    topics = list(TOPICS)
+    courses = []
+    for i in range(n):
+        subj = SUBJECTS[i % len(SUBJECTS)]
+        num = 5000 + (i * 37) % 2000 + (i // 2000)
+        topic = topics[rnd.randrange(len(topics))]
+        courses.append({"code": f"{subj} {num}", "topic": topic, "level": rnd.choice(("Foundations of", "Advanced", "Topics in"))})
+    seen, out = set(), []
+    for c in courses:
+        if c["code"] not in seen:
+            seen.add(c["code"])
+            out.append(c)
+    return out
+
+
+def page(c, rnd: random.Random) -> str:
+    subj, num = c["code"].split()
+    url = f"https://catalog.utdallas.edu/2025/graduate/courses/{subj.lower()}{num}"
+    body = " ".join(rnd.choice((TOPICS[c["topic"]] + " " + FILLER).split()) for _ in range(rnd.randint(60, 160)))
+    return (f"### SOURCE: {url}\n#### {c['code']} - {c['level']} {c['topic'].title()}\n\n"
+            f"{c['code']} {c['level']} {c['topic']} (3 semester credit hours) {body}\n"
+            f"Prerequisite: {subj} {int(num) - 1} or instructor consent.\n")
+
+
+def questions(courses, n_code: int, n_topic: int, seed: int = 11):
+    rnd = random.Random(seed)
+    forms = ("What are the prerequisites for {s} {n}?", "Tell me about {l}{n}", "Is {s}-{n} useful for a data career?",
+             "how many credits is {l} {n}", "{s}{n} workload and topics?")
+    qs = []
+    for c in rnd.sample(courses, n_code):
+        s, n = c["code"].split()
+        qs.append({"q": rnd.choice(forms).format(s=s, n=n, l=s.lower()), "targets": {c["code"]}, "kind": "code"})
+    by_topic = {}
+    for c in courses:
+        by_topic.setdefault(c["topic"], set()).add(c["code"])
+    for topic in rnd.sample(list(TOPICS), min(n_topic, len(TOPICS))):
+        qs.append({"q": f"Which courses cover {topic}?", "targets": by_topic[topic], "kind": "topic"})
+    return qs
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--courses", type=int, default=600)
+    ap.add_argument("--code-questions", type=int, default=60)
+    ap.add_argument("--topic-questions", type=int, default=10)
+    ap.add_argument("--top-k", type=int, default=6)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ.update({
+        "AWS_DEFAULT_REGION": os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
+        "VECTOR_STORE_BACKEND": "local",
+        "LOCAL_VECTOR_PATH": os.path.join(tmp, "vectors"),
+        "LEXICAL_BACKEND": "local",
+        "LEXICAL_PATH": os.path.join(tmp, "lexical"),
+        "TOP_K": str(args.top_k),
+    })
+
+    import rag.s3_vector as rag
+    from agent_core.chunking import iter_chunks
+    from agent_core.lexical import LexicalIndex, build_segment, load_lexical_index, segment_entry, segment_name
+    from agent_core.vector_store import LocalVectorStore
+
+    courses = make_catalog(args.courses)
+    rnd = random.Random(5)
+    store = LocalVectorStore(os.environ["LOCAL_VECTOR_PATH"])
+    t0 = time.perf_counter()
+    for c in courses:
+        doc_id = c["code"].replace(" ", "").lower()
+        entries, vectors = [], []
+        for i, chunk in enumerate(iter_chunks([page(c, rnd)], 800, 60)):
+            vkey = f"{doc_id}:{i}"
+            entries.append(segment_entry(vkey, chunk.text))
+            vectors.append({"key": vkey, "data": {"float32": semantic_embedding(chunk.text)},
+                            "metadata": {**chunk.metadata, "text": chunk.text[:1000]}})
+        store.put(vectors)
+        rag.lexical_store.put_segment(segment_name(doc_id), build_segment(doc_id, doc_id, entries))
+    build_sec = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    index = load_lexical_index(rag.lexical_store, write_back=True)
+    rebuild_sec = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    index = load_lexical_index(rag.lexical_store)
+    snapshot_load_sec = time.perf_counter() - t0
+    raw, _ = rag.lexical_store.get_snapshot()
+    t0 = time.perf_counter()
+    LexicalIndex.from_bytes(raw)
+    decode_sec = time.perf_counter() - t0
+
+    rag.vector_store = LocalVectorStore(os.environ["LOCAL_VECTOR_PATH"], read_only=True)
+    qs = questions(courses, args.code_questions, args.topic_questions)
+    qvecs = [semantic_embedding(q["q"]) for q in qs]
+
+    def score(fn):
+        lat, hit = {"code": [], "topic": []}, {"code": [], "topic": []}
+        for q, qv in zip(qs, qvecs):
+            t0 = time.perf_counter()
+            chunks = fn(q, qv)
+            lat[q["kind"]].append(time.perf_counter() - t0)
+            # the chunker moves the "####" heading into metadata; the body
+            # starts with the course code
+            got = {m.group(1) for m in (re.match(r"([A-Z]+ \d{4}) ", txt or "") for txt in chunks) if m}
+            # code questions: the course itself; topic questions: share of
+            # returned slots filled by courses on that topic
+            if q["kind"] == "code":
+                hit["code"].append(1.0 if q["targets"] & got else 0.0)
+            else:
+                hit["topic"].append(len(q["targets"] & got) / max(1, min(args.top_k, len(q["targets"]))))
+        out = {}
+        for kind in ("code", "topic"):
+            if lat[kind]:
+                ms = sorted(1000 * x for x in lat[kind])
+                out[kind] = {f"recall@{args.top_k}": round(sum(hit[kind]) / len(hit[kind]), 3),
+                             "p50_ms": round(ms[len(ms) // 2], 2), "p95_ms": round(ms[int(0.95 * (len(ms) - 1))], 2)}
+        return out
+
+    report = {
+        "courses": len(courses),
+        "chunks": len(index),
+        "questions": len(qs),
+        "build_sec": round(build_sec, 2),
+        "lexical": {
+            "terms": len(index.terms),
+            "snapshot_kb": round(len(raw) / 1024, 1),
+            "rebuild_from_segments_ms": round(1000 * rebuild_sec, 1),
+            "cold_load_from_snapshot_ms": round(1000 * snapshot_load_sec, 1),
+            "snapshot_decode_ms": round(1000 * decode_sec, 1),
+        },
+        "vector_only": score(lambda q, qv: rag._query_chunks(qv)),
+        "bm25_only": score(lambda q, qv: [index.text(k) for k, _ in index.search(q["q"], args.top_k)]),
+        "hybrid": score(lambda q, qv: rag._hybrid_chunks(q["q"].lower(), qv, index)),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
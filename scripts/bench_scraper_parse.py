@@ -0,0 +1,176 @@
+"""
+Scraper throughput on a local corpus of catalog HTML.
+
+1. Parse only: the old two-parse path (extract_title_and_links +
+   html_to_markdown) against parse_page, single-threaded.
+2. End to end: crawl_catalog against a local server that serves the corpus
+   behind a hub page, once per PARSE_EXECUTOR mode. Reports pages/sec and the
+   worst event-loop stall seen while crawling.
+
+    python scripts/bench_scraper_parse.py --corpus saved_html/ --latency-ms 40
+    python scripts/bench_scraper_parse.py --pages 300       # synthetic pages
+
+The corpus is any directory of saved *.html pages. Without one, synthetic
+course pages shaped like the catalog (nav boilerplate, a <main> with a
+description table and prerequisites) are used.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "services" / "scraper_lambda" / "src"))
+
+
+def synthetic_page(i: int) -> str:
+    nav = "".join(f'<li><a href="/2025/graduate/programs/p{j}">Program {j}</a></li>' for j in range(120))
+    rows = "".join(f"<tr><td>Outcome {j}</td><td>{'Students apply methods to real data. ' * 3}</td></tr>"
+                   for j in range(12))
+    return (
+        f"<html><head><title>CS {6000 + i} - Course {i}</title></head><body>"
+        f"<nav><ul>{nav}</ul></nav><main><h1>CS {6000 + i} Course {i}</h1>"
+        f"<p><strong>Credit hours:</strong> 3 semester credit hours.</p>"
+        f"<p>{'Covers algorithms, systems, and applications with hands-on projects. ' * 20}</p>"
+        f"<h2>Prerequisites</h2><ul><li><a href='/courses/cs{5000 + i}'>CS {5000 + i}</a></li>"
+        f"<li>Instructor consent</li></ul><table>{rows}</table></main>"
+        f"<footer>{'Footer links and legal text. ' * 30}</footer></body></html>"
+    )
+
+
+def load_corpus(path: str | None, n: int) -> list:
+    if not path:
+        return [synthetic_page(i) for i in range(n)]
+    files = sorted(Path(path).glob("**/*.html"))
+    if not files:
+        raise SystemExit(f"no *.html under {path}")
+    return [f.read_text(encoding="utf-8", errors="replace") for f in files]
+
+
+def start_site(pages: list, latency: float):
+    hub = "<html><head><title>Courses</title></head><body><main>" + "".join(
+        f'<a href="/courses/p{i}.html">Page {i}</a> ' for i in range(len(pages))
+    ) + "</main></body></html>"
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            if self.path.rstrip("/") == "/courses":
+                body = hub
+            elif self.path.startswith("/courses/p") and self.path.endswith(".html"):
+                try:
+                    body = pages[int(self.path[len("/courses/p"):-len(".html")])]
+                except (ValueError, IndexError):
+                    body = None
+            else:
+                body = None
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *a):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/courses/"
+
+
+def bench_parse(main, pages: list, seed: str) -> dict:
+    out = {}
+    for name, fn in (
+        ("two_parses", lambda h: (main.extract_title_and_links(seed, h), main.html_to_markdown(h))),
+        ("parse_page", lambda h: main.parse_page(seed, h)),
+    ):
+        t0 = time.perf_counter()
+        for h in pages:
+            fn(h)
+        dt = time.perf_counter() - t0
+        out[name] = {"sec": round(dt, 3), "pages_per_sec": round(len(pages) / dt, 1)}
+    return out
+
+
+async def crawl_with_lag(main, seed: str) -> tuple:
+    lag = 0.0
+    stop = False
+
+    async def ticker():
+        nonlocal lag
+        loop = asyncio.get_running_loop()
+        while not stop:
+            t = loop.time()
+            await asyncio.sleep(0.005)
+            lag = max(lag, loop.time() - t - 0.005)
+
+    tick = asyncio.create_task(ticker())
+    t0 = time.perf_counter()
+    text = await main.crawl_catalog(seed)
+    dt = time.perf_counter() - t0
+    stop = True
+    await tick
+    return text, dt, lag
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", help="directory of saved catalog *.html pages")
+    ap.add_argument("--pages", type=int, default=200, help="synthetic pages when no corpus is given")
+    ap.add_argument("--latency-ms", type=float, default=40)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    ap.add_argument("--modes", default="inline,thread,process")
+    args = ap.parse_args()
+
+    pages = load_corpus(args.corpus, args.pages)
+    server, seed = start_site(pages, args.latency_ms / 1000.0)
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.update({
+        "SEED_URL": seed,
+        "INCLUDE_FRAGMENT": "/courses/",
+        "RATE_SLEEP": "0",
+        "MIN_LEN": "1",
+        "MAX_DEPTH": "1",
+        "CONCURRENCY": str(args.concurrency),
+        "PARSE_WORKERS": str(args.workers),
+    })
+    import main as scraper
+
+    report = {
+        "pages": len(pages),
+        "avg_kb": round(sum(len(p) for p in pages) / len(pages) / 1024, 1),
+        "parse_only": bench_parse(scraper, pages, seed),
+        "crawl": {},
+    }
+    outputs = set()
+    for mode in args.modes.split(","):
+        scraper.PARSE_EXECUTOR = mode
+        text, dt, lag = asyncio.run(crawl_with_lag(scraper, seed))
+        outputs.add(text)
+        report["crawl"][mode] = {
+            "sec": round(dt, 3),
+            "pages_per_sec": round((len(pages) + 1) / dt, 1),
+            "max_loop_stall_ms": round(lag * 1000, 1),
+        }
+    report["identical_output"] = len(outputs) == 1
+    server.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
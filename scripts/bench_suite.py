@@ -0,0 +1,325 @@
+"""
+Offline benchmark suite: ingest, retrieval and end-to-end agent latency
+against deterministic fakes, for catching performance regressions before a
+deploy. Nothing touches AWS, SerpAPI or Tavily.
+
+- Bedrock, S3 and S3 Vectors are the fakes from fakes.py, handed out by a
+  patched boto3.client, so the services build their clients the way they do
+  in Lambda. The search APIs are stub_search_api.py.
+- The corpus is the synthetic catalog from bench_hybrid_retrieval.py: --docs
+  pages of --courses-per-doc courses, seeded into the fake source bucket.
+- Phases (each in a fresh interpreter, so peak RSS is per phase):
+  - ingest: ingest_lambda's handler once per page (S3 put events), then
+    again over the unchanged pages;
+  - retrieve: rag.s3_vector.retrieve_utd_context over course-code and
+    topic questions, after a zero-latency ingest of the corpus;
+  - agent: app.lambda_handler end to end, same setup. The answer cache is
+    off unless --answer-cache is given, so every request runs the graph.
+  Requests run on a thread pool of --concurrency.
+
+Prints one JSON report. Each phase reports requests, errors, throughput,
+latency p50/p95/p99, peak RSS and fake call counts; retrieval also reports
+the share of code questions whose course came back. --out saves the report.
+--baseline compares against a saved one and exits 1 when p95, throughput or
+peak RSS is worse by more than --max-regression.
+
+    python scripts/bench_suite.py
+    python scripts/bench_suite.py --phases retrieve,agent --concurrency 16 --model-latency-ms 80
+    python scripts/bench_suite.py --out bench.json
+    python scripts/bench_suite.py --baseline bench.json --max-regression 0.25
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+PATHS = [ROOT / "shared", ROOT / "services" / "agent_lambda", ROOT / "services" / "ingest_lambda" / "src",
+         ROOT / "scripts"]
+for p in reversed(PATHS):
+    sys.path.insert(0, str(p))
+
+PHASES = ("ingest", "retrieve", "agent")
+SOURCE_BUCKET = "bench-source"
+MANIFEST_BUCKET = "bench-manifests"
+INDEX_ARN = "arn:aws:s3vectors:local:000000000000:bucket/bench/index/bench"
+
+
+def make_corpus(docs: int, per_doc: int, seed: int = 5):
+    """
+    {s3 key: markdown} for `docs` catalog pages, plus the course list.
+    """
+    from bench_hybrid_retrieval import make_catalog, page
+
+    rnd = random.Random(seed)
+    courses = make_catalog(docs * per_doc)
+    pages = {}
+    for i in range(0, len(courses), per_doc):
+        pages[f"catalog/pages/page-{i // per_doc:04d}.md"] = "\n".join(page(c, rnd) for c in courses[i:i + per_doc])
+    return pages, courses
+
+
+def make_questions(courses, n: int, seed: int = 11) -> list:
+    """
+    n questions, about 80% naming a course code; cycles when n exceeds the
+    catalog, so later ones repeat (and hit caches) like real traffic.
+    """
+    from bench_hybrid_retrieval import questions
+
+    n_code = min(len(courses), max(1, int(n * 0.8)))
+    qs = questions(courses, n_code, max(1, n - n_code), seed)
+    return [qs[i % len(qs)] for i in range(n)]
+
+
+def put_event(bucket: str, key: str) -> dict:
+    return {"Records": [{"eventName": "ObjectCreated:Put", "s3": {"bucket": {"name": bucket}, "object": {"key": key}}}]}
+
+
+# the EventBridge schedule that merges lexical segments into the snapshot
+MERGE_EVENT = {"source": "aws.events", "detail-type": "Scheduled Event", "detail": {}}
+
+
+def rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_load(fn, items: list, concurrency: int) -> dict:
+    """
+    Call fn(item) for every item on `concurrency` threads. fn returns truthy
+    on success; a falsy return or an exception counts as an error.
+    """
+    latencies, errors = [], []
+
+    def one(item):
+        t0 = time.perf_counter()
+        try:
+            ok = fn(item)
+        except Exception as e:
+            ok = False
+            errors.append(repr(e)[:200])
+        else:
+            if not ok:
+                errors.append("check failed")
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, items))
+    wall = time.perf_counter() - t0
+
+    s = sorted(latencies)
+
+    def pct(p):
+        return round(1000 * s[min(len(s) - 1, int(p * len(s)))], 2) if s else 0.0
+
+    return {
+        "requests": len(items),
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:3],
+        "wall_sec": round(wall, 3),
+        "throughput_rps": round(len(items) / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "mean": round(1000 * statistics.fmean(s), 2) if s else 0.0,
+            "p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99),
+            "max": round(1000 * s[-1], 2) if s else 0.0,
+        },
+    }
+
+
+def _child(args) -> dict:
+    os.environ.update({
+        "AWS_DEFAULT_REGION": os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
+        "SOURCE_BUCKET": SOURCE_BUCKET,
+        "MANIFEST_BUCKET": MANIFEST_BUCKET,
+        "CATALOG_VERSION_BUCKET": MANIFEST_BUCKET,
+        "S3V_INDEX_ARN": INDEX_ARN,
+        "SERPAPI_KEY": "stub",
+        "TAVILY_API_KEY": "stub",
+    })
+    if not args.answer_cache:
+        # repeated questions would be answer-cache hits and hide the pipeline
+        os.environ["ANSWER_CACHE_SIZE"] = "0"
+
+    from fakes import FakeBedrock, FakeS3, FakeS3Vectors, install_boto3
+    from stub_search_api import start_stub
+
+    stub, base, stub_counts = start_stub(0, args.tool_latency_ms)
+    os.environ["SERPAPI_ENDPOINT"] = f"{base}/search.json"
+    os.environ["TAVILY_SEARCH_ENDPOINT"] = f"{base}/search"
+
+    # built with zero latency: seeding isn't what's measured
+    bedrock = FakeBedrock(latency_ms=0, token_ms=0)
+    s3 = FakeS3()
+    vectors = FakeS3Vectors()
+    install_boto3({"bedrock-runtime": bedrock, "s3": s3, "s3vectors": vectors})
+
+    pages, courses = make_corpus(args.docs, args.courses_per_doc)
+    for key, text in pages.items():
+        s3.objects[(SOURCE_BUCKET, key)] = text.encode("utf-8")
+
+    def start_measuring():
+        bedrock.latency = args.model_latency_ms / 1000.0
+        bedrock.token_delay = args.token_ms / 1000.0
+        s3.latency = args.s3_latency_ms / 1000.0
+        vectors.latency = args.s3_latency_ms / 1000.0
+        bedrock.calls = dict.fromkeys(bedrock.calls, 0)
+        stub_counts.clear()
+
+    # the services print per request; keep it off the report
+    quiet = contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext()
+    with quiet:
+        import main as ingest
+
+        def ingest_one(key):
+            return ingest.handler(put_event(SOURCE_BUCKET, key), None).get("ok")
+
+        out = {"phase": args.child, "docs": len(pages), "courses": len(courses)}
+        if args.child == "ingest":
+            start_measuring()
+            out["rss_before_mb"] = rss_mb()
+            out["fresh"] = run_load(ingest_one, list(pages), args.concurrency)
+            out["unchanged"] = run_load(ingest_one, list(pages), args.concurrency)
+            out["vectors"] = len(vectors.vectors)
+        else:
+            run_load(ingest_one, list(pages), args.concurrency)
+            # what the deployed schedule does between ingests and queries
+            ingest.handler(MERGE_EVENT, None)
+            start_measuring()
+            qs = make_questions(courses, args.questions if args.child == "retrieve" else args.requests)
+
+            if args.child == "retrieve":
+                import rag.s3_vector as rag
+
+                rag.retrieve_utd_context("warm up the lexical index")
+                found = []
+
+                def retrieve_one(q):
+                    ctx = rag.retrieve_utd_context(q["q"])
+                    if q["kind"] == "code":
+                        found.append(any(code in ctx for code in q["targets"]))
+                    return bool(ctx)
+
+                out["rss_before_mb"] = rss_mb()
+                out.update(run_load(retrieve_one, qs, args.concurrency))
+                out["code_recall"] = round(sum(found) / len(found), 3) if found else None
+            else:
+                import answer_cache
+                import app
+
+                def ask(q):
+                    resp = app.lambda_handler({"body": json.dumps({"question": q["q"]})}, None)
+                    return resp["statusCode"] == 200 and json.loads(resp["body"]).get("answer")
+
+                app.get_graph()
+                out["rss_before_mb"] = rss_mb()
+                out.update(run_load(ask, qs, args.concurrency))
+                out["answer_cache"] = answer_cache.stats()
+            out["distinct_questions"] = len({q["q"] for q in qs})
+
+    out["peak_rss_mb"] = rss_mb()
+    out["fake_calls"] = {"bedrock": dict(bedrock.calls), "search": dict(stub_counts)}
+    stub.shutdown()
+    return out
+
+
+def _headline(phase: dict) -> dict:
+    """
+    The numbers compared against a baseline.
+    """
+    load = phase.get("fresh", phase)
+    return {
+        "p95_ms": load["latency_ms"]["p95"],
+        "throughput_rps": load["throughput_rps"],
+        "peak_rss_mb": phase["peak_rss_mb"],
+    }
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list:
+    failures = []
+    for name, phase in report["phases"].items():
+        base = (baseline.get("phases") or {}).get(name)
+        if not base:
+            continue
+        now, then = _headline(phase), _headline(base)
+        if now["p95_ms"] > then["p95_ms"] * (1 + max_regression):
+            failures.append(f"{name}: p95 {now['p95_ms']}ms vs {then['p95_ms']}ms")
+        if now["throughput_rps"] < then["throughput_rps"] * (1 - max_regression):
+            failures.append(f"{name}: throughput {now['throughput_rps']}/s vs {then['throughput_rps']}/s")
+        if now["peak_rss_mb"] > then["peak_rss_mb"] * (1 + max_regression):
+            failures.append(f"{name}: peak RSS {now['peak_rss_mb']}MB vs {then['peak_rss_mb']}MB")
+    return failures
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--phases", default=",".join(PHASES))
+    ap.add_argument("--docs", type=int, default=40, help="catalog pages to ingest")
+    ap.add_argument("--courses-per-doc", type=int, default=10)
+    ap.add_argument("--questions", type=int, default=200, help="retrieval requests")
+    ap.add_argument("--requests", type=int, default=100, help="end-to-end agent requests")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--model-latency-ms", type=float, default=50, help="fake Bedrock latency per call")
+    ap.add_argument("--token-ms", type=float, default=0, help="fake Bedrock per-token delay")
+    ap.add_argument("--s3-latency-ms", type=float, default=10, help="fake S3 / S3 Vectors latency per call")
+    ap.add_argument("--tool-latency-ms", type=float, default=100, help="stub SerpAPI / Tavily latency")
+    ap.add_argument("--answer-cache", action="store_true",
+                    help="keep the semantic answer cache on in the agent phase (off by default)")
+    ap.add_argument("--out", default="", help="write the report here")
+    ap.add_argument("--baseline", default="", help="report to compare against")
+    ap.add_argument("--max-regression", type=float, default=0.2)
+    ap.add_argument("--verbose", action="store_true", help="let service logs through")
+    ap.add_argument("--child", choices=PHASES, help=argparse.SUPPRESS)
+    return ap.parse_args(argv)
+
+
+def run_phase(phase: str, argv: list) -> dict:
+    proc = subprocess.run([sys.executable, __file__, *argv, "--child", phase],
+                          capture_output=True, text=True, cwd=ROOT)
+    if proc.returncode:
+        sys.stderr.write(proc.stdout[-4000:] + proc.stderr[-4000:])
+        raise SystemExit(f"phase {phase} failed")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        print(json.dumps(_child(args)))
+        return
+
+    phases = [p.strip() for p in args.phases.split(",") if p.strip()]
+    unknown = set(phases) - set(PHASES)
+    if unknown:
+        raise SystemExit(f"unknown phases: {sorted(unknown)}")
+
+    argv = sys.argv[1:]
+    report = {
+        "python": sys.version.split()[0],
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "child", "verbose")},
+        "phases": {p: run_phase(p, argv) for p in phases},
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+    if args.baseline:
+        failures = compare(report, json.loads(Path(args.baseline).read_text()), args.max_regression)
+        if failures:
+            print("FAIL: " + "; ".join(failures), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Exercise the SerpAPI/Tavily tool cache against the local stub server:
+concurrent identical calls should coalesce into one upstream request, and
+repeat calls should be served from cache.
+
+    python scripts/bench_tool_cache.py --concurrency 16 --latency-ms 300
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "shared"))
+sys.path.insert(0, str(ROOT / "services" / "agent_lambda"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from stub_search_api import start_stub  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--latency-ms", type=float, default=300)
+    args = ap.parse_args()
+
+    server, base, counts = start_stub(0, args.latency_ms)
+    # tool modules read their config at import time
+    os.environ.update({
+        "SERPAPI_KEY": "stub",
+        "TAVILY_API_KEY": "stub",
+        "SERPAPI_ENDPOINT": f"{base}/search.json",
+        "TAVILY_SEARCH_ENDPOINT": f"{base}/search",
+    })
+    from tools.serpapi_jobs import jobs_cache, serpapi_google_jobs
+    from tools.tavily_search import tavily_web_search, web_cache
+
+    def burst(fn, *a):
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            list(pool.map(lambda _: fn(*a), range(args.concurrency)))
+        return round(time.perf_counter() - t0, 3)
+
+    report = {
+        "cold_burst_sec": {
+            "serpapi": burst(serpapi_google_jobs, "AI engineer"),
+            "tavily": burst(tavily_web_search, "AI engineer projects"),
+        },
+        "warm_burst_sec": {
+            # different spacing/case, same normalised key
+            "serpapi": burst(serpapi_google_jobs, "  ai  ENGINEER "),
+            "tavily": burst(tavily_web_search, "AI engineer projects"),
+        },
+        "upstream_requests": dict(counts),
+        "calls_per_tool": 2 * args.concurrency,
+        "cache": {"serpapi": jobs_cache.stats(), "tavily": web_cache.stats()},
+    }
+    print(json.dumps(report, indent=2))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
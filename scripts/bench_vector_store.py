@@ -0,0 +1,75 @@
+"""
+LocalVectorStore on clustered synthetic vectors: per-query latency and
+recall@k for brute force, int8 quantized, IVF and IVF + int8, with a batched
+brute-force pass for comparison. Recall is against exact cosine search.
+
+    python scripts/bench_vector_store.py --n 50000 --dim 1024 --nlist 256 --nprobe 16
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "shared"))
+
+from agent_core.vector_store import LocalVectorStore  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=50000)
+    ap.add_argument("--dim", type=int, default=1024)
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--nlist", type=int, default=256)
+    ap.add_argument("--nprobe", type=int, default=16)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(max(8, args.n // 100), args.dim)).astype(np.float32)
+    X = centers[rng.integers(0, len(centers), args.n)] + 0.6 * rng.normal(size=(args.n, args.dim)).astype(np.float32)
+    Q = X[rng.integers(0, args.n, args.queries)] + 0.3 * rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+
+    Xn = X / np.linalg.norm(X, axis=1, keepdims=True)
+    Qn = Q / np.linalg.norm(Q, axis=1, keepdims=True)
+    truth = [set(np.argpartition(-(Xn @ q), args.k)[: args.k].tolist()) for q in Qn]
+
+    with tempfile.TemporaryDirectory() as d:
+        store = LocalVectorStore(d)
+        t0 = time.perf_counter()
+        for s in range(0, args.n, 1000):
+            store.put([{"key": str(i), "data": {"float32": X[i]}} for i in range(s, min(args.n, s + 1000))])
+        report = {"n": args.n, "dim": args.dim, "k": args.k, "load_sec": round(time.perf_counter() - t0, 2)}
+
+        def run(label):
+            t0 = time.perf_counter()
+            res = [store.query(q, args.k) for q in Q]
+            dt = time.perf_counter() - t0
+            recall = np.mean([len(truth[i] & {int(h["key"]) for h in r}) / args.k for i, r in enumerate(res)])
+            report[label] = {"ms_per_query": round(1000 * dt / len(Q), 2), f"recall@{args.k}": round(float(recall), 3)}
+
+        run("brute")
+        t0 = time.perf_counter()
+        store.query_batch(Q, args.k)
+        report["brute_batched"] = {"ms_per_query": round(1000 * (time.perf_counter() - t0) / len(Q), 2)}
+
+        store.quantize()
+        store.use_quantized = True
+        run("int8")
+        t0 = time.perf_counter()
+        store.build_ivf(args.nlist)
+        report["ivf_build_sec"] = round(time.perf_counter() - t0, 2)
+        store.nprobe = args.nprobe
+        run("ivf_int8")
+        store.use_quantized = False
+        run("ivf")
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
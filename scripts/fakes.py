@@ -0,0 +1,273 @@
+"""
+Deterministic in-memory stand-ins for the AWS clients the services use, for
+local harnesses and benchmarks. They implement only the calls this repo makes.
+
+- FakeBedrock: Titan-style embeddings (hashed bag of words, so paraphrases
+  land close together) and Claude-style chat, buffered or streamed, with
+  configurable latency and optional throttling.
+- FakeS3: get_object (incl. Range), put_object (incl. IfMatch / IfNoneMatch),
+  head_object, delete_object, list_objects_v2 (single page).
+- FakeS3Vectors: put_vectors, delete_vectors, query_vectors (cosine; NumPy
+  when available, so a large fake index doesn't dominate a benchmark).
+
+install_boto3() makes boto3.client() hand these out, for modules that build
+their clients at import.
+"""
+import hashlib
+import io
+import json
+import math
+import re
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python cosine fallback
+    np = None
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class FakeClientError(Exception):
+    def __init__(self, code: str, message: str = ""):
+        super().__init__(message or code)
+        self.response = {"Error": {"Code": code, "Message": message or code}}
+
+
+def fake_embedding(text: str, dim: int = 1024) -> list:
+    vec = [0.0] * dim
+    for w in _WORD.findall(text.lower()):
+        h = int.from_bytes(hashlib.md5(w.encode()).digest()[:8], "little")
+        vec[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+
+class FakeBedrock:
+    """
+    invoke_model / invoke_model_with_response_stream stand-in.
+
+    Embedding calls sleep `latency_ms`; chat calls sleep `latency_ms` before
+    the first token and `token_ms` per token. When `throttle_above` > 0, any
+    call made while more than that many are in flight raises a throttle.
+    """
+
+    def __init__(self, latency_ms: float = 50.0, token_ms: float = 0.0, throttle_above: int = 0,
+                 dim: int = 1024, answer_tokens: int = 120):
+        self.latency = latency_ms / 1000.0
+        self.token_delay = token_ms / 1000.0
+        self.throttle_above = throttle_above
+        self.dim = dim
+        self.answer_tokens = answer_tokens
+        self.in_flight = 0
+        self.calls = {"embed": 0, "chat": 0, "stream": 0}
+        self.lock = threading.Lock()
+
+    def _enter(self, kind: str) -> None:
+        with self.lock:
+            self.in_flight += 1
+            self.calls[kind] += 1
+            over = self.throttle_above and self.in_flight > self.throttle_above
+        if over:
+            self._exit()
+            raise FakeClientError("ThrottlingException", "Rate exceeded")
+
+    def _exit(self) -> None:
+        with self.lock:
+            self.in_flight -= 1
+
+    def _answer(self, req: dict) -> tuple:
+        prompt = req["messages"][-1]["content"]
+        m = re.search(r"User Question:\s*(.+?)\n", prompt)
+        question = m.group(1).strip() if m else "your question"
+        words = [f"Answer to '{question}':"] + [f"token{i}" for i in range(self.answer_tokens)]
+        return [w + " " for w in words], len(prompt) // 4
+
+    def invoke_model(self, modelId, body, contentType="application/json", accept="application/json"):
+        req = json.loads(body)
+        if "inputText" in req:
+            self._enter("embed")
+            try:
+                time.sleep(self.latency)
+                out = {"embedding": fake_embedding(req["inputText"], self.dim),
+                       "inputTextTokenCount": len(req["inputText"]) // 4}
+            finally:
+                self._exit()
+        else:
+            self._enter("chat")
+            try:
+                pieces, in_tokens = self._answer(req)
+                time.sleep(self.latency + self.token_delay * len(pieces))
+                out = {"content": [{"type": "text", "text": "".join(pieces)}],
+                       "usage": {"input_tokens": in_tokens, "output_tokens": len(pieces)}}
+            finally:
+                self._exit()
+        return {"body": io.BytesIO(json.dumps(out).encode("utf-8"))}
+
+    def invoke_model_with_response_stream(self, modelId, body, contentType="application/json",
+                                          accept="application/json"):
+        req = json.loads(body)
+        self._enter("stream")
+        pieces, in_tokens = self._answer(req)
+
+        def events():
+            try:
+                time.sleep(self.latency)
+                yield _event({"type": "message_start", "message": {"usage": {"input_tokens": in_tokens}}})
+                for p in pieces:
+                    time.sleep(self.token_delay)
+                    yield _event({"type": "content_block_delta", "index": 0,
+                                  "delta": {"type": "text_delta", "text": p}})
+                yield _event({"type": "message_delta", "usage": {"output_tokens": len(pieces)}})
+                yield _event({"type": "message_stop"})
+            finally:
+                self._exit()
+
+        return {"body": events()}
+
+
+def _event(obj: dict) -> dict:
+    return {"chunk": {"bytes": json.dumps(obj).encode("utf-8")}}
+
+
+class FakeS3:
+    class exceptions:
+        NoSuchKey = FakeClientError
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.objects = {}
+        self.lock = threading.Lock()
+
+    def _get(self, Bucket, Key):
+        time.sleep(self.latency)
+        with self.lock:
+            data = self.objects.get((Bucket, Key))
+        if data is None:
+            raise FakeClientError("NoSuchKey")
+        return data
+
+    def get_object(self, Bucket, Key, Range=None):
+        data = self._get(Bucket, Key)
+        size = len(data)
+        if Range:
+            start, end = Range.split("=", 1)[1].split("-")
+            start, end = int(start), min(int(end), size - 1)
+            if start >= size:
+                raise FakeClientError("InvalidRange")
+            data = data[start : end + 1]
+            return {"Body": io.BytesIO(data), "ContentLength": len(data),
+                    "ContentRange": f"bytes {start}-{end}/{size}"}
+        return {"Body": io.BytesIO(data), "ContentLength": size, "ETag": _etag(data)}
+
+    def head_object(self, Bucket, Key):
+        data = self._get(Bucket, Key)
+        return {"ContentLength": len(data), "ETag": _etag(data)}
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, **kwargs):
+        time.sleep(self.latency)
+        data = Body if isinstance(Body, bytes) else Body.encode("utf-8")
+        with self.lock:
+            old = self.objects.get((Bucket, Key))
+            if (IfMatch and (old is None or _etag(old) != IfMatch)) or (IfNoneMatch == "*" and old is not None):
+                raise FakeClientError("PreconditionFailed", "At least one of the pre-conditions you specified did not hold")
+            self.objects[(Bucket, Key)] = data
+        return {"ETag": _etag(data)}
+
+    def delete_object(self, Bucket, Key):
+        with self.lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix="", **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            items = sorted((k, d) for (b, k), d in self.objects.items() if b == Bucket and k.startswith(Prefix))
+        return {"Contents": [{"Key": k, "ETag": _etag(d), "Size": len(d)} for k, d in items], "IsTruncated": False}
+
+
+def _etag(data: bytes) -> str:
+    return '"' + hashlib.md5(data).hexdigest() + '"'
+
+
+class FakeS3Vectors:
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.vectors = {}
+        self.lock = threading.Lock()
+        self._matrix = None  # (keys, unit-norm rows), rebuilt after writes
+
+    def put_vectors(self, vectorBucketName=None, indexName=None, vectors=(), **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            for v in vectors:
+                self.vectors[v["key"]] = v
+            self._matrix = None
+        return {}
+
+    def delete_vectors(self, vectorBucketName=None, indexName=None, keys=(), **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            for k in keys:
+                self.vectors.pop(k, None)
+            self._matrix = None
+        return {}
+
+    def query_vectors(self, topK=5, queryVector=None, returnMetadata=True, returnDistance=True, **kwargs):
+        time.sleep(self.latency)
+        q = queryVector["float32"]
+        scored = self._scored_numpy(q) if np is not None else self._scored(q)
+        out = []
+        for dist, v in scored[:topK]:
+            item = {"key": v["key"]}
+            if returnMetadata:
+                item["metadata"] = v.get("metadata", {})
+            if returnDistance:
+                item["distance"] = dist
+            out.append(item)
+        return {"vectors": out}
+
+    def _scored(self, q):
+        qn = math.sqrt(sum(x * x for x in q)) or 1.0
+        with self.lock:
+            items = list(self.vectors.values())
+        scored = []
+        for v in items:
+            d = v["data"]["float32"]
+            dn = math.sqrt(sum(x * x for x in d)) or 1.0
+            cos = sum(a * b for a, b in zip(q, d)) / (qn * dn)
+            scored.append((1.0 - cos, v))
+        scored.sort(key=lambda t: t[0])
+        return scored
+
+    def _scored_numpy(self, q):
+        with self.lock:
+            if self._matrix is None:
+                items = list(self.vectors.values())
+                rows = [v["data"]["float32"] for v in items]
+                m = np.array(rows, dtype=np.float32) if rows else np.zeros((0, 0), dtype=np.float32)
+                norms = np.linalg.norm(m, axis=1, keepdims=True)
+                self._matrix = (items, m / np.where(norms == 0, 1.0, norms))
+            items, m = self._matrix
+        if not items:
+            return []
+        qv = np.asarray(q, dtype=np.float32)
+        dist = 1.0 - m @ (qv / (np.linalg.norm(qv) or 1.0))
+        return [(float(dist[i]), items[i]) for i in np.argsort(dist, kind="stable")]
+
+
+def install_boto3(clients: dict) -> None:
+    """
+    Patch boto3.client so client("s3") etc. return the given fakes. For
+    benchmark processes only; the patch is process-wide.
+    """
+    import boto3
+
+    real = boto3.client
+
+    def client(service_name, *args, **kwargs):
+        fake = clients.get(service_name)
+        return fake if fake is not None else real(service_name, *args, **kwargs)
+
+    boto3.client = client
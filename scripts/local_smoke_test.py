@@ -0,0 +1,108 @@
+"""
+End-to-end smoke test against local fakes (no AWS, SerpAPI or Tavily): ingest
+a few synthetic catalog pages, retrieve one course by its code, ask the agent
+a buffered, a streamed and a batched question, check that a reworded question
+is answered from the answer cache, then delete a page (which must invalidate
+it). Exits non-zero on the first failed check; takes a few seconds.
+
+    python scripts/local_smoke_test.py
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_suite import INDEX_ARN, MANIFEST_BUCKET, MERGE_EVENT, SOURCE_BUCKET, make_corpus, put_event  # noqa: E402
+
+
+def check(cond, what: str):
+    if not cond:
+        raise SystemExit(f"FAIL: {what}")
+    print(f"ok   {what}")
+
+
+def main():
+    os.environ.update({
+        "AWS_DEFAULT_REGION": os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
+        "SOURCE_BUCKET": SOURCE_BUCKET,
+        "MANIFEST_BUCKET": MANIFEST_BUCKET,
+        "CATALOG_VERSION_BUCKET": MANIFEST_BUCKET,
+        "CATALOG_VERSION_TTL_SEC": "0",
+        "S3V_INDEX_ARN": INDEX_ARN,
+        "SERPAPI_KEY": "stub",
+        "TAVILY_API_KEY": "stub",
+    })
+
+    from fakes import FakeBedrock, FakeS3, FakeS3Vectors, install_boto3
+    from stub_search_api import start_stub
+
+    stub, base, counts = start_stub(0, 0)
+    os.environ["SERPAPI_ENDPOINT"] = f"{base}/search.json"
+    os.environ["TAVILY_SEARCH_ENDPOINT"] = f"{base}/search"
+    bedrock, s3, vectors = FakeBedrock(latency_ms=0), FakeS3(), FakeS3Vectors()
+    install_boto3({"bedrock-runtime": bedrock, "s3": s3, "s3vectors": vectors})
+
+    pages, courses = make_corpus(3, 4)
+    for key, text in pages.items():
+        s3.objects[(SOURCE_BUCKET, key)] = text.encode("utf-8")
+
+    logs = io.StringIO()
+    with contextlib.redirect_stdout(logs):
+        import main as ingest
+        results = [ingest.handler(put_event(SOURCE_BUCKET, key), None) for key in pages]
+        again = ingest.handler(put_event(SOURCE_BUCKET, next(iter(pages))), None)
+        merged = ingest.handler(MERGE_EVENT, None)
+    check(all(r.get("ok") for r in results), "ingest handler succeeds for every page")
+    check(merged.get("chunks") == len(courses), f"scheduled merge indexes every chunk ({merged.get('chunks')})")
+    check(len(vectors.vectors) == len(courses), f"one vector per course ({len(vectors.vectors)})")
+    check(again.get("vectors_written") == 0, "re-ingesting an unchanged page writes nothing")
+
+    code = courses[5]["code"]
+    with contextlib.redirect_stdout(logs):
+        import rag.s3_vector as rag
+        ctx = rag.retrieve_utd_context(f"What are the prerequisites for {code}?")
+    check(code in ctx, f"retrieval returns {code} by course code")
+
+    with contextlib.redirect_stdout(logs):
+        import app
+        buffered = app.lambda_handler({"body": json.dumps({"question": "Which courses fit ML?", "timing": True})}, None)
+        streamed = app.lambda_handler({"body": json.dumps({"question": "Which courses fit NLP?", "stream": True})}, None)
+        batch = app.lambda_handler({"body": json.dumps({"questions": ["ML jobs?", "Data jobs?"]})}, None)
+        empty = app.lambda_handler({"body": "{}"}, None)
+    body = json.loads(buffered["body"])
+    check(buffered["statusCode"] == 200 and body["answer"].startswith("Answer to"), "buffered answer")
+    check(set(body["timing"]["nodes"]) == {"retrieve_catalog", "fetch_jobs", "fetch_web", "synthesize_answer"},
+          "timing breakdown covers every node")
+    check("event: token" in streamed["body"] and "event: done" in streamed["body"], "streamed answer (SSE framing)")
+    check([a.get("answer", "")[:9] for a in json.loads(batch["body"])["answers"]] == ["Answer to"] * 2, "batched answers")
+    check(empty["statusCode"] == 400, "missing question is a 400")
+    check(counts.get("serpapi") and counts.get("tavily"), "search tools were called")
+
+    def ask(question):
+        with contextlib.redirect_stdout(logs):
+            resp = app.lambda_handler({"body": json.dumps({"question": question})}, None)
+        return json.loads(resp["body"])["answer"]
+
+    chats = bedrock.calls["chat"]
+    check(ask("ML: which courses fit") == body["answer"] and bedrock.calls["chat"] == chats,
+          "reworded question is answered from the answer cache")
+
+    removed_key = next(iter(pages))
+    event = put_event(SOURCE_BUCKET, removed_key)
+    event["Records"][0]["eventName"] = "ObjectRemoved:Delete"
+    with contextlib.redirect_stdout(logs):
+        ingest.handler(event, None)
+    check(len(vectors.vectors) == len(courses) - 4, "removing a page deletes its vectors")
+    ask("Which courses fit ML?")
+    check(bedrock.calls["chat"] == chats + 1, "a catalog change invalidates cached answers")
+
+    stub.shutdown()
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
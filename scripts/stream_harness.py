@@ -0,0 +1,126 @@
+"""
+Local harness for the streaming answer path: fake Bedrock (embedding + a
+token-by-token response stream), fake S3 Vectors, the stub search APIs, and
+stream_server.py on a local port. Reports time-to-first-token for the
+streamed endpoint against total latency of the buffered one.
+
+    python scripts/stream_harness.py --token-ms 15 --tool-latency-ms 300
+"""
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "shared"))
+sys.path.insert(0, str(ROOT / "services" / "agent_lambda"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from fakes import FakeBedrock, FakeS3, FakeS3Vectors, fake_embedding  # noqa: E402
+from stub_search_api import start_stub  # noqa: E402
+
+QUESTION = "Which UTD courses and projects fit an AI engineering career in Dallas?"
+
+
+def setup(args):
+    stub, base, _ = start_stub(0, args.tool_latency_ms)
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.update({
+        "S3V_INDEX_ARN": "arn:aws:s3vectors:local:000000000000:bucket/fake/index/fake",
+        "SERPAPI_KEY": "stub",
+        "TAVILY_API_KEY": "stub",
+        "SERPAPI_ENDPOINT": f"{base}/search.json",
+        "TAVILY_SEARCH_ENDPOINT": f"{base}/search",
+    })
+
+    import rag.s3_vector as rag
+    from agent_core.embedding_client import EmbeddingClient
+    from agent_core.vector_store import S3VectorsStore
+
+    bedrock = FakeBedrock(latency_ms=args.model_latency_ms, token_ms=args.token_ms)
+    vectors = FakeS3Vectors(latency_ms=args.model_latency_ms)
+    for i, text in enumerate(["CS 6375 Machine Learning", "CS 6320 Natural Language Processing",
+                              "BUAN 6341 Applied Machine Learning", "CS 6350 Big Data Management"]):
+        vectors.put_vectors(vectors=[{"key": f"doc:{i}", "data": {"float32": fake_embedding(text)},
+                                      "metadata": {"text": text}}])
+    rag.bedrock_runtime = bedrock
+    rag.vector_store = S3VectorsStore(client=vectors, index_arn=os.environ["S3V_INDEX_ARN"])
+    rag.s3 = FakeS3()
+    rag.embedder = EmbeddingClient(client=bedrock)
+    return stub
+
+
+def post(port: int, path: str, stream: bool):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    headers = {"Content-Type": "application/json"}
+    if stream:
+        headers["Accept"] = "text/event-stream"
+    t0 = time.perf_counter()
+    conn.request("POST", path, body=json.dumps({"question": QUESTION}), headers=headers)
+    resp = conn.getresponse()
+    ttft = None
+    events = 0
+    buf = b""
+    while True:
+        data = resp.read1(65536)
+        if not data:
+            break
+        buf += data
+        if ttft is None and b"event: token" in buf:
+            ttft = time.perf_counter() - t0
+        events = buf.count(b"\n\n")
+    total = time.perf_counter() - t0
+    conn.close()
+    return {
+        "status": resp.status,
+        "ttft_sec": round(ttft if ttft is not None else total, 3),
+        "total_sec": round(total, 3),
+        "events": events if stream else None,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model-latency-ms", type=float, default=150)
+    ap.add_argument("--token-ms", type=float, default=15)
+    ap.add_argument("--tool-latency-ms", type=float, default=300)
+    args = ap.parse_args()
+
+    stub = setup(args)
+    import stream_server
+
+    server = stream_server.serve(0)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # warm both paths once so caches/graph compilation don't skew the numbers
+    post(port, "/chat", stream=False)
+    post(port, "/chat/stream", stream=True)
+
+    import answer_cache
+    import tools.serpapi_jobs as jobs
+    import tools.tavily_search as web
+    import rag.s3_vector as rag
+
+    # the answer cache included: a cached answer skips the whole pipeline
+    caches = [c for c in (answer_cache.answer_cache, jobs.jobs_cache, web.web_cache,
+                          rag.embedding_cache, rag.result_cache) if c is not None]
+    for c in caches:
+        c.clear()
+
+    buffered = post(port, "/chat", stream=False)
+    for c in caches:
+        c.clear()
+    streamed = post(port, "/chat/stream", stream=True)
+
+    print(json.dumps({"buffered": buffered, "streamed": streamed}, indent=2))
+    server.shutdown()
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Local stand-in for SerpAPI (GET /search.json) and Tavily (POST /search).
+Responses are deterministic per query; latency is configurable.
+
+    python scripts/stub_search_api.py --port 8765 --latency-ms 300
+    SERPAPI_ENDPOINT=http://127.0.0.1:8765/search.json \
+    TAVILY_SEARCH_ENDPOINT=http://127.0.0.1:8765/search ...
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def _jobs(query: str, location: str) -> dict:
+    return {
+        "jobs_results": [
+            {
+                "title": f"{query.title()} Engineer {i}",
+                "company_name": f"Company {i}",
+                "location": location,
+                "via": "via Stub",
+                "detected_extensions": {"posted_at": f"{i + 1} days ago"},
+                "description": f"Work on {query} systems using Python, SQL and cloud services. " * 4,
+                "apply_options": [{"title": "Stub", "link": f"https://jobs.example/{i}"}],
+            }
+            for i in range(10)
+        ]
+    }
+
+
+def _web(query: str, max_results: int) -> dict:
+    return {
+        "query": query,
+        "answer": f"Students targeting {query} should build end-to-end portfolio projects.",
+        "results": [
+            {
+                "title": f"Project idea {i} for {query}",
+                "url": f"https://blog.example/{i}",
+                "content": f"Idea {i}: build and deploy a {query} pipeline with monitoring. " * 3,
+                "score": round(1 - i * 0.1, 2),
+            }
+            for i in range(max_results)
+        ],
+    }
+
+
+def make_handler(latency: float, counts: dict):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+        # headers and body are separate writes; with Nagle on, the body
+        # waits out the client's delayed ACK (~40 ms) on every response
+        disable_nagle_algorithm = True
+
+        def _send(self, obj: dict, status: int = 200):
+            body = json.dumps(obj).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/stats":
+                return self._send(counts)
+            if url.path != "/search.json":
+                return self._send({"error": "not found"}, 404)
+            q = parse_qs(url.query)
+            counts["serpapi"] = counts.get("serpapi", 0) + 1
+            time.sleep(latency)
+            self._send(_jobs(q.get("q", [""])[0], q.get("location", [""])[0]))
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/search":
+                return self._send({"error": "not found"}, 404)
+            n = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(n) or b"{}")
+            counts["tavily"] = counts.get("tavily", 0) + 1
+            time.sleep(latency)
+            self._send(_web(body.get("query", ""), int(body.get("max_results", 5))))
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_stub(port: int = 0, latency_ms: float = 200.0):
+    """
+    Start the stub on a daemon thread. Returns (server, base_url, counts).
+    """
+    counts: dict = {}
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency_ms / 1000.0, counts))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", counts
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=200.0)
+    args = ap.parse_args()
+    server, base, _ = start_stub(args.port, args.latency_ms)
+    print(f"stub search API on {base} (Ctrl-C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
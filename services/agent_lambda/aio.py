@@ -0,0 +1,37 @@
+"""
+One event loop per container, running on a daemon thread for the life of the
+process. Sync entry points (the Lambda handler, the threaded HTTP server)
+submit coroutines to it, so concurrent requests share the loop and, through
+it, the pooled async HTTP client, whose keep-alive connections belong to this
+loop and survive across warm invocations.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _thread
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                _thread = threading.Thread(target=loop.run_forever, name="agent-loop", daemon=True)
+                _thread.start()
+                _loop = loop
+    return _loop
+
+
+def run(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the container loop and block until it finishes.
+    Not for use from the loop's own thread; await the coroutine there.
+    """
+    loop = get_loop()
+    if threading.current_thread() is _thread:
+        raise RuntimeError("aio.run() called from the agent loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
@@ -0,0 +1,124 @@
+"""
+Semantic answer cache: a question whose embedding is within
+ANSWER_CACHE_THRESHOLD (cosine similarity) of one answered recently gets the
+stored answer without running the graph, so a paraphrase doesn't pay for
+another synthesis.
+
+An answer is only served while the data behind it is still current:
+- the catalog version (ingest's version object) is unchanged;
+- the job listings and web results it was built from are younger than the
+  tools' own cache TTLs and haven't been refreshed since.
+Answers from runs where a branch failed or timed out are not stored.
+
+In-process only, like the level 1 retrieval caches: it survives warm
+invocations and is shared by every request of the ASGI server.
+ANSWER_CACHE_SIZE=0 turns it off.
+"""
+import os
+import time
+from typing import Optional
+
+import rag.s3_vector as rag
+from agent_core.cache import SemanticCache
+from graph import web_query
+from tools.serpapi_jobs import jobs_cache, jobs_cache_key
+from tools.tavily_search import web_cache, web_cache_key
+
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", "256"))
+ANSWER_CACHE_TTL_SEC = float(os.environ.get("ANSWER_CACHE_TTL_SEC", "3600"))
+# High enough that only rewordings of the same question match; lowering it
+# buys hit rate at the risk of answering a neighbouring question.
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.95"))
+
+answer_cache = (
+    SemanticCache(ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL_SEC, ANSWER_CACHE_THRESHOLD, name="answer")
+    if ANSWER_CACHE_SIZE > 0 else None
+)
+
+
+def _snapshot(question: str) -> dict:
+    """
+    Versions of the data an answer to `question` was just built from.
+    """
+    jobs_key = jobs_cache_key(question)
+    web_key = web_cache_key(web_query(question))
+    return {
+        "catalog": rag.catalog_version(),
+        "jobs": (jobs_key, jobs_cache.fetched_at(jobs_key)),
+        "web": (web_key, web_cache.fetched_at(web_key)),
+    }
+
+
+def _current(snapshot: dict) -> bool:
+    if snapshot["catalog"] != rag.catalog_version():
+        return False
+    now = time.time()
+    for cache, (key, fetched) in ((jobs_cache, snapshot["jobs"]), (web_cache, snapshot["web"])):
+        if fetched is None:
+            continue  # tool not configured; nothing to go stale
+        if now - fetched >= cache.ttl:
+            return False
+        latest = cache.fetched_at(key)
+        if latest is not None and latest != fetched:
+            return False  # refreshed since the answer was written
+    return True
+
+
+def _lookup(qvec: list) -> Optional[str]:
+    return answer_cache.get(qvec, valid=_current)
+
+
+def _store(question: str, qvec: list, answer: str) -> None:
+    answer_cache.set(qvec, answer, meta=_snapshot(question))
+
+
+def cacheable(state: dict, answer: str) -> bool:
+    return answer_cache is not None and bool(answer) and not state.get("errors")
+
+
+# A failing lookup or store (e.g. the embedding call) only costs the cache;
+# the request goes on through the graph, which handles its own failures.
+
+def lookup(question: str) -> Optional[str]:
+    if answer_cache is None:
+        return None
+    try:
+        return _lookup(rag.embed_question(question))
+    except Exception as e:
+        print("WARN: answer cache lookup failed:", str(e))
+        return None
+
+
+async def alookup(question: str) -> Optional[str]:
+    if answer_cache is None:
+        return None
+    try:
+        qvec = await rag.aembed_question(question)
+        # the scan and version check block; keep them off the loop
+        return await rag.in_aws_pool(_lookup, qvec)
+    except Exception as e:
+        print("WARN: answer cache lookup failed:", str(e))
+        return None
+
+
+def store(question: str, state: dict, answer: str) -> None:
+    if not cacheable(state, answer):
+        return
+    try:
+        _store(question, rag.embed_question(question), answer)
+    except Exception as e:
+        print("WARN: answer cache store failed:", str(e))
+
+
+async def astore(question: str, state: dict, answer: str) -> None:
+    if not cacheable(state, answer):
+        return
+    try:
+        qvec = await rag.aembed_question(question)
+        await rag.in_aws_pool(_store, question, qvec, answer)
+    except Exception as e:
+        print("WARN: answer cache store failed:", str(e))
+
+
+def stats() -> Optional[dict]:
+    return answer_cache.stats() if answer_cache is not None else None
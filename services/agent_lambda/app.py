@@ -1,16 +1,56 @@
 import json
 import base64
+import asyncio
+import os
+import threading
+
+import aio
+import answer_cache
+from agent_core import tracing
 from graph import build_graph
+from rag.s3_vector import abedrock_stream_answer, bedrock_stream_answer
+
+# Compiled graphs, built on first use. AGENT_PRELOAD=graph,context builds them
+# during module init instead; worth it only where init runs ahead of traffic
+# (provisioned concurrency, SnapStart), otherwise the first request pays
+# either way and health checks / bad requests would pay for nothing.
+AGENT_PRELOAD = {p.strip() for p in os.environ.get("AGENT_PRELOAD", "").split(",") if p.strip()}
+
+# Questions accepted in one {"questions": [...]} request; they run
+# concurrently on the container's event loop.
+MAX_BATCH = int(os.environ.get("AGENT_MAX_BATCH", "16"))
+
+# {"timing": true} in a request adds a per-node / per-call timing breakdown
+# to the response; TRACE_RESPONSE_TIMING=0 ignores it.
+TRACE_RESPONSE_TIMING = os.environ.get("TRACE_RESPONSE_TIMING", "1") != "0"
 
 graph = None
+context_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph(synthesize: bool = True):
+    global graph, context_graph
+    if (graph if synthesize else context_graph) is None:
+        with _graph_lock:
+            if synthesize and graph is None:
+                graph = build_graph()
+            elif not synthesize and context_graph is None:
+                context_graph = build_graph(synthesize=False)
+    return graph if synthesize else context_graph
+
+
+if "graph" in AGENT_PRELOAD:
+    get_graph()
+if "context" in AGENT_PRELOAD:
+    get_graph(synthesize=False)
+
+
+def parse_request(event) -> dict:
+    payload = {}
 
-def lambda_handler(event, context):
-    question = ""
-    global graph
-    if graph is None:
-        graph=build_graph()
     # ---- Case 1: API Gateway invocation ----
-    body = event.get("body")
+    body = (event or {}).get("body")
     if body is not None:
         if event.get("isBase64Encoded"):
             body = base64.b64decode(body).decode("utf-8")
@@ -20,29 +60,171 @@ def lambda_handler(event, context):
         except Exception:
             payload = {}
 
-        question = payload.get("question", "")
-
     # ---- Case 2: Lambda console test ----
-    if not question:
-        question = (event or {}).get("question", "")
+    if not payload.get("question"):
+        payload = {**payload, "question": (event or {}).get("question", "")}
+
+    return payload
+
+
+def wants_stream(event, payload: dict) -> bool:
+    headers = {k.lower(): v for k, v in ((event or {}).get("headers") or {}).items()}
+    return bool(payload.get("stream")) or "text/event-stream" in (headers.get("accept") or "")
+
+
+def wants_timing(payload: dict) -> bool:
+    return TRACE_RESPONSE_TIMING and bool(payload.get("timing"))
+
+
+def lambda_handler(event, context):
+    payload = parse_request(event)
+    question = payload.get("question", "")
+    timing = wants_timing(payload)
+
+    questions = payload.get("questions")
+    if isinstance(questions, list) and questions:
+        if len(questions) > MAX_BATCH:
+            return _resp(400, {"error": f"at most {MAX_BATCH} questions per request"})
+        return _resp(200, {"answers": aio.run(answer_batch([str(q) for q in questions], timing))})
 
     if not question:
         return _resp(400, {"answer": "No question provided"})
 
+    # Buffered Lambda responses can't stream, but returning the same SSE
+    # framing keeps one client code path; stream_server.py streams for real.
+    if wants_stream(event, payload):
+        body = "".join(sse(name, data) for name, data in iter_answer_events(question, timing))
+        return _resp(200, body, content_type="text/event-stream")
+
     # Run LangGraph workflow
-    result = graph.invoke({"question": question})
+    trace = tracing.Trace("chat")
+    body = {"answer": aio.run(answer(question, trace))}
+    if timing:
+        body["timing"] = trace.breakdown()
+    return _resp(200, body)
+
+
+async def answer(question: str, trace: tracing.Trace | None = None) -> str:
+    """
+    Answer one question from the answer cache, or by running the graph. Pass
+    a Trace to read its breakdown() afterwards; either way the request is
+    traced.
+    """
+    with tracing.start("chat", trace):
+        cached = await answer_cache.alookup(question)
+        if cached is not None:
+            return cached
+        result = await get_graph().ainvoke({"question": question})
+        text = result.get("answer", "")
+        await answer_cache.astore(question, result, text)
+    return text
+
+
+async def answer_batch(questions: list, timing: bool = False) -> list:
+    """
+    Answer several questions concurrently; one failing doesn't fail the rest.
+    """
+    traces = [tracing.Trace("chat") for _ in questions]
+    results = await asyncio.gather(*(answer(q, t) for q, t in zip(questions, traces)), return_exceptions=True)
+    out = []
+    for q, r, t in zip(questions, results, traces):
+        if isinstance(r, Exception):
+            print("ERROR: batch question failed:", str(r))
+            item = {"question": q, "error": str(r)}
+        else:
+            item = {"question": q, "answer": r}
+        if timing:
+            item["timing"] = t.breakdown()
+        out.append(item)
+    return out
+
+
+def iter_answer_events(question: str, timing: bool = False):
+    """
+    Run the fetch fan-out, then stream the synthesis. Yields (event, data):
+    ("context", {...}) once, ("token", {"text": ...}) per delta, then
+    ("done", {...}) or ("error", {...}). With timing, "done" carries the
+    trace breakdown. A cached answer comes back as a single token.
+    """
+    with tracing.start("stream") as trace:
+        cached = answer_cache.lookup(question)
+        if cached is not None:
+            yield from _cached_events(cached, trace if timing else None)
+            return
+
+        state = aio.run(get_graph(synthesize=False).ainvoke({"question": question}))
+        yield "context", {"errors": state.get("errors", [])}
+
+        parts = []
+        try:
+            for text in bedrock_stream_answer(
+                question=question,
+                utd_context=state.get("utd_context", ""),
+                jobs=state.get("jobs", {}),
+                web=state.get("web", {}),
+            ):
+                parts.append(text)
+                yield "token", {"text": text}
+        except Exception as e:
+            print("ERROR: stream failed:", str(e))
+            yield "error", {"message": str(e)}
+            return
+        text = "".join(parts)
+        answer_cache.store(question, state, text)
+        yield "done", {"chars": len(text), **({"timing": trace.breakdown()} if timing else {})}
+
+
+async def aiter_answer_events(question: str, timing: bool = False):
+    """
+    iter_answer_events for async servers; same events.
+    """
+    with tracing.start("stream") as trace:
+        cached = await answer_cache.alookup(question)
+        if cached is not None:
+            for event in _cached_events(cached, trace if timing else None):
+                yield event
+            return
+
+        state = await get_graph(synthesize=False).ainvoke({"question": question})
+        yield "context", {"errors": state.get("errors", [])}
+
+        parts = []
+        try:
+            async for text in abedrock_stream_answer(
+                question=question,
+                utd_context=state.get("utd_context", ""),
+                jobs=state.get("jobs", {}),
+                web=state.get("web", {}),
+            ):
+                parts.append(text)
+                yield "token", {"text": text}
+        except Exception as e:
+            print("ERROR: stream failed:", str(e))
+            yield "error", {"message": str(e)}
+            return
+        text = "".join(parts)
+        await answer_cache.astore(question, state, text)
+        yield "done", {"chars": len(text), **({"timing": trace.breakdown()} if timing else {})}
+
+
+def _cached_events(text: str, trace: tracing.Trace | None):
+    yield "context", {"errors": []}
+    yield "token", {"text": text}
+    yield "done", {"chars": len(text), **({"timing": trace.breakdown()} if trace is not None else {})}
+
 
-    return _resp(200, {"answer": result.get("answer", "")})
+def sse(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
 
 
-def _resp(status, obj):
+def _resp(status, obj, content_type="application/json"):
     return {
         "statusCode": status,
         "headers": {
-            "Content-Type": "application/json",
+            "Content-Type": content_type,
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Headers": "Content-Type,Authorization",
             "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
         },
-        "body": json.dumps(obj),
+        "body": obj if isinstance(obj, str) else json.dumps(obj),
     }
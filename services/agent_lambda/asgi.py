@@ -0,0 +1,269 @@
+"""
+ASGI entry point for running the agent as a long-lived service (ECS, App
+Runner, a plain VM) rather than one request per Lambda invocation:
+
+    uvicorn asgi:application --host 0.0.0.0 --port 8080
+
+One worker process serves every request on a single event loop, sharing the
+compiled graph, the pooled HTTP client, the AWS clients and all caches.
+Question embeddings that miss the cache are micro-batched across concurrent
+requests (EMBED_BATCH_WINDOW_MS, default 5 ms here).
+
+Admission: at most SERVER_MAX_CONCURRENCY requests run the graph at once,
+up to SERVER_MAX_QUEUE more wait for a slot, anything beyond that gets a 503
+with Retry-After. GET /metrics reports in-flight and queued requests,
+latency percentiles, batcher and cache stats (the answer cache included),
+and the tracing histograms (per node, step, tool and AWS call).
+
+Routes match stream_server.py: GET /health, POST /chat, POST /chat/stream.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+os.environ.setdefault("EMBED_BATCH_WINDOW_MS", "5")
+
+import answer_cache  # noqa: E402
+import app  # noqa: E402
+from agent_core import tracing  # noqa: E402
+import rag.s3_vector as rag  # noqa: E402
+from tools import serpapi_jobs, tavily_search  # noqa: E402
+from tools.http_session import aclose_async_client  # noqa: E402
+
+SERVER_MAX_CONCURRENCY = int(os.environ.get("SERVER_MAX_CONCURRENCY", "32"))
+SERVER_MAX_QUEUE = int(os.environ.get("SERVER_MAX_QUEUE", "128"))
+SERVER_RETRY_AFTER_SEC = int(os.environ.get("SERVER_RETRY_AFTER_SEC", "1"))
+SERVER_MAX_BODY_BYTES = int(os.environ.get("SERVER_MAX_BODY_BYTES", "65536"))
+
+CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-headers", b"Content-Type,Authorization"),
+    (b"access-control-allow-methods", b"GET,POST,OPTIONS"),
+]
+
+
+class Overloaded(Exception):
+    pass
+
+
+class Admission:
+    """
+    Concurrency limit plus a bounded wait queue, with the counters /metrics
+    reports. Latencies are kept for the last 2048 admitted requests.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+        self.inflight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.served = 0
+        self.failed = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=2048)
+        self.queue_waits = deque(maxlen=2048)
+
+    def slot(self):
+        return _Slot(self)
+
+    def stats(self) -> dict:
+        return {
+            "inflight": self.inflight,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "served": self.served,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "latency_ms": _percentiles(self.latencies),
+            "queue_wait_ms": _percentiles(self.queue_waits),
+        }
+
+
+class _Slot:
+    def __init__(self, admission: Admission):
+        self.a = admission
+        self.t0 = 0.0
+
+    async def __aenter__(self):
+        a = self.a
+        if a._sem.locked() and a.waiting >= a.max_queue:
+            a.rejected += 1
+            raise Overloaded()
+        self.t0 = time.perf_counter()
+        a.waiting += 1
+        a.max_waiting = max(a.max_waiting, a.waiting)
+        try:
+            await a._sem.acquire()
+        finally:
+            a.waiting -= 1
+        a.queue_waits.append(time.perf_counter() - self.t0)
+        a.inflight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        a = self.a
+        a.inflight -= 1
+        a._sem.release()
+        if exc_type is None:
+            a.served += 1
+            a.latencies.append(time.perf_counter() - self.t0)
+        else:
+            a.failed += 1
+        return False
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    s = sorted(samples)
+
+    def pct(p):
+        return round(1000 * s[min(len(s) - 1, int(p * len(s)))], 1)
+
+    return {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99)}
+
+
+admission = Admission(SERVER_MAX_CONCURRENCY, SERVER_MAX_QUEUE)
+
+
+def metrics() -> dict:
+    batcher = rag.embed_batcher
+    return {
+        "server": admission.stats(),
+        "embed_batcher": batcher.stats() if batcher is not None else None,
+        "caches": {
+            "answer": answer_cache.stats(),
+            "embedding": rag.embedding_cache.stats(),
+            "result": rag.result_cache.stats(),
+            "jobs": serpapi_jobs.jobs_cache.stats(),
+            "web": tavily_search.web_cache.stats(),
+        },
+        "tracing": tracing.registry.snapshot(),
+    }
+
+
+async def _send_json(send, status: int, obj: dict, extra=()):
+    body = json.dumps(obj).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()), *CORS_HEADERS, *extra],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ConnectionError("client disconnected")
+        body += message.get("body", b"")
+        if len(body) > SERVER_MAX_BODY_BYTES:
+            raise ValueError("request body too large")
+        if not message.get("more_body"):
+            return body
+
+
+async def _stream(send, question: str, timing: bool = False):
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"), *CORS_HEADERS],
+    })
+    try:
+        async for name, data in app.aiter_answer_events(question, timing):
+            await send({"type": "http.response.body", "body": app.sse(name, data).encode("utf-8"),
+                        "more_body": True})
+    except Exception as e:
+        print("ERROR:", str(e))
+        await send({"type": "http.response.body", "body": app.sse("error", {"message": str(e)}).encode("utf-8"),
+                    "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _chat(scope, receive, send, path: str):
+    try:
+        raw = await _read_body(receive)
+    except ValueError as e:
+        return await _send_json(send, 413, {"error": str(e)})
+
+    headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+    event = {"body": raw.decode("utf-8"), "headers": headers}
+    payload = app.parse_request(event)
+    question = payload.get("question", "")
+    timing = app.wants_timing(payload)
+    questions = payload.get("questions")
+    batch = isinstance(questions, list) and bool(questions)
+    if not question and not batch:
+        return await _send_json(send, 400, {"answer": "No question provided"})
+    if batch and len(questions) > app.MAX_BATCH:
+        return await _send_json(send, 400, {"error": f"at most {app.MAX_BATCH} questions per request"})
+
+    try:
+        async with admission.slot():
+            if batch:
+                answers = await app.answer_batch([str(q) for q in questions], timing)
+                return await _send_json(send, 200, {"answers": answers})
+            if path == "/chat/stream" or app.wants_stream(event, payload):
+                return await _stream(send, question, timing)
+            trace = tracing.Trace("chat")
+            body = {"answer": await app.answer(question, trace)}
+            if timing:
+                body["timing"] = trace.breakdown()
+            return await _send_json(send, 200, body)
+    except Overloaded:
+        return await _send_json(send, 503, {"error": "server busy, retry later"},
+                                [(b"retry-after", str(SERVER_RETRY_AFTER_SEC).encode())])
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                # compile both graphs before taking traffic
+                app.get_graph()
+                app.get_graph(synthesize=False)
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await aclose_async_client()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    method, path = scope["method"], scope["path"].rstrip("/") or "/"
+    try:
+        if method == "OPTIONS":
+            await send({"type": "http.response.start", "status": 204,
+                        "headers": [(b"content-length", b"0"), *CORS_HEADERS]})
+            return await send({"type": "http.response.body", "body": b""})
+        if method == "GET" and path == "/health":
+            return await _send_json(send, 200, {"ok": True})
+        if method == "GET" and path == "/metrics":
+            return await _send_json(send, 200, metrics())
+        if method == "POST" and path in ("/chat", "/chat/stream"):
+            return await _chat(scope, receive, send, path)
+        await _send_json(send, 404, {"error": "not found"})
+    except ConnectionError:
+        pass
+    except Exception as e:
+        print("ERROR:", str(e))
+        await _send_json(send, 500, {"error": str(e)})
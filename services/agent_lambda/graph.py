@@ -1,9 +1,22 @@
+import os
+import asyncio
+import operator
+from typing import Annotated
+
 from typing_extensions import TypedDict, NotRequired
-from langgraph.graph import StateGraph, START, END
 
-from rag.s3_vector import retrieve_utd_context, bedrock_synthesize_answer
-from tools.serpapi_jobs import serpapi_google_jobs
-from tools.tavily_search import tavily_web_search
+from agent_core.tracing import traced
+from rag.s3_vector import aretrieve_utd_context, abedrock_synthesize_answer
+from tools.serpapi_jobs import aserpapi_google_jobs
+from tools.tavily_search import atavily_web_search
+
+# Per-branch deadlines (seconds). Each fetch runs concurrently on the event
+# loop; a branch that misses its deadline is cancelled and synthesis proceeds
+# with partial results. (A cancelled AWS call still finishes on its pool
+# thread; HTTP tool calls are cancelled outright.)
+RETRIEVE_DEADLINE_SEC = float(os.environ.get("RETRIEVE_DEADLINE_SEC", "12"))
+JOBS_DEADLINE_SEC = float(os.environ.get("JOBS_DEADLINE_SEC", "10"))
+WEB_DEADLINE_SEC = float(os.environ.get("WEB_DEADLINE_SEC", "10"))
 
 
 class GraphState(TypedDict):
@@ -12,47 +25,111 @@ class GraphState(TypedDict):
     jobs: NotRequired[dict]
     web: NotRequired[dict]
     answer: NotRequired[str]
+    # Branches that timed out or failed; merged across the parallel fan-out.
+    # (Not wrapped in NotRequired: langgraph only sees the reducer on a bare
+    # Annotated, and two branches failing in one step would be rejected.)
+    errors: Annotated[list, operator.add]
+
+
+def web_query(question: str) -> str:
+    return f"Ideal student project ideas based on job market demand: {question}"
+
+
+async def _with_deadline(branch: str, deadline: float, coro):
+    """
+    Await coro for at most `deadline` seconds.
+    Returns (result, error) where error is None on success.
+    """
+    try:
+        return await asyncio.wait_for(coro, deadline), None
+    except asyncio.TimeoutError:
+        print(f"WARN: {branch} exceeded {deadline}s deadline")
+        return None, {"branch": branch, "error": f"timeout after {deadline}s"}
+    except asyncio.CancelledError:
+        # a cancellation aimed at this task (the run itself is being torn
+        # down) propagates; one raised by something the branch awaited is
+        # just a failed branch
+        if asyncio.current_task().cancelling():
+            raise
+        print(f"WARN: {branch} was cancelled")
+        return None, {"branch": branch, "error": "cancelled"}
+    except Exception as e:
+        print(f"WARN: {branch} failed: {e}")
+        return None, {"branch": branch, "error": str(e)}
+
+
+@traced("node", "retrieve_catalog")
+async def node_retrieve(state: GraphState) -> dict:
+    ctx, err = await _with_deadline(
+        "retrieve_catalog", RETRIEVE_DEADLINE_SEC, aretrieve_utd_context(state["question"])
+    )
+    if err:
+        return {"utd_context": "", "errors": [err]}
+    return {"utd_context": ctx}
 
 
-def node_retrieve(state: GraphState) -> GraphState:
-    ctx = retrieve_utd_context(state["question"])
-    return {**state, "utd_context": ctx}
-
-
-def node_fetch_jobs(state: GraphState) -> GraphState:
-    jobs_data = serpapi_google_jobs(query=state["question"])
-    return {**state, "jobs": jobs_data}
+@traced("node", "fetch_jobs")
+async def node_fetch_jobs(state: GraphState) -> dict:
+    jobs_data, err = await _with_deadline(
+        "fetch_jobs", JOBS_DEADLINE_SEC, aserpapi_google_jobs(query=state["question"])
+    )
+    if err:
+        return {"jobs": {"error": err["error"]}, "errors": [err]}
+    return {"jobs": jobs_data}
 
 
-def node_fetch_web(state: GraphState) -> GraphState:
-    web_data = tavily_web_search(
-        query=f"Ideal student project ideas based on job market demand: {state['question']}"
+@traced("node", "fetch_web")
+async def node_fetch_web(state: GraphState) -> dict:
+    web_data, err = await _with_deadline(
+        "fetch_web",
+        WEB_DEADLINE_SEC,
+        atavily_web_search(query=web_query(state["question"])),
     )
-    return {**state, "web": web_data}
+    if err:
+        return {"web": {"error": err["error"]}, "errors": [err]}
+    return {"web": web_data}
 
 
-def node_synthesize(state: GraphState) -> GraphState:
-    answer = bedrock_synthesize_answer(
+@traced("node", "synthesize_answer")
+async def node_synthesize(state: GraphState) -> dict:
+    answer = await abedrock_synthesize_answer(
         question=state["question"],
         utd_context=state.get("utd_context", ""),
         jobs=state.get("jobs", {}),
         web=state.get("web", {}),
     )
-    return {**state, "answer": answer}
+    return {"answer": answer}
+
 
+def build_graph(synthesize: bool = True):
+    """
+    With synthesize=False the graph stops after the fan-in and returns the
+    gathered context, so the caller can stream the answer itself. Nodes are
+    coroutines: run the graph with ainvoke (aio.run from sync code).
+    """
+    # langgraph (and langchain_core under it) is most of the cold-start
+    # import time; only pay for it when a graph is actually built.
+    from langgraph.graph import StateGraph, START, END
 
-def build_graph():
     g = StateGraph(GraphState)
 
     g.add_node("retrieve_catalog", node_retrieve)
     g.add_node("fetch_jobs", node_fetch_jobs)
     g.add_node("fetch_web", node_fetch_web)
-    g.add_node("synthesize_answer", node_synthesize)
+    if synthesize:
+        g.add_node("synthesize_answer", node_synthesize)
 
+    # Fan out: the three fetches are independent and run in the same step.
     g.add_edge(START, "retrieve_catalog")
-    g.add_edge("retrieve_catalog", "fetch_jobs")
-    g.add_edge("fetch_jobs", "fetch_web")
-    g.add_edge("fetch_web", "synthesize_answer")
-    g.add_edge("synthesize_answer", END)
+    g.add_edge(START, "fetch_jobs")
+    g.add_edge(START, "fetch_web")
+
+    # Fan in: synthesis waits for every branch (each is bounded by its deadline).
+    if synthesize:
+        g.add_edge(["retrieve_catalog", "fetch_jobs", "fetch_web"], "synthesize_answer")
+        g.add_edge("synthesize_answer", END)
+    else:
+        for node in ("retrieve_catalog", "fetch_jobs", "fetch_web"):
+            g.add_edge(node, END)
 
     return g.compile()
@@ -0,0 +1,194 @@
+import json
+import os
+import re
+from typing import Iterable, List, Optional
+
+from agent_core.chunking import approx_tokens
+from agent_core.lexical import tokenize
+
+# Total input tokens for the three context sections together. The prompt
+# template and question come on top of this.
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "4000"))
+# No single source takes more than this share before the others are seated.
+CONTEXT_SOURCE_CAP = float(os.environ.get("CONTEXT_SOURCE_CAP", "0.6"))
+# Source weights when ranking items against each other.
+CONTEXT_WEIGHTS = {
+    "catalog": float(os.environ.get("CONTEXT_WEIGHT_CATALOG", "1.0")),
+    "jobs": float(os.environ.get("CONTEXT_WEIGHT_JOBS", "0.8")),
+    "web": float(os.environ.get("CONTEXT_WEIGHT_WEB", "0.6")),
+}
+JOB_SNIPPET_CHARS = int(os.environ.get("JOB_SNIPPET_CHARS", "400"))
+WEB_SNIPPET_CHARS = int(os.environ.get("WEB_SNIPPET_CHARS", "500"))
+
+CATALOG_SEPARATOR = "\n\n---\n\n"
+# smallest truncated item worth sending
+_MIN_ITEM_TOKENS = 40
+_SPACE = re.compile(r"\s+")
+
+
+class _Item:
+    __slots__ = ("source", "rank", "text", "score", "tokens")
+
+    def __init__(self, source: str, rank: int, text: str):
+        self.source = source
+        self.rank = rank
+        self.text = text
+        self.score = 0.0
+        self.tokens = approx_tokens(text)
+
+
+def _clip(text: Optional[str], chars: int) -> str:
+    text = _SPACE.sub(" ", text or "").strip()
+    if len(text) <= chars:
+        return text
+    cut = text.rfind(" ", 0, chars)
+    return text[: cut if cut > chars // 2 else chars] + " ..."
+
+
+def _compact(obj: dict) -> str:
+    return json.dumps({k: v for k, v in obj.items() if v not in (None, "", [], {})},
+                      ensure_ascii=False, separators=(",", ":"))
+
+
+def _catalog_items(utd_context: str) -> List[_Item]:
+    parts = [p.strip() for p in (utd_context or "").split(CATALOG_SEPARATOR)]
+    return [_Item("catalog", i, p) for i, p in enumerate(p for p in parts if p)]
+
+
+def _job_items(jobs: dict) -> List[_Item]:
+    """
+    One compact JSON line per posting; apply links and empty fields dropped.
+    """
+    if not isinstance(jobs, dict):
+        return []
+    if jobs.get("error"):
+        return [_Item("jobs", 0, _compact({"error": str(jobs["error"])[:200]}))]
+    out = []
+    for i, j in enumerate(jobs.get("jobs") or []):
+        out.append(_Item("jobs", i, _compact({
+            "title": j.get("title"),
+            "company": j.get("company"),
+            "location": j.get("location"),
+            "posted": j.get("posted_at"),
+            "snippet": _clip(j.get("description_snippet"), JOB_SNIPPET_CHARS),
+        })))
+    return out
+
+
+def _web_items(web: dict) -> List[_Item]:
+    """
+    Tavily's synthesized answer first, then one compact line per result;
+    raw payload fields (images, response_time, raw_content, ...) dropped.
+    """
+    if not isinstance(web, dict):
+        return []
+    if web.get("error"):
+        return [_Item("web", 0, _compact({"error": str(web["error"])[:200]}))]
+    out = []
+    if web.get("answer"):
+        out.append(_Item("web", 0, _compact({"answer": _clip(web["answer"], WEB_SNIPPET_CHARS)})))
+    for r in web.get("results") or []:
+        out.append(_Item("web", len(out), _compact({
+            "title": r.get("title"),
+            "url": r.get("url"),
+            "content": _clip(r.get("content"), WEB_SNIPPET_CHARS),
+        })))
+    return out
+
+
+def _score(items: List[_Item], question_terms: set) -> None:
+    """
+    Relevance = source weight x (retrieval/search rank prior + share of the
+    question's terms the item contains).
+    """
+    for it in items:
+        overlap = len(question_terms & set(tokenize(it.text))) / len(question_terms) if question_terms else 0.0
+        it.score = CONTEXT_WEIGHTS.get(it.source, 1.0) * (0.5 / (1 + it.rank) + 0.5 * overlap)
+
+
+def _dedupe_lines(items: Iterable[_Item]) -> None:
+    """
+    Drop lines already sent by a higher-scored item. Adjacent catalog chunks
+    repeat their overlap lines, and the same course text turns up in several
+    chunks; short lines (headings, separators) are left alone.
+    """
+    seen = set()
+    for it in items:
+        kept = []
+        for line in it.text.split("\n"):
+            norm = _SPACE.sub(" ", line).strip().lower()
+            if len(norm) >= 40:
+                if norm in seen:
+                    continue
+                seen.add(norm)
+            kept.append(line)
+        text = re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip()
+        if text != it.text:
+            it.text = text
+            it.tokens = approx_tokens(text)
+
+
+def _truncate(text: str, tokens: int) -> str:
+    chars = tokens * 4
+    if len(text) <= chars:
+        return text
+    cut = text.rfind("\n", 0, chars)
+    if cut < chars // 2:
+        cut = text.rfind(" ", 0, chars)
+    return text[: cut if cut > 0 else chars].rstrip() + " ..."
+
+
+def pack_context(question: str, utd_context: str, jobs: dict, web: dict, budget: Optional[int] = None) -> dict:
+    """
+    Fit catalog chunks, job postings and web results into one token budget.
+    Every source with data gets its best item first (capped at
+    CONTEXT_SOURCE_CAP of the budget); the rest of the budget goes to the
+    remaining items in relevance order, truncating the last one that fits
+    only partly. Sections keep their original order.
+
+    Returns {"catalog", "jobs", "web"} text plus a "stats" dict.
+    """
+    budget = CONTEXT_TOKEN_BUDGET if budget is None else budget
+    items = _catalog_items(utd_context) + _job_items(jobs) + _web_items(web)
+    input_tokens = sum(it.tokens for it in items)
+    _score(items, set(tokenize(question or "")))
+    items.sort(key=lambda it: -it.score)
+    _dedupe_lines(items)
+    items = [it for it in items if it.text]
+
+    chosen, left = [], budget
+    cap = int(budget * CONTEXT_SOURCE_CAP)
+
+    def admit(it: _Item, limit: int) -> bool:
+        nonlocal left
+        limit = min(limit, left)
+        if it.tokens > limit:
+            if limit < _MIN_ITEM_TOKENS:
+                return False
+            it.text = _truncate(it.text, limit - 1)
+            it.tokens = approx_tokens(it.text)
+        chosen.append(it)
+        left -= it.tokens
+        return True
+
+    seated = set()
+    for it in items:
+        if it.source not in seated:
+            seated.add(it.source)
+            admit(it, cap)
+    for it in items:
+        if it not in chosen and left >= _MIN_ITEM_TOKENS:
+            admit(it, left)
+
+    sections = {}
+    for source, sep in (("catalog", CATALOG_SEPARATOR), ("jobs", "\n"), ("web", "\n")):
+        picked = sorted((it for it in chosen if it.source == source), key=lambda it: it.rank)
+        sections[source] = sep.join(it.text for it in picked)
+    sections["stats"] = {
+        "budget": budget,
+        "input_tokens": input_tokens,
+        "packed_tokens": budget - left,
+        "items": {s: sum(1 for it in chosen if it.source == s) for s in ("catalog", "jobs", "web")},
+        "dropped": len(items) - len(chosen),
+    }
+    return sections
@@ -1,67 +1,303 @@
 import os
 import json
-import boto3
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator
 
-bedrock_runtime = boto3.client("bedrock-runtime")
-s3vectors = boto3.client("s3vectors")
-s3 = boto3.client("s3")
+from agent_core import tracing
+from agent_core.aws import lazy_client
+from agent_core.cache import S3CacheBackend, TTLCache, TwoLevelCache, stable_hash
+from agent_core.chunk_store import make_chunk_store
+from agent_core.embed_batcher import EmbeddingBatcher
+from agent_core.embedding_client import EmbeddingClient
+from agent_core.lexical import (
+    course_codes,
+    load_lexical_index,
+    make_lexical_store,
+    read_lexical_snapshot,
+    reciprocal_rank_fusion,
+)
+from agent_core.vector_store import vector_store_from_env
+from rag.context import pack_context
 
-S3V_INDEX_ARN = os.environ["S3V_INDEX_ARN"]
+# created on first use, shared with every other lazy_client of the service
+bedrock_runtime = lazy_client("bedrock-runtime")
+s3 = lazy_client("s3")
+
+# S3 Vectors via S3V_INDEX_ARN, or VECTOR_STORE_BACKEND=local for offline runs
+vector_store = vector_store_from_env(read_only=True)
 
 EMBED_MODEL_ID = os.environ.get("EMBED_MODEL_ID", "amazon.titan-embed-text-v2:0")
 CHAT_MODEL_ID = os.environ.get("CHAT_MODEL_ID", "anthropic.claude-3-5-sonnet-20240620-v1:0")
 
 TOP_K = int(os.environ.get("TOP_K", "6"))
 
+# Level 1 caches live at module scope and survive warm invocations; level 2
+# (shared across containers) is enabled by setting RETRIEVAL_CACHE_BUCKET.
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "512"))
+QUERY_CACHE_TTL_SEC = float(os.environ.get("QUERY_CACHE_TTL_SEC", "86400"))
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "256"))
+RESULT_CACHE_TTL_SEC = float(os.environ.get("RESULT_CACHE_TTL_SEC", "900"))
+RETRIEVAL_CACHE_BUCKET = os.environ.get("RETRIEVAL_CACHE_BUCKET", "")
+RETRIEVAL_CACHE_PREFIX = os.environ.get("RETRIEVAL_CACHE_PREFIX", "agent-cache/")
+
+# Ingest bumps this object whenever the index changes; cached results are
+# keyed on its ETag, checked at most every CATALOG_VERSION_TTL_SEC.
+CATALOG_VERSION_BUCKET = os.environ.get("CATALOG_VERSION_BUCKET", "")
+CATALOG_VERSION_KEY = os.environ.get("CATALOG_VERSION_KEY", "manifests/_catalog_version.json")
+CATALOG_VERSION_TTL_SEC = float(os.environ.get("CATALOG_VERSION_TTL_SEC", "60"))
+
+# Hybrid retrieval: BM25 over the per-document segments ingest writes, fused
+# with the vector hits by reciprocal rank fusion. Without a lexical bucket
+# (or with LEXICAL_BACKEND=none) retrieval stays vector-only.
+LEXICAL_BACKEND = os.environ.get("LEXICAL_BACKEND", "s3")
+LEXICAL_BUCKET = os.environ.get("LEXICAL_BUCKET", CATALOG_VERSION_BUCKET)
+LEXICAL_PREFIX = os.environ.get("LEXICAL_PREFIX", "lexical/")
+LEXICAL_PATH = os.environ.get("LEXICAL_PATH", "/tmp/lexical")
+# candidates taken from each ranking before fusion
+HYBRID_CANDIDATES = int(os.environ.get("HYBRID_CANDIDATES", str(TOP_K * 3)))
+RRF_K = int(os.environ.get("RRF_K", "60"))
+
+# Full chunk text written by ingest; vector metadata only carries a preview,
+# which is what we fall back to for chunks the store doesn't have.
+CHUNK_STORE_BACKEND = os.environ.get("CHUNK_STORE_BACKEND", "s3")
+CHUNK_STORE_BUCKET = os.environ.get("CHUNK_STORE_BUCKET", CATALOG_VERSION_BUCKET)
+CHUNK_STORE_PREFIX = os.environ.get("CHUNK_STORE_PREFIX", "chunks/")
+CHUNK_STORE_PATH = os.environ.get("CHUNK_STORE_PATH", "/tmp/chunks")
+
+embedder = EmbeddingClient.from_env(model_id=EMBED_MODEL_ID)
+chunk_store = make_chunk_store(
+    CHUNK_STORE_BACKEND,
+    s3_client=s3,
+    bucket=CHUNK_STORE_BUCKET,
+    prefix=CHUNK_STORE_PREFIX,
+    path=CHUNK_STORE_PATH,
+    concurrency=int(os.environ.get("CHUNK_STORE_CONCURRENCY", "8")),
+    cache_size=int(os.environ.get("CHUNK_CACHE_SIZE", "1024")),
+)
+lexical_store = make_lexical_store(
+    LEXICAL_BACKEND, s3_client=s3, bucket=LEXICAL_BUCKET, prefix=LEXICAL_PREFIX, path=LEXICAL_PATH
+)
+
+_shared = S3CacheBackend(s3, RETRIEVAL_CACHE_BUCKET, RETRIEVAL_CACHE_PREFIX) if RETRIEVAL_CACHE_BUCKET else None
+embedding_cache = TwoLevelCache(TTLCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL_SEC), _shared, name="embedding")
+result_cache = TwoLevelCache(TTLCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL_SEC), _shared, name="retrieval")
+
+# boto3 has no async API, so the async entry points run Bedrock / S3 Vectors /
+# S3 calls on this bounded pool and keep the event loop free for the other
+# questions' HTTP tools.
+AWS_IO_WORKERS = int(os.environ.get("AWS_IO_WORKERS", "16"))
+_aws_pool = None
+_aws_pool_lock = threading.Lock()
+
+# With a window > 0, question embeddings that miss the cache on the async
+# path are micro-batched (and deduplicated) across concurrent requests.
+# The batcher belongs to the event loop that first uses it.
+EMBED_BATCH_WINDOW_MS = float(os.environ.get("EMBED_BATCH_WINDOW_MS", "0"))
+EMBED_BATCH_MAX = int(os.environ.get("EMBED_BATCH_MAX", "32"))
+embed_batcher = None
+
+_catalog = {"version": "static", "checked": float("-inf")}
+_lexical = {"index": None, "version": None, "stale": False, "refreshing": False}
+_lexical_lock = threading.Lock()
+
+
+def catalog_version() -> str:
+    if not CATALOG_VERSION_BUCKET:
+        return "static"
+
+    now = time.monotonic()
+    if now - _catalog["checked"] < CATALOG_VERSION_TTL_SEC:
+        return _catalog["version"]
+    _catalog["checked"] = now
+
+    try:
+        head = s3.head_object(Bucket=CATALOG_VERSION_BUCKET, Key=CATALOG_VERSION_KEY)
+        version = head["ETag"].strip('"')
+    except Exception as e:
+        code = (getattr(e, "response", None) or {}).get("Error", {}).get("Code")
+        if code not in ("NoSuchKey", "404"):
+            # keep serving the last known version
+            print("WARN: catalog version check failed:", str(e))
+            return _catalog["version"]
+        version = "none"
+
+    if version != _catalog["version"]:
+        # results for the old index can never be hit again
+        result_cache.clear()
+        _catalog["version"] = version
+    return version
+
+
+def _normalize_question(question: str) -> str:
+    return " ".join(question.split()).strip(" ?!.")
+
 
 def _embed_query(text: str) -> list[float]:
-    resp = bedrock_runtime.invoke_model(
-        modelId=EMBED_MODEL_ID,
-        contentType="application/json",
-        accept="application/json",
-        body=json.dumps({"inputText": text}),
-    )
-    return json.loads(resp["body"].read())["embedding"]
+    with tracing.span("step", "embed", bytes_out=len(text)):
+        return embedder.embed(text)
 
 
-def retrieve_utd_context(question: str) -> str:
-    qvec = _embed_query(question)
-
-    resp = s3vectors.query_vectors(
-        indexArn=S3V_INDEX_ARN,
-        topK=TOP_K,
-        queryVector={"float32": qvec},
-        returnMetadata=True,
-        returnDistance=True,
-    )
+def _embedding_key(norm: str) -> str:
+    return "emb-" + stable_hash(EMBED_MODEL_ID, norm.lower())
+
+
+def _embed_query_cached(question: str) -> list[float]:
+    norm = _normalize_question(question)
+    return embedding_cache.get_or_compute(_embedding_key(norm), lambda: _embed_query(norm))
+
+
+def embed_question(question: str) -> list[float]:
+    """
+    The cached question embedding retrieval uses; the answer cache keys on it
+    too, so a cache miss costs no extra embedding call.
+    """
+    return _embed_query_cached(question)
 
-    vectors = resp.get("vectors", [])
-    chunks = []
 
-    for v in vectors:
-        md = v.get("metadata") or v.get("Metadata") or {}
+def lexical_index(version: str):
+    """
+    The merged BM25 index. Ingest's scheduled merge keeps the snapshot
+    current, so a cold start reads just that; a catalog version change only
+    schedules a background update (read-only: the snapshot has one writer),
+    and queries keep the index they have until it lands.
+    """
+    if lexical_store is None:
+        return None
+    with _lexical_lock:
+        if _lexical["version"] != version:
+            _lexical["version"] = version
+            if _lexical["index"] is None:
+                try:
+                    with tracing.span("step", "lexical_load"):
+                        _lexical["index"] = read_lexical_snapshot(lexical_store)
+                except Exception as e:
+                    print("WARN: lexical index load failed:", str(e))
+            _lexical["stale"] = True
+            if not _lexical["refreshing"]:
+                _lexical["refreshing"] = True
+                _get_aws_pool().submit(_refresh_lexical)
+        return _lexical["index"]
 
-        # text stored directly
-        txt = md.get("text")
-        if isinstance(txt, str) and txt.strip():
-            chunks.append(txt.strip())
+
+def _refresh_lexical() -> None:
+    # runs until no version change arrived during the last update, so the
+    # index never settles on a listing older than the current version
+    while True:
+        with _lexical_lock:
+            if not _lexical["stale"]:
+                _lexical["refreshing"] = False
+                return
+            _lexical["stale"] = False
+            current = _lexical["index"]
+        try:
+            index = load_lexical_index(lexical_store, current=current, write_back=False)
+        except Exception as e:
+            print("WARN: lexical index refresh failed:", str(e))
             continue
+        with _lexical_lock:
+            _lexical["index"] = index
+
+
+def retrieve_utd_context(question: str) -> str:
+    return _retrieve(question, _embed_query_cached(question))
 
-        # pointer stored
-        b = md.get("bucket") or md.get("source_bucket")
-        k = md.get("key") or md.get("source_key")
-        if b and k:
-            obj = s3.get_object(Bucket=b, Key=k)
-            raw = obj["Body"].read().decode("utf-8", errors="ignore")
-            chunks.append(raw)
 
+def _retrieve(question: str, qvec: list[float]) -> str:
+    version = catalog_version()
+    index = lexical_index(version)
+    if index is None or not len(index):
+        key = "ret-" + stable_hash(version, TOP_K, array("f", qvec).tobytes())
+        chunks = result_cache.get_or_compute(key, lambda: _query_chunks(qvec))
+    else:
+        # lexical hits depend on the wording, not just the embedding
+        norm = _normalize_question(question).lower()
+        # the index can lag the version while it updates in the background
+        key = "hyb-" + stable_hash(version, index.fingerprint, TOP_K, norm, array("f", qvec).tobytes())
+        chunks = result_cache.get_or_compute(key, lambda: _hybrid_chunks(norm, qvec, index))
     return "\n\n---\n\n".join(chunks[:TOP_K])
 
 
+def _preview(md: dict) -> str:
+    txt = md.get("text")
+    return txt.strip() if isinstance(txt, str) else ""
+
+
+def _top_unique(candidates, k: int) -> list[tuple[str, str]]:
+    """
+    First k (key, preview) pairs, dropping repeats: the same page can sit in
+    the index under several documents (old single dump plus per-page shards).
+    Previews are chunk prefixes, so equal chunks have equal previews.
+    """
+    out, seen = [], set()
+    for key, preview in candidates:
+        sig = " ".join(preview.split()).lower()[:300] or key
+        if sig in seen:
+            continue
+        seen.add(sig)
+        out.append((key, preview))
+        if len(out) >= k:
+            break
+    return out
+
+
+def _full_texts(picked: list[tuple[str, str]]) -> list[str]:
+    """
+    Full text for the chosen chunks, fetched together in one concurrent batch.
+    """
+    with tracing.span("step", "chunk_fetch", chunks=len(picked)) as s:
+        full = chunk_store.get_many([k for k, _ in picked]) if chunk_store is not None else {}
+        s.set(found=len(full), bytes_in=sum(len(t) for t in full.values()))
+    texts = [(full.get(k) or preview).strip() for k, preview in picked]
+    return [t for t in texts if t]
+
+
+def _vector_query(qvec: list[float], top_k: int) -> list[dict]:
+    with tracing.span("step", "vector_query", top_k=top_k) as s:
+        hits = vector_store.query(qvec, top_k=top_k)
+        s.set(hits=len(hits))
+    return hits
+
+
+def _query_chunks(qvec: list[float]) -> list[str]:
+    hits = _vector_query(qvec, TOP_K)
+    return _full_texts(_top_unique(((v["key"], _preview(v["metadata"])) for v in hits), TOP_K))
+
+
+def _hybrid_chunks(question: str, qvec: list[float], index) -> list[str]:
+    vec_hits = _vector_query(qvec, HYBRID_CANDIDATES)
+    with tracing.span("step", "lexical_search"):
+        lex_hits = index.search(question, HYBRID_CANDIDATES)
+    previews = {v["key"]: _preview(v["metadata"]) for v in vec_hits}
+    fused = [k for k, _ in reciprocal_rank_fusion([[v["key"] for v in vec_hits], [k for k, _ in lex_hits]], RRF_K)]
+
+    # Rank fusion rewards chunks both rankings half-like; a chunk naming the
+    # exact course code the student typed goes first regardless.
+    exact = set()
+    for code in course_codes(question):
+        exact.update(index.keys_with(code))
+    if exact:
+        pinned = [k for k, _ in lex_hits if k in exact]
+        fused = pinned + [k for k in fused if k not in exact]
+
+    candidates = ((k, previews[k] if k in previews else (index.text(k) or "").strip()) for k in fused)
+    return _full_texts(_top_unique(candidates, TOP_K))
+
+
+def _build_prompt(question: str, utd_context: str, jobs: dict, web: dict) -> str:
+    # Only the most relevant context, within CONTEXT_TOKEN_BUDGET: synthesis
+    # latency and cost scale with input tokens.
+    with tracing.span("step", "pack_context") as s:
+        ctx = pack_context(question, utd_context, jobs, web)
+        s.set(**ctx["stats"])
 
-def bedrock_synthesize_answer(question: str, utd_context: str, jobs: dict, web: dict) -> str:
     # Keep prompt short + structured (helps reduce hallucinations)
-    prompt = f"""
+    return f"""
 You are a UTD Career Guiding Assistant.
 You have 3 data sources:
 (1) UTD course catalog context (trusted)
@@ -75,13 +311,13 @@ Task:
 - If data is missing, be explicit.
 
 UTD Catalog Context:
-{utd_context}
+{ctx["catalog"] or "(none)"}
 
-Job Listings (JSON):
-{json.dumps(jobs)[:6000]}
+Job Listings (one JSON object per line):
+{ctx["jobs"] or "(none)"}
 
-Web Search (JSON):
-{json.dumps(web)[:6000]}
+Web Search (one JSON object per line):
+{ctx["web"] or "(none)"}
 
 User Question:
 {question}
@@ -92,17 +328,147 @@ Return:
 - "Suggested UTD Courses" (bullets)
 """
 
-    resp = bedrock_runtime.invoke_model(
-        modelId=CHAT_MODEL_ID,
-        contentType="application/json",
-        accept="application/json",
-        body=json.dumps({
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 700,
-            "temperature": 0.2,
-            "messages": [{"role": "user", "content": prompt}],
-        }),
-    )
 
-    out = json.loads(resp["body"].read())
+def _chat_body(prompt: str) -> str:
+    return json.dumps({
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": 700,
+        "temperature": 0.2,
+        "messages": [{"role": "user", "content": prompt}],
+    })
+
+
+def bedrock_synthesize_answer(question: str, utd_context: str, jobs: dict, web: dict) -> str:
+    body = _chat_body(_build_prompt(question, utd_context, jobs, web))
+    with tracing.span("step", "synthesize", bytes_out=len(body)) as s:
+        resp = bedrock_runtime.invoke_model(
+            modelId=CHAT_MODEL_ID,
+            contentType="application/json",
+            accept="application/json",
+            body=body,
+        )
+        raw = resp["body"].read()
+        out = json.loads(raw)
+        usage = out.get("usage") or {}
+        s.set(bytes_in=len(raw), input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"))
     return out["content"][0]["text"]
+
+
+def bedrock_stream_answer(question: str, utd_context: str, jobs: dict, web: dict) -> Iterator[str]:
+    """
+    Same prompt as bedrock_synthesize_answer, but yields text deltas as
+    Bedrock's response stream delivers them.
+    """
+    body = _chat_body(_build_prompt(question, utd_context, jobs, web))
+    with tracing.span("step", "synthesize_stream", bytes_out=len(body)) as s:
+        resp = bedrock_runtime.invoke_model_with_response_stream(
+            modelId=CHAT_MODEL_ID,
+            contentType="application/json",
+            accept="application/json",
+            body=body,
+        )
+
+        received = 0
+        for event in resp["body"]:
+            chunk = event.get("chunk")
+            if not chunk:
+                # modelStreamErrorException, throttlingException, ...
+                err = next(iter(event.values()), {})
+                raise RuntimeError(f"Bedrock stream error: {err.get('message', event)}")
+            received += len(chunk["bytes"])
+            data = json.loads(chunk["bytes"])
+            kind = data.get("type")
+            if kind == "message_start":
+                s.set(input_tokens=((data.get("message") or {}).get("usage") or {}).get("input_tokens"))
+            elif kind == "message_delta":
+                s.set(output_tokens=(data.get("usage") or {}).get("output_tokens"))
+            elif kind == "content_block_delta":
+                text = (data.get("delta") or {}).get("text")
+                if text:
+                    if "first_token_ms" not in s.attrs:
+                        s.set(first_token_ms=round(1000 * (time.perf_counter() - s.start), 1))
+                    yield text
+        s.set(bytes_in=received)
+
+
+def _get_aws_pool() -> ThreadPoolExecutor:
+    global _aws_pool
+    if _aws_pool is None:
+        with _aws_pool_lock:
+            if _aws_pool is None:
+                _aws_pool = ThreadPoolExecutor(max_workers=AWS_IO_WORKERS, thread_name_prefix="aws")
+    return _aws_pool
+
+
+async def in_aws_pool(fn, *args, **kwargs):
+    # run_in_executor doesn't carry contextvars over; copy them so the
+    # request's trace follows the work onto the pool thread
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        _get_aws_pool(), functools.partial(ctx.run, fn, *args, **kwargs)
+    )
+
+
+def _get_batcher():
+    global embed_batcher
+    if embed_batcher is None and EMBED_BATCH_WINDOW_MS > 0:
+        embed_batcher = EmbeddingBatcher(embedder, EMBED_BATCH_WINDOW_MS, EMBED_BATCH_MAX)
+    return embed_batcher
+
+
+async def _aembed_query_cached(question: str) -> list[float]:
+    batcher = _get_batcher()
+    if batcher is None:
+        return await in_aws_pool(_embed_query_cached, question)
+
+    # cache lookups (possibly an S3 GET) stay on the pool; a miss hands the
+    # text to the batcher on the loop and waits for its batch
+    loop = asyncio.get_running_loop()
+    norm = _normalize_question(question)
+
+    def compute():
+        with tracing.span("step", "embed", bytes_out=len(norm), batched=True):
+            return asyncio.run_coroutine_threadsafe(batcher.embed(norm), loop).result()
+
+    return await in_aws_pool(embedding_cache.get_or_compute, _embedding_key(norm), compute)
+
+
+async def aembed_question(question: str) -> list[float]:
+    return await _aembed_query_cached(question)
+
+
+async def aretrieve_utd_context(question: str) -> str:
+    qvec = await _aembed_query_cached(question)
+    return await in_aws_pool(_retrieve, question, qvec)
+
+
+async def abedrock_synthesize_answer(question: str, utd_context: str, jobs: dict, web: dict) -> str:
+    return await in_aws_pool(bedrock_synthesize_answer, question, utd_context, jobs, web)
+
+
+async def abedrock_stream_answer(question: str, utd_context: str, jobs: dict, web: dict) -> AsyncIterator[str]:
+    """
+    bedrock_stream_answer as an async iterator: the blocking event stream is
+    read on the AWS pool and handed to the loop through a queue.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def pump():
+        try:
+            for text in bedrock_stream_answer(question, utd_context, jobs, web):
+                loop.call_soon_threadsafe(queue.put_nowait, text)
+        except BaseException as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    loop.run_in_executor(_get_aws_pool(), contextvars.copy_context().run, pump)
+    while True:
+        item = await queue.get()
+        if item is done:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
@@ -1,12 +1,14 @@
 import json
 import base64
 import os
-import boto3
+
+from agent_core.aws import lazy_client
+from agent_core.chunk_store import make_chunk_store
+from agent_core.embedding_client import EmbeddingClient
+from agent_core.vector_store import vector_store_from_env
 
 # ---------- AWS clients ----------
-bedrock_runtime = boto3.client("bedrock-runtime")
-s3vectors = boto3.client("s3vectors")
-s3 = boto3.client("s3")
+bedrock_runtime = lazy_client("bedrock-runtime")
 
 # ---------- ENV ----------
 EMBED_MODEL_ID = os.environ.get(
@@ -15,43 +17,39 @@ EMBED_MODEL_ID = os.environ.get(
 CHAT_MODEL_ID = os.environ.get(
     "CHAT_MODEL_ID", "anthropic.claude-3-5-sonnet-20240620-v1:0"
 )
-S3V_INDEX_ARN = os.environ["S3V_INDEX_ARN"]
-
 TOP_K = int(os.environ.get("TOP_K", "5"))
 
+embedder = EmbeddingClient.from_env(model_id=EMBED_MODEL_ID)
+vector_store = vector_store_from_env(read_only=True)
+# full chunk text written by ingest; same defaults as rag.s3_vector, so both
+# entry points read the same store
+chunk_store = make_chunk_store(
+    os.environ.get("CHUNK_STORE_BACKEND", "s3"),
+    s3_client=lazy_client("s3"),
+    bucket=os.environ.get("CHUNK_STORE_BUCKET", os.environ.get("CATALOG_VERSION_BUCKET", "")),
+    prefix=os.environ.get("CHUNK_STORE_PREFIX", "chunks/"),
+    path=os.environ.get("CHUNK_STORE_PATH", "/tmp/chunks"),
+    concurrency=int(os.environ.get("CHUNK_STORE_CONCURRENCY", "8")),
+    cache_size=int(os.environ.get("CHUNK_CACHE_SIZE", "1024")),
+)
+
 
 # ---------- helpers ----------
 def embed_query(text: str) -> list[float]:
-    resp = bedrock_runtime.invoke_model(
-        modelId=EMBED_MODEL_ID,
-        contentType="application/json",
-        accept="application/json",
-        body=json.dumps({"inputText": text}),
-    )
-    return json.loads(resp["body"].read())["embedding"]
+    return embedder.embed(text)
 
 
 def query_s3_vectors(query_vec: list[float]) -> list[str]:
-    resp = s3vectors.query_vectors(
-        IndexArn=S3V_INDEX_ARN,
-        QueryVector=query_vec,
-        TopK=TOP_K,
-    )
+    hits = vector_store.query(query_vec, top_k=TOP_K)
+    # full chunk text written by ingest (metadata "text" is a 1000-char
+    # preview), in one concurrent batch for every hit
+    full = chunk_store.get_many([v["key"] for v in hits]) if chunk_store is not None else {}
 
     chunks = []
-
-    for v in resp.get("Vectors", []):
-        md = v.get("Metadata", {})
-
-        # Case 1: text stored directly in metadata
-        if "text" in md:
-            chunks.append(md["text"])
-            continue
-
-        # Case 2: pointer to S3 object
-        if "bucket" in md and "key" in md:
-            obj = s3.get_object(Bucket=md["bucket"], Key=md["key"])
-            chunks.append(obj["Body"].read().decode("utf-8"))
+    for v in hits:
+        text = full.get(v["key"]) or v["metadata"].get("text")
+        if text:
+            chunks.append(text)
 
     return chunks
 
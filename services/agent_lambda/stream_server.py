@@ -0,0 +1,100 @@
+"""
+Minimal HTTP entry point that streams answers as server-sent events.
+
+Python Lambdas can't stream a response from a plain handler, so for
+streaming the image runs this server behind the AWS Lambda Web Adapter in
+response_stream mode (see the "streaming" Dockerfile target) and is exposed
+through a Lambda Function URL with InvokeMode=RESPONSE_STREAM. It also runs
+locally as-is:
+
+    python stream_server.py            # listens on $PORT (default 8080)
+"""
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import app
+
+PORT = int(os.environ.get("PORT", "8080"))
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization",
+    "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers, body and SSE chunks are separate small writes; don't let
+    # Nagle hold them back waiting for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def _headers(self, status: int, content_type: str, extra: dict | None = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for k, v in {**CORS_HEADERS, **(extra or {})}.items():
+            self.send_header(k, v)
+        self.end_headers()
+
+    def _json(self, status: int, obj: dict):
+        body = json.dumps(obj).encode("utf-8")
+        self._headers(status, "application/json", {"Content-Length": str(len(body))})
+        self.wfile.write(body)
+
+    def _chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_OPTIONS(self):
+        self._headers(204, "text/plain", {"Content-Length": "0"})
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            return self._json(200, {"ok": True})
+        self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") not in ("/chat", "/chat/stream"):
+            return self._json(404, {"error": "not found"})
+
+        n = int(self.headers.get("Content-Length") or 0)
+        event = {"body": self.rfile.read(n).decode("utf-8"), "headers": dict(self.headers)}
+        payload = app.parse_request(event)
+        question = payload.get("question", "")
+        # {"questions": [...]} answers a batch concurrently on the agent loop
+        batch = bool(payload.get("questions"))
+        if not question and not batch:
+            return self._json(400, {"answer": "No question provided"})
+
+        if batch or not (self.path.rstrip("/") == "/chat/stream" or app.wants_stream(event, payload)):
+            resp = app.lambda_handler(event, None)
+            return self._json(resp["statusCode"], json.loads(resp["body"]))
+
+        self._headers(200, "text/event-stream", {
+            "Cache-Control": "no-cache",
+            "Transfer-Encoding": "chunked",
+            "X-Accel-Buffering": "no",
+        })
+        try:
+            for name, data in app.iter_answer_events(question, app.wants_timing(payload)):
+                self._chunk(app.sse(name, data))
+        except Exception as e:
+            print("ERROR:", str(e))
+            self._chunk(app.sse("error", {"message": str(e)}))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, fmt, *args):
+        print("HTTP:", fmt % args)
+
+
+def serve(port: int = PORT) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    print(f"stream server on :{PORT}")
+    serve().serve_forever()
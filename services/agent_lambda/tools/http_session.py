@@ -0,0 +1,141 @@
+import asyncio
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from agent_core import tracing
+
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "16"))
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "2"))
+HTTP_KEEPALIVE_SEC = float(os.environ.get("HTTP_KEEPALIVE_SEC", "60"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Searches are billed per request, so a request the server may have run is
+# only sent again when that's safe: connect errors (nothing was sent) always,
+# read timeouts never, retryable statuses for GET, and for POST (Tavily) only
+# when the server asked for it with Retry-After.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def _status_retryable(method: str, status: int, has_retry_after: bool) -> bool:
+    if status not in RETRY_STATUSES:
+        return False
+    return method.upper() in IDEMPOTENT_METHODS or has_retry_after
+
+_session = None
+_lock = threading.Lock()
+# one httpx.AsyncClient per event loop (in practice the container loop in aio.py)
+_async_clients: dict = {}
+
+
+def get_session():
+    """
+    One keep-alive requests.Session per container, shared by all tool calls so
+    warm invocations reuse TCP/TLS connections to SerpAPI and Tavily. requests
+    is imported on first use to keep it off the cold-start import path.
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                class ToolRetry(Retry):
+                    def is_retry(self, method, status_code, has_retry_after=False):
+                        return bool(self.total) and _status_retryable(method, status_code, has_retry_after)
+
+                retry = ToolRetry(
+                    total=HTTP_RETRIES,
+                    connect=HTTP_RETRIES,
+                    read=0,
+                    other=0,
+                    backoff_factor=0.3,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=frozenset({"GET", "POST"}),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+                s = requests.Session()
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.hooks["response"].append(_trace_response)
+                _session = s
+    return _session
+
+
+def get_async_client():
+    """
+    The async counterpart: one pooled httpx.AsyncClient per event loop, with
+    keep-alive connections reused across warm invocations. Connection errors
+    are retried by the transport, retryable statuses by arequest().
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=HTTP_POOL_SIZE,
+            max_keepalive_connections=HTTP_POOL_SIZE,
+            keepalive_expiry=HTTP_KEEPALIVE_SEC,
+        )
+        client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(retries=HTTP_RETRIES, limits=limits),
+            timeout=httpx.Timeout(25.0, connect=5.0),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def _trace_response(r, *args, **kwargs):
+    """
+    requests response hook: one "http" span per request (time to headers;
+    urllib3 retries happen inside it).
+    """
+    start = time.perf_counter() - r.elapsed.total_seconds()
+    body = r.request.body
+    tracing.add_span(
+        "http", urlsplit(r.url).hostname or "unknown", start,
+        method=r.request.method, status=r.status_code,
+        bytes_out=len(body) if isinstance(body, (bytes, str)) else 0,
+        bytes_in=int(r.headers.get("Content-Length") or 0),
+    )
+
+
+async def arequest(method: str, url: str, **kwargs):
+    """
+    client.request() with the sync session's retry policy: retryable statuses
+    (see _status_retryable) are retried with exponential backoff (0.3s, 0.6s,
+    ...) or the server's Retry-After if longer; the last response is returned.
+    The transport only retries connect errors.
+    """
+    client = get_async_client()
+    host = urlsplit(url).hostname or "unknown"
+    for attempt in range(HTTP_RETRIES + 1):
+        with tracing.span("http", host, method=method, attempt=attempt) as s:
+            r = await client.request(method, url, **kwargs)
+            s.set(status=r.status_code, bytes_out=len(r.request.content), bytes_in=len(r.content))
+        retry_after = r.headers.get("Retry-After")
+        if attempt == HTTP_RETRIES or not _status_retryable(method, r.status_code, retry_after is not None):
+            return r
+        await r.aclose()
+        await asyncio.sleep(max(0.3 * (2 ** attempt), _seconds(retry_after)))
+
+
+def _seconds(retry_after) -> float:
+    # delta-seconds form only; an HTTP date falls back to the backoff
+    try:
+        return max(0.0, float(retry_after))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+async def aclose_async_client() -> None:
+    """
+    Close this loop's pooled client (server shutdown).
+    """
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -1,24 +1,73 @@
 import os
-import requests
+
+from agent_core.cache import SWRCache, stable_hash
+from agent_core.tracing import traced
+from tools.http_session import arequest, get_session
 
 SERPAPI_KEY = os.environ.get("SERPAPI_KEY", "")
-SERPAPI_ENDPOINT = "https://serpapi.com/search.json"
+SERPAPI_ENDPOINT = os.environ.get("SERPAPI_ENDPOINT", "https://serpapi.com/search.json")
+
+# Job listings move slowly: serve cached results for an hour, and stale ones
+# for up to six more while a background refresh runs.
+SERPAPI_CACHE_TTL_SEC = float(os.environ.get("SERPAPI_CACHE_TTL_SEC", "3600"))
+SERPAPI_CACHE_STALE_SEC = float(os.environ.get("SERPAPI_CACHE_STALE_SEC", "21600"))
+SERPAPI_CACHE_SIZE = int(os.environ.get("SERPAPI_CACHE_SIZE", "256"))
+
+jobs_cache = SWRCache(SERPAPI_CACHE_SIZE, SERPAPI_CACHE_TTL_SEC, SERPAPI_CACHE_STALE_SEC, name="jobs")
+
+
+def _norm(s: str) -> str:
+    return " ".join(s.lower().split())
+
 
+def jobs_cache_key(query: str, location: str = "Dallas, TX", num_results: int = 8) -> str:
+    return stable_hash("serpapi", _norm(query), _norm(location), num_results)
+
+
+@traced("tool", "serpapi_jobs")
 def serpapi_google_jobs(query: str, location: str = "Dallas, TX", num_results: int = 8) -> dict:
     if not SERPAPI_KEY:
         return {"error": "SERPAPI_KEY not set"}
 
-    params = {
+    return jobs_cache.get(
+        jobs_cache_key(query, location, num_results),
+        lambda: _fetch_jobs(query, location, num_results),
+    )
+
+
+@traced("tool", "serpapi_jobs")
+async def aserpapi_google_jobs(query: str, location: str = "Dallas, TX", num_results: int = 8) -> dict:
+    if not SERPAPI_KEY:
+        return {"error": "SERPAPI_KEY not set"}
+
+    return await jobs_cache.aget(
+        jobs_cache_key(query, location, num_results),
+        lambda: _afetch_jobs(query, location, num_results),
+    )
+
+
+def _params(query: str, location: str) -> dict:
+    return {
         "engine": "google_jobs",
         "q": query,
         "location": location,
         "api_key": SERPAPI_KEY,
     }
 
-    r = requests.get(SERPAPI_ENDPOINT, params=params, timeout=20)
+
+def _fetch_jobs(query: str, location: str, num_results: int) -> dict:
+    r = get_session().get(SERPAPI_ENDPOINT, params=_params(query, location), timeout=20)
     r.raise_for_status()
-    data = r.json()
+    return _normalize(r.json(), query, location, num_results)
+
+
+async def _afetch_jobs(query: str, location: str, num_results: int) -> dict:
+    r = await arequest("GET", SERPAPI_ENDPOINT, params=_params(query, location), timeout=20)
+    r.raise_for_status()
+    return _normalize(r.json(), query, location, num_results)
+
 
+def _normalize(data: dict, query: str, location: str, num_results: int) -> dict:
     # Normalize top jobs
     jobs = []
     for j in (data.get("jobs_results") or [])[:num_results]:
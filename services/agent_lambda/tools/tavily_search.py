@@ -1,13 +1,40 @@
 import os
-import requests
+
+from agent_core.cache import SWRCache, stable_hash
+from agent_core.tracing import traced
+from tools.http_session import arequest, get_session
 
 TAVILY_API_KEY = os.environ.get("TAVILY_API_KEY", "")
-TAVILY_SEARCH_ENDPOINT = "https://api.tavily.com/search"
+TAVILY_SEARCH_ENDPOINT = os.environ.get("TAVILY_SEARCH_ENDPOINT", "https://api.tavily.com/search")
+
+TAVILY_CACHE_TTL_SEC = float(os.environ.get("TAVILY_CACHE_TTL_SEC", "3600"))
+TAVILY_CACHE_STALE_SEC = float(os.environ.get("TAVILY_CACHE_STALE_SEC", "21600"))
+TAVILY_CACHE_SIZE = int(os.environ.get("TAVILY_CACHE_SIZE", "256"))
+
+web_cache = SWRCache(TAVILY_CACHE_SIZE, TAVILY_CACHE_TTL_SEC, TAVILY_CACHE_STALE_SEC, name="web")
+
+
+def web_cache_key(query: str, max_results: int = 5) -> str:
+    return stable_hash("tavily", " ".join(query.lower().split()), max_results)
 
+
+@traced("tool", "tavily_search")
 def tavily_web_search(query: str, max_results: int = 5) -> dict:
     if not TAVILY_API_KEY:
         return {"error": "TAVILY_API_KEY not set"}
 
+    return web_cache.get(web_cache_key(query, max_results), lambda: _search(query, max_results))
+
+
+@traced("tool", "tavily_search")
+async def atavily_web_search(query: str, max_results: int = 5) -> dict:
+    if not TAVILY_API_KEY:
+        return {"error": "TAVILY_API_KEY not set"}
+
+    return await web_cache.aget(web_cache_key(query, max_results), lambda: _asearch(query, max_results))
+
+
+def _request(query: str, max_results: int):
     headers = {
         "Authorization": f"Bearer {TAVILY_API_KEY}",
         "Content-Type": "application/json",
@@ -19,7 +46,18 @@ def tavily_web_search(query: str, max_results: int = 5) -> dict:
         "include_answer": True,
         "include_raw_content": False,
     }
+    return headers, body
+
+
+def _search(query: str, max_results: int) -> dict:
+    headers, body = _request(query, max_results)
+    r = get_session().post(TAVILY_SEARCH_ENDPOINT, headers=headers, json=body, timeout=25)
+    r.raise_for_status()
+    return r.json()
+
 
-    r = requests.post(TAVILY_SEARCH_ENDPOINT, headers=headers, json=body, timeout=25)
+async def _asearch(query: str, max_results: int) -> dict:
+    headers, body = _request(query, max_results)
+    r = await arequest("POST", TAVILY_SEARCH_ENDPOINT, headers=headers, json=body, timeout=25)
     r.raise_for_status()
     return r.json()
@@ -0,0 +1,126 @@
+import hashlib
+import sqlite3
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+
+
+def cache_key(model_id: str, text: str) -> str:
+    """
+    Vectors depend on both the chunk text and the embedding model.
+    """
+    return hashlib.sha256(f"{model_id}\n{text}".encode("utf-8")).hexdigest()
+
+
+def _pack(vec: List[float]) -> bytes:
+    return array("f", vec).tobytes()
+
+
+def _unpack(raw: bytes) -> List[float]:
+    a = array("f")
+    a.frombytes(raw)
+    return a.tolist()
+
+
+class NullEmbeddingCache:
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        return {}
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        return None
+
+
+class SQLiteEmbeddingCache:
+    """
+    Single-file local cache; used for tests and local runs.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS emb (k TEXT PRIMARY KEY, v BLOB NOT NULL)")
+        self._db.commit()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        keys = list(keys)
+        out = {}
+        with self._lock:
+            # stay under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                marks = ",".join("?" * len(batch))
+                for k, v in self._db.execute(f"SELECT k, v FROM emb WHERE k IN ({marks})", batch):
+                    out[k] = _unpack(v)
+        return out
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO emb (k, v) VALUES (?, ?)",
+                [(k, _pack(v)) for k, v in items.items()],
+            )
+            self._db.commit()
+
+
+class S3EmbeddingCache:
+    """
+    One small object per vector (raw float32 bytes), fetched concurrently.
+    Cache errors are logged and treated as misses so they never fail ingest.
+    """
+
+    def __init__(self, s3_client, bucket: str, prefix: str = "embed-cache/", concurrency: int = 16):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.concurrency = concurrency
+
+    def _obj_key(self, k: str) -> str:
+        return f"{self.prefix}{k[:2]}/{k}.f32"
+
+    def _get(self, k: str):
+        try:
+            obj = self.s3.get_object(Bucket=self.bucket, Key=self._obj_key(k))
+            return k, _unpack(obj["Body"].read())
+        except Exception as e:
+            code = (getattr(e, "response", None) or {}).get("Error", {}).get("Code")
+            if code not in ("NoSuchKey", "404"):
+                print("WARN: embed cache get failed:", k, str(e))
+            return k, None
+
+    def _put(self, item) -> None:
+        k, v = item
+        try:
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=self._obj_key(k),
+                Body=_pack(v),
+                ContentType="application/octet-stream",
+            )
+        except Exception as e:
+            print("WARN: embed cache put failed:", k, str(e))
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return {k: v for k, v in pool.map(self._get, keys) if v is not None}
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            list(pool.map(self._put, items.items()))
+
+
+def make_embedding_cache(backend: str, s3_client=None, bucket: str = "", prefix: str = "embed-cache/",
+                         path: str = "/tmp/embed-cache.sqlite"):
+    backend = (backend or "none").lower()
+    if backend == "s3" and bucket:
+        return S3EmbeddingCache(s3_client, bucket, prefix)
+    if backend == "sqlite":
+        return SQLiteEmbeddingCache(path)
+    return NullEmbeddingCache()
@@ -1,35 +1,122 @@
 import os
 import json
 import hashlib
-from array import array
-from typing import List, Dict, Any
-import json, urllib.parse, traceback
+import time
+from typing import List, Dict, Any, Iterator
+import codecs
+import json, re, urllib.parse, traceback
 import boto3
 
+from agent_core.chunk_store import make_chunk_store
+from agent_core.chunking import iter_chunks
+from agent_core.embedding_client import EmbedStats, EmbeddingClient
+from agent_core.lexical import (
+    build_segment,
+    doc_segment_prefix,
+    load_lexical_index,
+    make_lexical_store,
+    segment_entry,
+    segment_name,
+)
+from agent_core.vector_store import vector_store_from_env
+from embed_cache import cache_key, make_embedding_cache
+
 # --------- Clients ----------
 s3 = boto3.client("s3")
-bedrock = boto3.client("bedrock-runtime")
-s3vectors = boto3.client("s3vectors")
 
 # --------- Env ----------
 SOURCE_BUCKET = os.environ.get("SOURCE_BUCKET", "")
-VECTOR_BUCKET_NAME = os.environ["VECTOR_BUCKET_NAME"]
-VECTOR_INDEX_NAME = os.environ["VECTOR_INDEX_NAME"]
+# S3 Vectors (VECTOR_BUCKET_NAME + VECTOR_INDEX_NAME) or, with
+# VECTOR_STORE_BACKEND=local, a NumPy index under LOCAL_VECTOR_PATH
+vector_store = vector_store_from_env()
 
 MANIFEST_BUCKET = os.environ.get("MANIFEST_BUCKET", SOURCE_BUCKET)
 MANIFEST_PREFIX = os.environ.get("MANIFEST_PREFIX", "manifests/")
+# Rewritten after every ingest that changes the index; the agent keys its
+# retrieval cache on this object's ETag.
+CATALOG_VERSION_KEY = os.environ.get("CATALOG_VERSION_KEY", f"{MANIFEST_PREFIX}_catalog_version.json")
 
 BEDROCK_MODEL_ID = os.environ.get("BEDROCK_MODEL_ID", "amazon.titan-embed-text-v2:0")
 
 CHUNK_MAX_CHARS = int(os.environ.get("CHUNK_MAX_CHARS", "3500"))
 CHUNK_OVERLAP_CHARS = int(os.environ.get("CHUNK_OVERLAP_CHARS", "300"))
+# Token budgets for the shared chunker (defaults follow the char settings, ~4 chars/token)
+CHUNK_MAX_TOKENS = int(os.environ.get("CHUNK_MAX_TOKENS", str(CHUNK_MAX_CHARS // 4)))
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", str(CHUNK_OVERLAP_CHARS // 4)))
 UPSERT_BATCH_SIZE = int(os.environ.get("UPSERT_BATCH_SIZE", "50"))
 
+# Streaming mode reads the object in byte ranges and embeds/upserts in rolling
+# batches of UPSERT_BATCH_SIZE, so memory stays flat regardless of file size.
+INGEST_STREAMING = os.environ.get("INGEST_STREAMING", "1") == "1"
+INGEST_READ_BYTES = int(os.environ.get("INGEST_READ_BYTES", str(1024 * 1024)))
+
+# Pool size, timeouts, retries and concurrency come from EMBED_* env vars
+embedder = EmbeddingClient.from_env(model_id=BEDROCK_MODEL_ID)
+
+# Embedding cache keyed by sha256(model id + chunk text): s3 | sqlite | none
+EMBED_CACHE_BACKEND = os.environ.get("EMBED_CACHE_BACKEND", "s3")
+EMBED_CACHE_BUCKET = os.environ.get("EMBED_CACHE_BUCKET", MANIFEST_BUCKET)
+EMBED_CACHE_PREFIX = os.environ.get("EMBED_CACHE_PREFIX", "embed-cache/")
+EMBED_CACHE_PATH = os.environ.get("EMBED_CACHE_PATH", "/tmp/embed-cache.sqlite")
+
+embed_cache = make_embedding_cache(
+    EMBED_CACHE_BACKEND,
+    s3_client=s3,
+    bucket=EMBED_CACHE_BUCKET,
+    prefix=EMBED_CACHE_PREFIX,
+    path=EMBED_CACHE_PATH,
+)
+
+# Per-document BM25 postings written next to the vectors; a scheduled event
+# merges them into the snapshot the agent loads for hybrid retrieval:
+# s3 | local | none
+LEXICAL_BACKEND = os.environ.get("LEXICAL_BACKEND", "s3")
+LEXICAL_BUCKET = os.environ.get("LEXICAL_BUCKET", MANIFEST_BUCKET)
+LEXICAL_PREFIX = os.environ.get("LEXICAL_PREFIX", "lexical/")
+LEXICAL_PATH = os.environ.get("LEXICAL_PATH", "/tmp/lexical")
+# Chunks per segment part; bounds the postings held in memory while ingesting
+LEXICAL_PART_CHUNKS = int(os.environ.get("LEXICAL_PART_CHUNKS", "500"))
+
+lexical_store = make_lexical_store(
+    LEXICAL_BACKEND,
+    s3_client=s3,
+    bucket=LEXICAL_BUCKET,
+    prefix=LEXICAL_PREFIX,
+    path=LEXICAL_PATH,
+)
+
+# Full chunk text per vector key (vector metadata only keeps a preview), so
+# retrieval fetches exactly the chunks it returns: s3 | local | none
+CHUNK_STORE_BACKEND = os.environ.get("CHUNK_STORE_BACKEND", "s3")
+CHUNK_STORE_BUCKET = os.environ.get("CHUNK_STORE_BUCKET", MANIFEST_BUCKET)
+CHUNK_STORE_PREFIX = os.environ.get("CHUNK_STORE_PREFIX", "chunks/")
+CHUNK_STORE_PATH = os.environ.get("CHUNK_STORE_PATH", "/tmp/chunks")
+
+chunk_store = make_chunk_store(
+    CHUNK_STORE_BACKEND,
+    s3_client=s3,
+    bucket=CHUNK_STORE_BUCKET,
+    prefix=CHUNK_STORE_PREFIX,
+    path=CHUNK_STORE_PATH,
+    concurrency=int(os.environ.get("CHUNK_STORE_CONCURRENCY", "16")),
+)
+
+_TIMESTAMP_SUFFIX = re.compile(r"_\d{4}-\d{2}-\d{2}T\d{2}-\d{2}-\d{2}Z(?=\.md$)", re.IGNORECASE)
+
 
 def _sha1(s: str) -> str:
     return hashlib.sha1(s.encode("utf-8")).hexdigest()
 
 
+def _doc_id_for_key(key: str) -> str:
+    """
+    Stable document id: the scraper timestamps each dump (all_<ts>.md), so drop
+    the timestamp to let successive dumps share one manifest. Per-page shards
+    already have stable keys and get one document each.
+    """
+    return _sha1(_TIMESTAMP_SUFFIX.sub("", key))
+
+
 def _manifest_key(doc_id: str) -> str:
     return f"{MANIFEST_PREFIX}{doc_id}.json"
 
@@ -39,79 +126,124 @@ def _read_text_from_s3(bucket: str, key: str) -> str:
     return obj["Body"].read().decode("utf-8", errors="ignore")
 
 
-def _chunk_text(text: str, max_chars: int, overlap_chars: int) -> List[str]:
+def _iter_text_from_s3(bucket: str, key: str, range_bytes: int) -> Iterator[str]:
     """
-    Simple char-based chunking that works well for markdown.
-    Keeps overlap to preserve context across chunks.
+    Yield the object's text one ranged GET at a time. The incremental decoder
+    keeps multi-byte UTF-8 sequences intact across range boundaries.
     """
-    text = text.replace("\r\n", "\n")
-    chunks = []
-    n = len(text)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
     start = 0
-
-    while start < n:
-        end = min(n, start + max_chars)
-
-        # Try not to cut mid-paragraph: backtrack to nearest newline if possible
-        if end < n:
-            back = text.rfind("\n", start, end)
-            if back != -1 and back > start + int(max_chars * 0.6):
-                end = back
-
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-
-        if end >= n:
+    size = None
+    while size is None or start < size:
+        try:
+            obj = s3.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{start + range_bytes - 1}")
+        except Exception as e:
+            # S3 rejects any range on a zero-byte object
+            if (getattr(e, "response", None) or {}).get("Error", {}).get("Code") == "InvalidRange":
+                break
+            raise
+        data = obj["Body"].read()
+        if size is None:
+            # "bytes 0-1048575/7340032"
+            size = int((obj.get("ContentRange") or "").rpartition("/")[2] or len(data))
+        if not data:
             break
-
-        start = max(0, end - overlap_chars)
-
-    return chunks
+        start += len(data)
+        yield decoder.decode(data)
+    yield decoder.decode(b"", final=True)
 
 
 def _embed_titan(text: str) -> List[float]:
     """
     Titan Text Embeddings v2 returns 1024-d vector.
     """
-    payload = {"inputText": text}
-    resp = bedrock.invoke_model(
-        modelId=BEDROCK_MODEL_ID,
-        body=json.dumps(payload),
-        contentType="application/json",
-        accept="application/json",
-    )
-    body = json.loads(resp["body"].read())
-    emb = body["embedding"]  # per Titan embeddings response format
-    # Force float32 (S3 Vectors expects float32 values)
-    return array("f", emb).tolist()
+    return embedder.embed(text)
 
 
-def _load_manifest(doc_id: str) -> List[str]:
+def _embed_chunks(chunks: List[str], stats: EmbedStats) -> List[List[float]]:
     """
-    Manifest contains the vector keys previously written for this document.
+    Embed chunks, reusing cached vectors for text already embedded with this
+    model. Only cache misses go to Bedrock; vectors come back in chunk order.
     """
+    keys = [cache_key(BEDROCK_MODEL_ID, c) for c in chunks]
+    cached = embed_cache.get_many(set(keys))
+
+    # embed each distinct missing text once
+    missing = {}
+    for k, c in zip(keys, chunks):
+        if k not in cached and k not in missing:
+            missing[k] = c
+
+    fresh = embedder.embed_batch(list(missing.values()), stats=stats)
+    new_items = dict(zip(missing.keys(), fresh))
+    embed_cache.put_many(new_items)
+
+    stats.cache_hits += len(chunks) - len(missing)
+    cached.update(new_items)
+    return [cached[k] for k in keys]
+
+
+def _read_manifest(doc_id: str) -> Any:
     key = _manifest_key(doc_id)
     try:
         obj = s3.get_object(Bucket=MANIFEST_BUCKET, Key=key)
         return json.loads(obj["Body"].read().decode("utf-8"))
     except s3.exceptions.NoSuchKey:
-        return []
+        return None
     except Exception:
         # If manifest is corrupted, treat as none (won't delete old vectors)
-        return []
+        return None
 
 
-def _save_manifest(doc_id: str, vector_keys: List[str]) -> None:
+def _manifest_chunks(data: Any) -> Dict[str, str]:
+    """
+    Manifest maps each vector key previously written for this document to its
+    chunk content hash. Legacy manifests (a bare list of keys) load with no
+    hashes, so every old key is treated as stale.
+    """
+    if not data:
+        return {}
+    if isinstance(data, list):
+        return {k: "" for k in data}
+    return dict(data.get("chunks") or {})
+
+
+def _load_manifest(doc_id: str) -> Dict[str, str]:
+    return _manifest_chunks(_read_manifest(doc_id))
+
+
+def _save_manifest(doc_id: str, source_key: str, chunks: Dict[str, str]) -> None:
     key = _manifest_key(doc_id)
+    body = {"version": 2, "doc_id": doc_id, "source_key": source_key, "chunks": chunks,
+            "chunk_store": chunk_store is not None}
     s3.put_object(
         Bucket=MANIFEST_BUCKET,
         Key=key,
-        Body=json.dumps(vector_keys).encode("utf-8"),
+        Body=json.dumps(body).encode("utf-8"),
         ContentType="application/json",
     )
 
 
+def _bump_catalog_version(doc_id: str, source_key: str) -> None:
+    s3.put_object(
+        Bucket=MANIFEST_BUCKET,
+        Key=CATALOG_VERSION_KEY,
+        Body=json.dumps({"updated_at": time.time(), "doc_id": doc_id, "source_key": source_key}).encode("utf-8"),
+        ContentType="application/json",
+    )
+
+
+def _diff_manifest(old: Dict[str, str], new: Dict[str, str]):
+    """
+    Returns (added, removed, unchanged) vector keys. Keys are derived from the
+    chunk hash, so a key present on both sides holds identical content.
+    """
+    added = [k for k in new if k not in old]
+    removed = [k for k in old if k not in new]
+    unchanged = [k for k in new if k in old]
+    return added, removed, unchanged
+
+
 def _delete_old_vectors(old_keys: List[str]) -> None:
     if not old_keys:
         return
@@ -120,11 +252,9 @@ def _delete_old_vectors(old_keys: List[str]) -> None:
     BATCH = 500  # conservative
     for i in range(0, len(old_keys), BATCH):
         batch = old_keys[i : i + BATCH]
-        s3vectors.delete_vectors(
-            vectorBucketName=VECTOR_BUCKET_NAME,
-            indexName=VECTOR_INDEX_NAME,
-            keys=batch,
-        )
+        vector_store.delete(batch)
+    if chunk_store is not None:
+        chunk_store.delete_many(old_keys)
 
 
 def _put_vectors(vectors: List[Dict[str, Any]]) -> None:
@@ -133,11 +263,92 @@ def _put_vectors(vectors: List[Dict[str, Any]]) -> None:
     """
     for i in range(0, len(vectors), UPSERT_BATCH_SIZE):
         batch = vectors[i : i + UPSERT_BATCH_SIZE]
-        s3vectors.put_vectors(
-            vectorBucketName=VECTOR_BUCKET_NAME,
-            indexName=VECTOR_INDEX_NAME,
-            vectors=batch,
-        )
+        vector_store.put(batch)
+
+def _embed_and_put(pending, bucket: str, key: str, doc_id: str, stats: EmbedStats) -> int:
+    """
+    Embed one batch of (vector key, Chunk) pairs and upsert it.
+    """
+    if not pending:
+        return 0
+    if chunk_store is not None:
+        # text first, so no vector ever points at a missing chunk
+        chunk_store.put_many({vkey: chunk.text for vkey, chunk in pending})
+    embeddings = _embed_chunks([c.text for _, c in pending], stats)
+    vectors = [
+        {
+            "key": vkey,
+            "data": {"float32": emb},
+            "metadata": {
+                "s3_bucket": bucket,
+                "s3_key": key,
+                "doc_id": doc_id,
+                **chunk.metadata,  # chunk_index, source_url, title
+                "text": chunk.text[:1000],  # keep metadata small; store preview only
+            },
+        }
+        for (vkey, chunk), emb in zip(pending, embeddings)
+    ]
+    _put_vectors(vectors)
+    return len(vectors)
+
+
+def _put_lexical_part(doc_id: str, source_key: str, part: int, entries: List[dict]) -> str:
+    name = segment_name(doc_id, part)
+    lexical_store.put_segment(name, build_segment(doc_id, source_key, entries, part))
+    return name
+
+
+def _is_removal(event: dict) -> bool:
+    """
+    True for S3 ObjectRemoved notifications and EventBridge "Object Deleted".
+    """
+    recs = event.get("Records") or []
+    if recs:
+        return str(recs[0].get("eventName") or "").startswith("ObjectRemoved")
+    return event.get("detail-type") == "Object Deleted"
+
+
+def _remove_document(key: str) -> dict:
+    """
+    The source object is gone: drop every vector its manifest lists, then the
+    manifest itself.
+    """
+    doc_id = _doc_id_for_key(key)
+    old_manifest = _load_manifest(doc_id)
+    _delete_old_vectors(list(old_manifest))
+    s3.delete_object(Bucket=MANIFEST_BUCKET, Key=_manifest_key(doc_id))
+    if lexical_store is not None:
+        for name in lexical_store.list_segments(doc_segment_prefix(doc_id)):
+            lexical_store.delete_segment(name)
+    if old_manifest:
+        _bump_catalog_version(doc_id, key)
+    print("REMOVED:", json.dumps({"key": key, "doc_id": doc_id, "vectors": len(old_manifest)}))
+    return {"ok": True, "removed": True, "key": key, "doc_id": doc_id, "vectors_deleted": len(old_manifest)}
+
+
+def _is_lexical_merge(event: dict) -> bool:
+    """
+    True for the EventBridge schedule (or a manual {"lexical_merge": true}).
+    """
+    return bool(event.get("lexical_merge")) or event.get("detail-type") == "Scheduled Event"
+
+
+def _merge_lexical() -> dict:
+    """
+    Merge the segments changed since the last run into the snapshot the agent
+    loads. The only writer of the snapshot: per-page ingests just write their
+    segments, so a burst of S3 events costs one merge, not one per page. The
+    write is conditional on the snapshot read, so an overlapping run can't
+    replace a newer snapshot with an older listing.
+    """
+    if lexical_store is None:
+        return {"ok": True, "skipped": True, "reason": "no lexical store"}
+    index = load_lexical_index(lexical_store, write_back=True)
+    stats = {"segments": len(index.etags), "chunks": len(index)}
+    print("LEXICAL:", json.dumps(stats))
+    return {"ok": True, "lexical_merge": True, **stats}
+
 
 def _extract_bucket_key(event: dict):
     # S3 Event Notification (most likely your case)
@@ -164,80 +375,111 @@ def handler(event, context):
     try:
         print("EVENT:", json.dumps(event)[:4000])
 
+        if _is_lexical_merge(event):
+            return _merge_lexical()
+
         bucket, key = _extract_bucket_key(event)
         print("PARSED bucket/key:", bucket, key)
 
         if not bucket or not key:
             raise RuntimeError("Could not parse bucket/key from event")
 
+        # also skips the scraper's shard index.json
         if not key.lower().endswith(".md"):
             print("SKIP: not md", key)
             return {"ok": True, "skipped": True, "reason": "not md"}
 
+        if _is_removal(event):
+            return _remove_document(key)
+
         # Add a single checkpoint so you know it reached here
         print("OK: will ingest", bucket, key)
-        # EventBridge S3 event: bucket + object key live under event["detail"]
-        detail = event.get("detail", {})
-        bucket = detail.get("bucket", {}).get("name")
-        key = detail.get("object", {}).get("key")
-
-        if not bucket or not key:
-            return {"ok": False, "reason": "Missing bucket/key in event", "event": event}
 
-        # Optional: only process markdown files
-        if not key.lower().endswith(".md"):
-            return {"ok": True, "skipped": True, "reason": "Not .md", "key": key}
+        doc_id = _doc_id_for_key(key)
+        old_doc = _read_manifest(doc_id)
+        old_manifest = _manifest_chunks(old_doc)
+        # documents ingested before the chunk store existed get their
+        # unchanged chunks written once
+        backfill = chunk_store is not None and not (isinstance(old_doc, dict) and old_doc.get("chunk_store"))
+        backfill_items: Dict[str, str] = {}
 
         # Read document
-        text = _read_text_from_s3(bucket, key)
-        if not text.strip():
+        if INGEST_STREAMING:
+            source = _iter_text_from_s3(bucket, key, INGEST_READ_BYTES)
+        else:
+            source = [_read_text_from_s3(bucket, key)]
+
+        # Chunk per course page and embed/upsert in rolling batches. Vector keys
+        # are content-addressed, so chunks already in the old manifest are skipped.
+        new_manifest: Dict[str, str] = {}
+        lexical_entries = []
+        lexical_parts: List[str] = []
+        old_parts = lexical_store.list_segments(doc_segment_prefix(doc_id)) if lexical_store is not None else {}
+        pending = []
+        n_chunks = 0
+        written = 0
+        embed_stats = EmbedStats()
+
+        for chunk in iter_chunks(source, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS):
+            n_chunks += 1
+            h = cache_key(BEDROCK_MODEL_ID, chunk.text)
+            vkey = f"{doc_id}:{h[:32]}"
+            if vkey in new_manifest:
+                continue
+            new_manifest[vkey] = h
+            if lexical_store is not None:
+                lexical_entries.append(segment_entry(vkey, chunk.text))
+                if len(lexical_entries) >= LEXICAL_PART_CHUNKS:
+                    lexical_parts.append(_put_lexical_part(doc_id, key, len(lexical_parts), lexical_entries))
+                    lexical_entries = []
+            if vkey in old_manifest:
+                if backfill:
+                    backfill_items[vkey] = chunk.text
+                    if len(backfill_items) >= UPSERT_BATCH_SIZE:
+                        chunk_store.put_many(backfill_items)
+                        backfill_items = {}
+                continue
+            pending.append((vkey, chunk))
+            if len(pending) >= UPSERT_BATCH_SIZE:
+                written += _embed_and_put(pending, bucket, key, doc_id, embed_stats)
+                pending = []
+
+        if not n_chunks:
             return {"ok": True, "skipped": True, "reason": "Empty file", "key": key}
-
-        doc_id = _sha1(key)
-
-        # Load old manifest & delete old vectors for this doc
-        old_vector_keys = _load_manifest(doc_id)
-        _delete_old_vectors(old_vector_keys)
-
-        # Chunk
-        chunks = _chunk_text(text, CHUNK_MAX_CHARS, CHUNK_OVERLAP_CHARS)
-
-        # Embed + build vectors
-        vectors = []
-        new_vector_keys = []
-
-        for idx, chunk in enumerate(chunks):
-            emb = _embed_titan(chunk)
-            vkey = f"{doc_id}:{idx}"
-            new_vector_keys.append(vkey)
-
-            vectors.append(
-                {
-                    "key": vkey,
-                    "data": {"float32": emb},
-                    "metadata": {
-                        "s3_bucket": bucket,
-                        "s3_key": key,
-                        "doc_id": doc_id,
-                        "chunk_index": idx,
-                        "text": chunk[:1000],  # keep metadata small; store preview only
-                    },
-                }
-            )
-
-        # Write vectors
-        _put_vectors(vectors)
-
-        # Save manifest
-        _save_manifest(doc_id, new_vector_keys)
+        written += _embed_and_put(pending, bucket, key, doc_id, embed_stats)
+        if backfill_items:
+            chunk_store.put_many(backfill_items)
+
+        added, removed, unchanged = _diff_manifest(old_manifest, new_manifest)
+        print("DIFF:", json.dumps({"added": len(added), "removed": len(removed), "unchanged": len(unchanged)}))
+        print("EMBED:", json.dumps(embed_stats.as_dict()))
+
+        # New vectors are written; commit the manifest, and only then drop
+        # stale keys, so queries never see the document missing from the index.
+        _save_manifest(doc_id, key, new_manifest)
+        if lexical_store is not None:
+            # parts are rewritten every time (identical bytes when nothing
+            # changed) so documents ingested before the lexical index existed
+            # get them too
+            if lexical_entries:
+                lexical_parts.append(_put_lexical_part(doc_id, key, len(lexical_parts), lexical_entries))
+            for name in old_parts:
+                if name not in lexical_parts:
+                    lexical_store.delete_segment(name)
+        _delete_old_vectors(removed)
+        if added or removed:
+            _bump_catalog_version(doc_id, key)
 
         return {
             "ok": True,
             "bucket": bucket,
             "key": key,
             "doc_id": doc_id,
-            "chunks": len(chunks),
-            "vectors_written": len(vectors),
+            "chunks": n_chunks,
+            "vectors_written": written,
+            "vectors_deleted": len(removed),
+            "vectors_unchanged": len(unchanged),
+            "embed": embed_stats.as_dict(),
         }
     except Exception as e:
         print("ERROR:", str(e))
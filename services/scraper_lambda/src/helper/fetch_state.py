@@ -0,0 +1,98 @@
+import gzip
+import json
+import os
+
+# Per-URL crawl state carried between scraper runs:
+#   {"version": 1,
+#    "output_sha256": <sha of the last all_*.md written>, "output_key": <its S3 key>,
+#    "pages": {url: {"etag", "last_modified", "sha256", "title", "markdown", "links"}}}
+
+
+def empty_state() -> dict:
+    return {"version": 1, "output_sha256": None, "output_key": None, "pages": {}}
+
+
+def _decode(raw: bytes) -> dict:
+    if raw[:2] == b"\x1f\x8b":
+        raw = gzip.decompress(raw)
+    state = json.loads(raw.decode("utf-8"))
+    if not isinstance(state, dict) or state.get("version") != 1:
+        return empty_state()
+    return {**empty_state(), **state}
+
+
+class NullFetchStateStore:
+    def load(self) -> dict:
+        return empty_state()
+
+    def save(self, state: dict) -> None:
+        return None
+
+
+class FileFetchStateStore:
+    """
+    Local JSON file; used for tests and local runs.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> dict:
+        try:
+            with open(self.path, "rb") as f:
+                return _decode(f.read())
+        except FileNotFoundError:
+            return empty_state()
+        except Exception as e:
+            print("WARN: fetch state unreadable, starting fresh:", str(e))
+            return empty_state()
+
+    def save(self, state: dict) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+
+class S3FetchStateStore:
+    """
+    One gzipped JSON object. A missing or unreadable object means a full
+    crawl, never a failed run.
+    """
+
+    def __init__(self, s3_client, bucket: str, key: str):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.key = key
+
+    def load(self) -> dict:
+        try:
+            obj = self.s3.get_object(Bucket=self.bucket, Key=self.key)
+            return _decode(obj["Body"].read())
+        except Exception as e:
+            code = (getattr(e, "response", None) or {}).get("Error", {}).get("Code")
+            if code not in ("NoSuchKey", "404"):
+                print("WARN: fetch state load failed, starting fresh:", str(e))
+            return empty_state()
+
+    def save(self, state: dict) -> None:
+        try:
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=self.key,
+                Body=gzip.compress(json.dumps(state).encode("utf-8")),
+                ContentType="application/json",
+                ContentEncoding="gzip",
+            )
+        except Exception as e:
+            print("WARN: fetch state save failed:", str(e))
+
+
+def make_fetch_state_store(backend: str, s3_client=None, bucket: str = "",
+                           key: str = "state/fetch_state.json.gz", path: str = "/tmp/fetch_state.json"):
+    backend = (backend or "none").lower()
+    if backend == "s3" and bucket:
+        return S3FetchStateStore(s3_client, bucket, key)
+    if backend == "file":
+        return FileFetchStateStore(path)
+    return NullFetchStateStore()
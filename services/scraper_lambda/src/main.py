@@ -1,21 +1,48 @@
-import asyncio, re, hashlib, os, pathlib
+import asyncio, re, hashlib, json, os, pathlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timezone
 from urllib.parse import urljoin, urlparse, urldefrag
 import httpx
 from selectolax.parser import HTMLParser
 import html2text
 import boto3
-from helper.clean_data import clean_text
+from helper.clean_data import DEFAULT_RULES, clean_text, make_cleaner
+from helper.fetch_state import make_fetch_state_store
 # -------- config (reuse your keys/values) --------
 S3_BUCKET         = os.environ.get("S3_BUCKET", "utd-catalog-amruth")
 SEED_URL          = os.environ.get("SEED_URL", "https://catalog.utdallas.edu/2025/graduate/courses")
 INCLUDE_FRAGMENT  = os.environ.get("INCLUDE_FRAGMENT", "/courses/")    # keep only links that contain this
-RATE_SLEEP        = float(os.environ.get("RATE_SLEEP", "0.25"))
+RATE_SLEEP        = float(os.environ.get("RATE_SLEEP", "0.25"))        # min gap between requests per host
 MIN_LEN           = int(os.environ.get("MIN_LEN", "300"))
 MAX_PAGES         = int(os.environ.get("MAX_PAGES", "0"))              # 0 = no cap
+MAX_DEPTH         = int(os.environ.get("MAX_DEPTH", "3"))              # link hops from the seed
+
+# shards: one object per page under SHARD_PREFIX (+ index.json); single: one all_<ts>.md
+OUTPUT_MODE         = os.environ.get("OUTPUT_MODE", "shards")
+SHARD_PREFIX        = os.environ.get("SHARD_PREFIX", "catalog/pages/")
+SHARD_PUT_CONCURRENCY = int(os.environ.get("SHARD_PUT_CONCURRENCY", "16"))
+# Shards missing from a crawl are only deleted when the crawl finished cleanly
+# and kept at least this share of the previously indexed pages; otherwise a
+# partial crawl (timeouts, a rate-limited host) would delete live pages.
+PRUNE_MIN_RATIO     = float(os.environ.get("PRUNE_MIN_RATIO", "0.9"))
+# where OUTPUT_MODE=single wrote its all_<ts>.md dumps (see _make_s3_key)
+LEGACY_PREFIX       = os.environ.get("LEGACY_PREFIX", "catalog/")
+
+# Per-page cleaning: markdown (keeps structure and SOURCE headers) | legacy (clean_text) | none
+CLEAN_MODE          = os.environ.get("CLEAN_MODE", "markdown")
+CLEAN_RULES         = os.environ.get("CLEAN_RULES", "")   # comma-separated subset of clean_data rules
+
+# Conditional-GET state carried between runs: s3 | file | none
+FETCH_STATE_BACKEND = os.environ.get("FETCH_STATE_BACKEND", "s3")
+FETCH_STATE_BUCKET  = os.environ.get("FETCH_STATE_BUCKET", S3_BUCKET)
+FETCH_STATE_KEY     = os.environ.get("FETCH_STATE_KEY", "state/fetch_state.json.gz")
+FETCH_STATE_PATH    = os.environ.get("FETCH_STATE_PATH", "/tmp/fetch_state.json")
 
 TIMEOUT_SEC       = 20
-CONCURRENCY       = 8                                                  # small, polite
+CONCURRENCY       = int(os.environ.get("CONCURRENCY", "8"))            # small, polite
+PARSE_EXECUTOR    = os.environ.get("PARSE_EXECUTOR", "thread")          # thread | process | inline
+PARSE_WORKERS     = int(os.environ.get("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARSE_QUEUE_SIZE  = int(os.environ.get("PARSE_QUEUE_SIZE", str(2 * CONCURRENCY)))  # fetched pages awaiting parse
 HEADERS = {
     "user-agent": ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
                    "(KHTML, like Gecko) Chrome/124 Safari/537.36"),
@@ -23,13 +50,13 @@ HEADERS = {
 }
 
 _s3 = boto3.client("s3")
-_md = html2text.HTML2Text()
-_md.ignore_links = False
-_md.body_width = 0
-
-def _same_site(u, seed):
-    a, b = urlparse(u), urlparse(seed)
-    return (a.scheme, a.netloc) == (b.scheme, b.netloc)
+def _converter() -> html2text.HTML2Text:
+    # HTML2Text keeps parser state between handle() calls, so a shared
+    # instance leaks formatting across pages (and races across threads).
+    md = html2text.HTML2Text()
+    md.ignore_links = False
+    md.body_width = 0
+    return md
 
 def _normalize(seed, href):
     if not href:
@@ -51,110 +78,392 @@ def _header(url: str, title: str | None) -> str:
     h = f"\n\n### SOURCE: {url}\n"
     return h + (f"#### {t}\n\n" if t else "\n")
 
-async def fetch_html(client: httpx.AsyncClient, url: str) -> str | None:
+NOT_MODIFIED = object()
+
+async def fetch_html(client: httpx.AsyncClient, url: str, prev: dict | None = None) -> tuple:
+    """
+    GET `url`, conditional on the ETag/Last-Modified stored in `prev`.
+    Returns (html, validators): html is NOT_MODIFIED on a 304 and None on
+    failure; validators are the response's ETag/Last-Modified.
+    """
+    headers = dict(HEADERS)
+    if prev:
+        if prev.get("etag"):
+            headers["if-none-match"] = prev["etag"]
+        if prev.get("last_modified"):
+            headers["if-modified-since"] = prev["last_modified"]
     try:
-        r = await client.get(url, headers=HEADERS, timeout=TIMEOUT_SEC, follow_redirects=True)
+        r = await client.get(url, headers=headers, timeout=TIMEOUT_SEC, follow_redirects=True)
+        validators = {"etag": r.headers.get("etag"), "last_modified": r.headers.get("last-modified")}
+        if r.status_code == 304 and prev:
+            return NOT_MODIFIED, validators
         if r.status_code >= 400 or "text/html" not in r.headers.get("content-type", ""):
-            return None
-        return r.text
+            return None, {}
+        return r.text, validators
     except Exception:
-        return None
+        return None, {}
 
-def extract_title_and_links(seed: str, html: str) -> tuple[str | None, list[str]]:
-    doc = HTMLParser(html)
+def _title_and_links(seed: str, doc: HTMLParser) -> tuple[str | None, list[str]]:
     title = None
     # try standard <title>
     tnode = doc.css_first("title")
     if tnode and tnode.text():
         title = tnode.text().strip()
-    # collect all internal links
+    # collect all internal links; same-site is a prefix test against the
+    # seed's origin rather than two urlparse calls per anchor
+    base = urlparse(seed)
+    origin = f"{base.scheme}://{base.netloc}"
     links = []
     for a in doc.css("a[href]"):
         href = a.attributes.get("href")
         url = _normalize(seed, href)
         if not url:
             continue
-        if _same_site(url, seed) and (INCLUDE_FRAGMENT in url if INCLUDE_FRAGMENT else True):
+        same_site = url.startswith(origin) and url[len(origin):len(origin) + 1] in ("", "/", "?")
+        if same_site and (INCLUDE_FRAGMENT in url if INCLUDE_FRAGMENT else True):
             links.append(url)
     return title, links
 
-def html_to_markdown(html: str) -> str:
+def _markdown(doc: HTMLParser) -> str:
     # Try to focus on main content area if present
-    doc = HTMLParser(html)
     main = doc.css_first("main") or doc.css_first("#content") or doc.css_first(".content") or doc.body
     if not main:
         return ""
     # Convert only that subtree to HTML string, then to Markdown
     subtree_html = main.html if hasattr(main, "html") else str(main)
-    md = _md.handle(subtree_html or "")
+    md = _converter().handle(subtree_html or "")
     # light cleanup
     md = re.sub(r"\n{3,}", "\n\n", md).strip()
     return md
 
-async def crawl_catalog(seed: str) -> str:
-    blocks = []
-    seen  = set()
-    queue = []
+def extract_title_and_links(seed: str, html: str) -> tuple[str | None, list[str]]:
+    return _title_and_links(seed, HTMLParser(html))
 
-    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
-    async with httpx.AsyncClient(http2=True, timeout=TIMEOUT_SEC, limits=limits) as client:
-        # Fetch hub
-        html = await fetch_html(client, seed)
-        if not html:
-            return ""
-        title, links = extract_title_and_links(seed, html)
-        md = html_to_markdown(html)
+def html_to_markdown(html: str) -> str:
+    return _markdown(HTMLParser(html))
+
+def parse_page(seed: str, html: str) -> tuple[str | None, list[str], str]:
+    """
+    Title, in-scope links and markdown from a single parse. CPU-bound and
+    picklable, so the crawler runs it in PARSE_EXECUTOR off the event loop.
+    """
+    doc = HTMLParser(html)
+    title, links = _title_and_links(seed, doc)
+    return title, links, _markdown(doc)
+
+def make_parse_executor(kind: str | None = None, workers: int | None = None):
+    """
+    "thread" (default) works everywhere and keeps the loop responsive;
+    "process" gives real parallelism but needs /dev/shm, which Lambda lacks;
+    "inline" parses on the event loop (the old behaviour, for benchmarks).
+    """
+    kind = (kind or PARSE_EXECUTOR or "thread").lower()
+    workers = workers or PARSE_WORKERS
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    if kind == "inline":
+        return None
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parse")
+
+class HostRateLimiter:
+    """
+    Spaces request starts to the same host at least `min_interval` apart,
+    without holding a concurrency slot while waiting.
+    """
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next: dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url: str) -> None:
+        host = urlparse(url).netloc
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            start = max(now, self._next.get(host, now))
+            self._next[host] = start + self.min_interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+async def crawl_catalog(seed: str, prev_pages: dict | None = None, new_pages: dict | None = None) -> str:
+    """
+    The whole crawl as one markdown document (see crawl_pages).
+    """
+    pages = await crawl_pages(seed, prev_pages, new_pages)
+    return "".join(_header(url, title) + md + "\n---\n" for url, title, md in pages)
+
+async def crawl_pages(seed: str, prev_pages: dict | None = None, new_pages: dict | None = None,
+                      report: dict | None = None) -> list[tuple[str, str | None, str]]:
+    """
+    Returns (url, title, markdown) for every page kept.
+
+    BFS over the catalog from `seed`: a fixed pool of CONCURRENCY workers pulls
+    from a deduplicating frontier, follows in-scope links up to MAX_DEPTH, and
+    stops enqueueing once MAX_PAGES URLs have been scheduled (0 = no cap).
+    Pages are emitted in discovery order so output is stable across runs.
+
+    `prev_pages` is the fetch state from the last run: requests are made
+    conditional on it, and a 304 (or an identical body) reuses the stored
+    title/links/markdown instead of re-parsing. A page that fails to fetch
+    falls back to its stored copy. Every visited page's state is written to
+    `new_pages`. `report`, if given, receives the crawl counters, including
+    "failed" (pages lost with no stored copy) and "truncated" (MAX_PAGES cut
+    the frontier short): either means the crawl saw less than the catalog.
+    """
+    prev_pages = prev_pages or {}
+    new_pages = {} if new_pages is None else new_pages
+    queue: asyncio.Queue = asyncio.Queue()
+    # Fetched pages waiting to be parsed. Bounded so fetchers stall rather
+    # than pile up HTML in memory when parsing falls behind.
+    parse_q: asyncio.Queue = asyncio.Queue(maxsize=PARSE_QUEUE_SIZE)
+    order: dict[str, int] = {seed: 0}  # doubles as the seen-set
+    pages: dict[str, tuple[str | None, str]] = {}
+    stats = {"fetched": 0, "not_modified": 0, "same_body": 0, "stale": 0, "failed": 0, "truncated": False}
+    limiter = HostRateLimiter(RATE_SLEEP)
+    executor = make_parse_executor()
+    loop = asyncio.get_running_loop()
+    queue.put_nowait((seed, 0))
+
+    def accept(url: str, depth: int, entry: dict) -> None:
+        new_pages[url] = entry
+        title, links, md = entry.get("title"), entry.get("links") or [], entry.get("markdown") or ""
         if md and len(md) >= MIN_LEN:
-            blocks += [_header(seed, title), md, "\n---\n"]
-        # seed queue
+            pages[url] = (title, md)
+        if depth >= MAX_DEPTH:
+            return
         for u in links:
-            if u not in seen:
-                seen.add(u)
-                queue.append(u)
-
-        # BFS over subject/course pages
-        count = 1
-        sem = asyncio.Semaphore(CONCURRENCY)
-
-        async def worker(url: str):
-            nonlocal count
-            async with sem:
-                h = await fetch_html(client, url)
-                await asyncio.sleep(RATE_SLEEP)
-            if not h:
-                return None
-            t, _ = extract_title_and_links(seed, h)
-            m = html_to_markdown(h)
-            if m and len(m) >= MIN_LEN:
-                blocks.extend([_header(url, t), m, "\n---\n"])
-                count += 1
-            return None
-
-        tasks = []
-        for url in queue:
-            if MAX_PAGES and count >= MAX_PAGES:
+            if u in order:
+                continue
+            if MAX_PAGES and len(order) >= MAX_PAGES:
+                stats["truncated"] = True
                 break
-            tasks.append(asyncio.create_task(worker(url)))
-        if tasks:
-            await asyncio.gather(*tasks)
+            order[u] = len(order)
+            queue.put_nowait((u, depth + 1))
 
-    return "".join(blocks)
+    # A frontier item is marked done only once it has been fully handled,
+    # after parsing if it needed one, so queue.join() covers both stages.
+    async def fetcher():
+        while True:
+            url, depth = await queue.get()
+            handed_off = False
+            try:
+                prev = prev_pages.get(url)
+                await limiter.wait(url)
+                html, validators = await fetch_html(client, url, prev)
+                sha = hashlib.sha256(html.encode("utf-8")).hexdigest() if isinstance(html, str) else None
+                if html is NOT_MODIFIED or (sha and prev and sha == prev.get("sha256")):
+                    stats["not_modified" if html is NOT_MODIFIED else "same_body"] += 1
+                    accept(url, depth, {**prev, **{k: v for k, v in validators.items() if v}})
+                elif html:
+                    stats["fetched"] += 1
+                    await parse_q.put((url, depth, html, {**validators, "sha256": sha}))
+                    handed_off = True
+                elif prev:
+                    stats["stale"] += 1
+                    accept(url, depth, prev)
+                else:
+                    stats["failed"] += 1
+            except Exception as e:
+                stats["failed"] += 1
+                print("WARN: page failed:", url, str(e))
+            finally:
+                if not handed_off:
+                    queue.task_done()
 
-# ---------- Lambda handler ----------
-def handler(event, context):
-    # Ensure /tmp exists (Lambda)
-    pathlib.Path("/tmp").mkdir(exist_ok=True)
-    text = asyncio.run(crawl_catalog(SEED_URL))
+    async def parser():
+        while True:
+            url, depth, html, meta = await parse_q.get()
+            try:
+                if executor is None:
+                    title, links, md = parse_page(seed, html)
+                else:
+                    title, links, md = await loop.run_in_executor(executor, parse_page, seed, html)
+                accept(url, depth, {**meta, "title": title, "markdown": md, "links": links})
+            except Exception as e:
+                stats["failed"] += 1
+                print("WARN: parse failed:", url, str(e))
+            finally:
+                parse_q.task_done()
+                queue.task_done()
+
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(http2=True, timeout=TIMEOUT_SEC, limits=limits) as client:
+        n_parsers = 1 if executor is None else PARSE_WORKERS
+        tasks = [asyncio.create_task(fetcher()) for _ in range(CONCURRENCY)]
+        tasks += [asyncio.create_task(parser()) for _ in range(n_parsers)]
+        try:
+            await queue.join()
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    print("CRAWL:", {"scheduled": len(order), "pages": len(pages), **stats})
+    if report is not None:
+        report.update(stats, scheduled=len(order), pages=len(pages))
+    return [(url, *pages[url]) for url in sorted(pages, key=order.__getitem__)]
+
+# ---------- Output ----------
+def _page_cleaner():
+    mode = CLEAN_MODE.lower()
+    if mode == "legacy":
+        return clean_text
+    if mode == "none":
+        return str.strip
+    rules = [r.strip() for r in CLEAN_RULES.split(",") if r.strip()] or DEFAULT_RULES
+    return make_cleaner(rules)
+
+clean_page = _page_cleaner()
+
+def _shard_key(url: str) -> str:
+    """
+    Stable per-page key: a readable slug of the URL path plus a short hash
+    of the full URL so distinct URLs never collide.
+    """
+    p = urlparse(url)
+    path = p.path + (f"?{p.query}" if p.query else "")
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", path.strip("/"))[:150] or "index"
+    return f"{SHARD_PREFIX}{slug}-{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}.md"
+
+def _load_index(key: str) -> dict:
+    try:
+        obj = _s3.get_object(Bucket=S3_BUCKET, Key=key)
+        return json.loads(obj["Body"].read().decode("utf-8")).get("pages") or {}
+    except Exception as e:
+        code = (getattr(e, "response", None) or {}).get("Error", {}).get("Code")
+        if code not in ("NoSuchKey", "404"):
+            print("WARN: shard index unreadable, rewriting all shards:", str(e))
+        return {}
+
+def write_single(pages: list, state: dict) -> dict:
+    """
+    Legacy output: every page in one all_<timestamp>.md.
+    """
+    text = "\n\n---\n\n".join(clean_page(_header(url, title) + md) for url, title, md in pages)
     if not text or len(text.strip()) < MIN_LEN:
         return {"wrote": False, "reason": "empty/short", "seed": SEED_URL}
-    raw_text=clean_text(text)
     sha = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    if sha == state["output_sha256"]:
+        # Nothing changed: don't write a new object (which would trigger a
+        # full re-ingest downstream).
+        return {"wrote": False, "reason": "unchanged", "key": state["output_key"], "sha256": sha}
     s3_key = _make_s3_key()
     _s3.put_object(
         Bucket=S3_BUCKET,
         Key=s3_key,
-        Body=raw_text.encode("utf-8"),
+        Body=text.encode("utf-8"),
         Metadata={"sha256": sha, "seed": SEED_URL},
         ContentType="text/markdown; charset=utf-8",
     )
-    return {"bucket": S3_BUCKET, "key": s3_key, "sha256": sha, "bytes": len(text)}
\ No newline at end of file
+    state.update(output_sha256=sha, output_key=s3_key)
+    return {"bucket": S3_BUCKET, "key": s3_key, "sha256": sha, "bytes": len(text)}
+
+def _is_dump(key: str) -> bool:
+    return re.fullmatch(r"all_[^/]*\.md", key.rsplit("/", 1)[-1]) is not None
+
+def _legacy_dumps() -> list:
+    """
+    Every all_<ts>.md under LEGACY_PREFIX, whether or not the fetch state
+    recorded it (dumps from before output_key was tracked never were).
+    """
+    paginator = _s3.get_paginator("list_objects_v2")
+    keys, folders = [], []
+    # one level of <year>/ folders; the shard prefix holds no dumps
+    for page in paginator.paginate(Bucket=S3_BUCKET, Prefix=LEGACY_PREFIX, Delimiter="/"):
+        keys += [o["Key"] for o in page.get("Contents") or [] if _is_dump(o["Key"])]
+        folders += [p["Prefix"] for p in page.get("CommonPrefixes") or [] if p["Prefix"] != SHARD_PREFIX]
+    for folder in folders:
+        for page in paginator.paginate(Bucket=S3_BUCKET, Prefix=folder):
+            keys += [o["Key"] for o in page.get("Contents") or [] if _is_dump(o["Key"])]
+    return keys
+
+def write_shards(pages: list, state: dict, complete: bool = True) -> dict:
+    """
+    One object per page under SHARD_PREFIX plus SHARD_PREFIX/index.json
+    (url -> key, sha256, title). Only pages whose content changed are
+    written, and shards of pages no longer in the catalog are deleted, so
+    each S3 event re-ingests exactly one changed page.
+
+    Deletion needs a crawl that is `complete` (no lost pages, not cut short)
+    and kept at least PRUNE_MIN_RATIO of the indexed pages. Otherwise the
+    missing pages keep their shards and index entries until a full crawl.
+    """
+    index_key = f"{SHARD_PREFIX}index.json"
+    old = _load_index(index_key)
+    new, changed = {}, []
+    for url, title, md in pages:
+        body = clean_page(_header(url, title) + md)
+        sha = hashlib.sha256(body.encode("utf-8")).hexdigest()
+        key = _shard_key(url)
+        new[url] = {"key": key, "sha256": sha, "title": title}
+        if old.get(url) != new[url]:
+            changed.append((url, key, sha, body))
+    stale_keys = {v["key"] for v in old.values()} - {v["key"] for v in new.values()}
+
+    pruned = True
+    if stale_keys and (not complete or len(new) < PRUNE_MIN_RATIO * len(old)):
+        print("WARN: partial crawl, keeping shards of missing pages:",
+              json.dumps({"complete": complete, "pages": len(new), "indexed": len(old), "missing": len(stale_keys)}))
+        new = {**{u: v for u, v in old.items() if v["key"] in stale_keys}, **new}
+        stale_keys, pruned = set(), False
+
+    def put(item):
+        url, key, sha, body = item
+        _s3.put_object(
+            Bucket=S3_BUCKET,
+            Key=key,
+            Body=body.encode("utf-8"),
+            Metadata={"sha256": sha, "source_url": url},
+            ContentType="text/markdown; charset=utf-8",
+        )
+
+    with ThreadPoolExecutor(max_workers=SHARD_PUT_CONCURRENCY) as pool:
+        list(pool.map(put, changed))
+        list(pool.map(lambda k: _s3.delete_object(Bucket=S3_BUCKET, Key=k), sorted(stale_keys)))
+
+    # Retire the old single-file dumps so ingest drops their vectors (and
+    # retrieval stops seeing every page twice). Only after a full crawl: a
+    # page a partial crawl missed may exist nowhere else.
+    legacy = set()
+    if pruned:
+        legacy = set(_legacy_dumps())
+        if state.get("output_key"):
+            legacy.add(state["output_key"])
+        for key in sorted(legacy):
+            _s3.delete_object(Bucket=S3_BUCKET, Key=key)
+        state.update(output_sha256=None, output_key=None)
+
+    if changed or stale_keys or old.keys() != new.keys():
+        _s3.put_object(
+            Bucket=S3_BUCKET,
+            Key=index_key,
+            Body=json.dumps({"seed": SEED_URL, "updated_at": datetime.now(timezone.utc).isoformat(),
+                             "pages": new}).encode("utf-8"),
+            ContentType="application/json",
+        )
+    return {"bucket": S3_BUCKET, "index": index_key, "pages": len(new),
+            "written": len(changed), "deleted": len(stale_keys), "pruned": pruned,
+            "legacy_deleted": len(legacy), "wrote": bool(changed or stale_keys)}
+
+# ---------- Lambda handler ----------
+def handler(event, context):
+    # Ensure /tmp exists (Lambda)
+    pathlib.Path("/tmp").mkdir(exist_ok=True)
+    store = make_fetch_state_store(FETCH_STATE_BACKEND, _s3, FETCH_STATE_BUCKET, FETCH_STATE_KEY, FETCH_STATE_PATH)
+    state = store.load()
+    new_pages, report = {}, {}
+    pages = asyncio.run(crawl_pages(SEED_URL, state["pages"], new_pages, report))
+    if not pages:
+        # never treat a failed crawl as "every page was removed"
+        return {"wrote": False, "reason": "empty", "seed": SEED_URL}
+    if OUTPUT_MODE == "single":
+        result = write_single(pages, state)
+    else:
+        complete = not report.get("failed") and not report.get("truncated")
+        result = write_shards(pages, state, complete)
+    store.save({**state, "pages": new_pages})
+    return result
@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+from agent_core import tracing
+
+_clients: Dict[Tuple[str, str, str], Any] = {}
+_installed: Dict[Tuple[str, str], Any] = {}
+_lock = threading.Lock()
+
+
+def _region(region_name: str) -> str:
+    return region_name or os.environ.get("AWS_REGION") or os.environ.get("AWS_DEFAULT_REGION") or ""
+
+
+def get_client(service: str, region_name: str = "", **config) -> Any:
+    """
+    One boto3 client per (service, region, config) per container, created on
+    first use. `config` goes to botocore's Config (pool size, timeouts,
+    retries); callers asking for the same settings share one client.
+    boto3/botocore are imported here too, so a process that never calls AWS
+    (health checks, bad requests, local runs with fakes) never pays for them.
+    """
+    region = _region(region_name)
+    installed = _installed.get((service, region))
+    if installed is not None:
+        return installed
+    key = (service, region, json.dumps(config, sort_keys=True))
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                import boto3
+
+                kwargs = {}
+                if config:
+                    from botocore.config import Config
+
+                    kwargs["config"] = Config(**config)
+                client = boto3.client(service, region_name=region or None, **kwargs)
+                _instrument(client)
+                _clients[key] = client
+    return client
+
+
+def _instrument(client) -> None:
+    """
+    Trace every API call the client makes as an "aws" span named
+    service.Operation: wall time, bytes out (request body) and in
+    (Content-Length), HTTP status, and Bedrock's token-count headers.
+    """
+    meta = getattr(client, "meta", None)
+    if meta is None or not hasattr(meta, "events"):
+        return  # a stand-in client (local fakes)
+    service = meta.service_model.service_name
+
+    def before(model, params, context, **kwargs):
+        context["trace_start"] = time.perf_counter()
+        context["trace_bytes_out"] = _body_size(params.get("body", params.get("Body")))
+
+    def after(http_response, parsed, model, context, **kwargs):
+        start = context.get("trace_start")
+        if start is None:
+            return
+        headers = http_response.headers
+        attrs = {
+            "status": http_response.status_code,
+            "bytes_out": context.get("trace_bytes_out", 0),
+            "bytes_in": int(headers.get("content-length") or 0),
+        }
+        for attr, header in (("input_tokens", "x-amzn-bedrock-input-token-count"),
+                             ("output_tokens", "x-amzn-bedrock-output-token-count")):
+            if headers.get(header):
+                attrs[attr] = int(headers[header])
+        if http_response.status_code >= 400:
+            attrs["error"] = (parsed or {}).get("Error", {}).get("Code") or str(http_response.status_code)
+        tracing.add_span("aws", f"{service}.{model.name}", start, **attrs)
+
+    def error(exception, model, context, **kwargs):
+        start = context.get("trace_start")
+        if start is not None:
+            tracing.add_span("aws", f"{service}.{model.name}", start, error=type(exception).__name__)
+
+    # before-parameter-build always fires; before-call stops at the first
+    # handler that returns a response
+    meta.events.register("before-parameter-build", before)
+    meta.events.register("after-call", after)
+    meta.events.register("after-call-error", error)
+
+
+def _body_size(body) -> int:
+    if isinstance(body, (bytes, str)):
+        return len(body)
+    if hasattr(body, "getbuffer"):  # S3 wraps bytes bodies in BytesIO
+        return len(body.getbuffer())
+    return 0
+
+
+def set_client(service: str, client: Any, region_name: str = "") -> None:
+    """
+    Install a client (e.g. a local fake) for every get_client / lazy_client
+    of this service, whatever config they ask for.
+    """
+    with _lock:
+        _installed[(service, _region(region_name))] = client
+
+
+class lazy_client:
+    """
+    Module-level stand-in for `boto3.client(service)`: attribute access goes to
+    the shared client from get_client, created the first time it's needed.
+    """
+
+    def __init__(self, service: str, region_name: str = ""):
+        self._service = service
+        self._region = region_name
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_client(self._service, self._region), name)
+
+    def __repr__(self) -> str:
+        return f"lazy_client({self._service!r})"
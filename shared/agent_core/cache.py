@@ -0,0 +1,448 @@
+import asyncio
+import hashlib
+import json
+import math
+import operator
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from agent_core.tracing import cache_event
+
+_MISSING = object()
+
+
+def stable_hash(*parts: Any) -> str:
+    """
+    sha256 over the parts (str / bytes / JSON-able), for cache keys.
+    """
+    h = hashlib.sha256()
+    for p in parts:
+        if isinstance(p, bytes):
+            h.update(p)
+        elif isinstance(p, str):
+            h.update(p.encode("utf-8"))
+        else:
+            h.update(json.dumps(p, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU with a per-entry TTL. Lives at module scope so
+    it survives across warm Lambda invocations.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+class S3CacheBackend:
+    """
+    Shared cache level for cross-container hits: one JSON object per key with
+    its own expiry. Failures are logged and treated as misses.
+    """
+
+    def __init__(self, s3_client, bucket: str, prefix: str = "agent-cache/"):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def get(self, key: str) -> Any:
+        try:
+            obj = self.s3.get_object(Bucket=self.bucket, Key=f"{self.prefix}{key}.json")
+            item = json.loads(obj["Body"].read())
+        except Exception as e:
+            code = (getattr(e, "response", None) or {}).get("Error", {}).get("Code")
+            if code not in ("NoSuchKey", "404"):
+                print("WARN: shared cache get failed:", key, str(e))
+            return _MISSING
+        if item.get("expires", 0) < time.time():
+            return _MISSING
+        return item.get("value")
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        try:
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=f"{self.prefix}{key}.json",
+                Body=json.dumps({"expires": time.time() + ttl, "value": value}).encode("utf-8"),
+                ContentType="application/json",
+            )
+        except Exception as e:
+            print("WARN: shared cache set failed:", key, str(e))
+
+
+class TwoLevelCache:
+    """
+    In-process TTLCache in front of an optional shared backend. Values that go
+    to the shared level must be JSON-serialisable. With a `name`, lookups are
+    reported to tracing (hit / shared_hit / miss).
+    """
+
+    def __init__(self, local: TTLCache, shared: Optional[S3CacheBackend] = None, name: str = ""):
+        self.local = local
+        self.shared = shared
+        self.name = name
+        self.shared_hits = 0
+
+    def _event(self, outcome: str) -> None:
+        if self.name:
+            cache_event(self.name, outcome)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self._event("hit")
+            return value
+
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not _MISSING:
+                self.shared_hits += 1
+                self._event("shared_hit")
+                self.local.set(key, value, ttl)
+                return value
+
+        self._event("miss")
+        value = compute()
+        self.local.set(key, value, ttl)
+        if self.shared is not None:
+            self.shared.set(key, value, self.local.ttl if ttl is None else ttl)
+        return value
+
+    def clear(self) -> None:
+        self.local.clear()
+
+    def stats(self) -> dict:
+        return {**self.local.stats(), "shared_hits": self.shared_hits}
+
+
+class SWRCache:
+    """
+    TTL cache with stale-while-revalidate and request coalescing.
+
+    - fresh entry (age < ttl): returned as is
+    - stale entry (age < ttl + stale_ttl): returned immediately while one
+      background refresh runs
+    - missing/expired: the first caller fetches; concurrent callers for the
+      same key wait on that fetch instead of issuing their own
+
+    Fetch errors are never cached; they propagate to every waiting caller.
+    With a `name`, lookups are reported to tracing (hit / stale / miss /
+    coalesced).
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 600.0, stale_ttl: float = 3600.0, refresh_workers: int = 2,
+                 name: str = ""):
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._inflight: "dict[Hashable, Future]" = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="swr")
+        self._tasks: set = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.fetches = 0
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _finish(self, key: Hashable, fut: Future, value: Any = _MISSING, exc: Optional[BaseException] = None) -> None:
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            self._store(key, value)
+            fut.set_result(value)
+        with self._lock:
+            self._inflight.pop(key, None)
+            self.fetches += 1
+
+    def _run(self, key: Hashable, fetch: Callable[[], Any], fut: Future) -> None:
+        try:
+            value = fetch()
+        except BaseException as e:
+            self._finish(key, fut, exc=e)
+        else:
+            self._finish(key, fut, value)
+
+    async def _arun(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], fut: Future) -> None:
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            # only the fetch task itself was cancelled (e.g. loop shutdown);
+            # waiters get an ordinary error, never a CancelledError that
+            # would look like their own cancellation
+            self._finish(key, fut, exc=RuntimeError(f"fetch for {key!r} was cancelled"))
+            raise
+        except BaseException as e:
+            self._finish(key, fut, exc=e)
+        else:
+            self._finish(key, fut, value)
+
+    def _spawn(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], fut: Future) -> None:
+        task = asyncio.get_running_loop().create_task(self._arun(key, fetch, fut))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _claim(self, key: Hashable):
+        """
+        (value, future, start): a hit returns its value, plus a future to
+        refresh into if it's stale and no refresh is running. A miss returns
+        _MISSING and the in-flight future, with start=True for the caller
+        that has to fetch it.
+        """
+        with self._lock:
+            claim, outcome = self._claim_locked(key, time.time())
+        if self.name:
+            cache_event(self.name, outcome)
+        return claim
+
+    def _claim_locked(self, key: Hashable, now: float):
+        item = self._data.get(key)
+        if item is not None:
+            age = now - item[0]
+            if age < self.ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return (item[1], None, False), "hit"
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                if key in self._inflight:
+                    return (item[1], None, False), "stale"
+                fut = self._inflight[key] = Future()
+                return (item[1], fut, True), "stale"
+
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = self._inflight[key] = Future()
+            self.misses += 1
+            return (_MISSING, fut, True), "miss"
+        self.coalesced += 1
+        return (_MISSING, fut, False), "coalesced"
+
+    def get(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        value, fut, start = self._claim(key)
+        if value is not _MISSING:
+            if start:
+                self._pool.submit(self._run, key, fetch, fut)
+            return value
+        if start:
+            self._run(key, fetch, fut)
+        return fut.result()
+
+    async def aget(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        get() for a coroutine fetch. Same entries and coalescing, so sync and
+        async callers wait on each other's fetches. Fetches and stale
+        refreshes run as their own tasks on the running loop, and callers
+        wait through a shield: a caller cancelled by its deadline stops
+        waiting without cancelling the fetch the other callers share.
+        """
+        value, fut, start = self._claim(key)
+        if value is not _MISSING:
+            if start:
+                self._spawn(key, fetch, fut)
+            return value
+        if start:
+            self._spawn(key, fetch, fut)
+        return await asyncio.shield(asyncio.wrap_future(fut))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """
+        Seconds since the cached value for key was fetched, or None.
+        """
+        item = self._data.get(key)
+        return None if item is None else time.time() - item[0]
+
+    def fetched_at(self, key: Hashable) -> Optional[float]:
+        """
+        Epoch time the cached value for key was fetched, or None. Changes
+        whenever a refresh lands, so it doubles as a snapshot version.
+        """
+        item = self._data.get(key)
+        return None if item is None else item[0]
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "fetches": self.fetches,
+        }
+
+
+class SemanticCache:
+    """
+    Bounded LRU looked up by embedding similarity rather than by key. get()
+    finds the entry whose vector is closest to the query; it's a hit if the
+    cosine similarity reaches `threshold`, the entry is younger than `ttl`
+    and `valid(meta)` accepts the metadata stored with it (e.g. the data
+    versions the value was built from). An expired or invalid match is
+    dropped and reported as stale. With a `name`, lookups are reported to
+    tracing (hit / stale / miss).
+
+    The scan is a pure-Python dot product per entry (vectors are normalised
+    on insert), so keep maxsize in the hundreds.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600.0, threshold: float = 0.95, name: str = ""):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.threshold = threshold
+        self.name = name
+        # id -> (expires, unit vector, meta, value)
+        self._data: "OrderedDict[int, tuple[float, array, Any, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _unit(vec) -> array:
+        norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+        return array("f", (x / norm for x in vec))
+
+    def _nearest(self, q: array):
+        """
+        (id, similarity) of the closest entry, or (None, -1.0). Caller holds
+        the lock.
+        """
+        best_id, best = None, -1.0
+        for i, (_, v, _, _) in self._data.items():
+            sim = sum(map(operator.mul, q, v))
+            if sim > best:
+                best_id, best = i, sim
+        return best_id, best
+
+    def _event(self, outcome: str) -> None:
+        if self.name:
+            cache_event(self.name, outcome)
+
+    def get(self, vec, valid: Optional[Callable[[Any], bool]] = None, default: Any = None) -> Any:
+        q = self._unit(vec)
+        with self._lock:
+            i, sim = self._nearest(q)
+            item = self._data[i] if i is not None and sim >= self.threshold else None
+        if item is None:
+            with self._lock:
+                self.misses += 1
+            self._event("miss")
+            return default
+
+        # valid() may do I/O (a version check), so it runs unlocked
+        expires, _, meta, value = item
+        fresh = expires >= time.monotonic() and (valid is None or valid(meta))
+        with self._lock:
+            if fresh:
+                if i in self._data:
+                    self._data.move_to_end(i)
+                self.hits += 1
+            else:
+                self._data.pop(i, None)
+                self.stale += 1
+        self._event("hit" if fresh else "stale")
+        return value if fresh else default
+
+    def set(self, vec, value: Any, meta: Any = None, ttl: Optional[float] = None) -> None:
+        """
+        Store value under vec. An existing entry within the threshold is
+        replaced, so paraphrases of one question share a slot.
+        """
+        q = self._unit(vec)
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            i, sim = self._nearest(q)
+            if i is not None and sim >= self.threshold:
+                del self._data[i]
+            self._next_id += 1
+            self._data[self._next_id] = (expires, q, meta, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.stale + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "stale": self.stale,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
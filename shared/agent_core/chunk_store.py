@@ -0,0 +1,135 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+from agent_core.cache import TTLCache
+
+
+def chunk_object_name(vector_key: str) -> str:
+    """
+    "{doc_id}:{hash}" -> "{doc_id}/{hash}.md". Vector keys are content
+    addressed, so an object never changes once written.
+    """
+    return vector_key.replace(":", "/") + ".md"
+
+
+class _ChunkStore:
+    """
+    Full chunk text by vector key, written at ingest next to the vector (whose
+    metadata only holds a 1000-char preview). Reads fetch every miss in one
+    concurrent batch; an LRU in front survives warm invocations, with no TTL
+    since objects are immutable.
+    """
+
+    def __init__(self, concurrency: int = 16, cache_size: int = 2048):
+        self.concurrency = max(1, concurrency)
+        self.cache = TTLCache(cache_size, float("inf"))
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _map(self, fn, items):
+        items = list(items)
+        if len(items) <= 1:
+            return [fn(x) for x in items]
+        if self._pool is None:
+            # get_many runs on several server threads at once
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.concurrency)
+        # each call runs in a copy of the caller's context, so per-request
+        # tracing sees the S3 calls made on pool threads
+        contexts = [contextvars.copy_context() for _ in items]
+        return list(self._pool.map(lambda c, x: c.run(fn, x), contexts, items))
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """
+        Text for each key that has a stored chunk; keys without one are omitted.
+        """
+        out, missing = {}, []
+        for k in dict.fromkeys(keys):
+            text = self.cache.get(k)
+            if text is None:
+                missing.append(k)
+            else:
+                out[k] = text
+        for k, text in zip(missing, self._map(self._get_one, missing)):
+            if text is not None:
+                self.cache.set(k, text)
+                out[k] = text
+        return out
+
+    def put_many(self, items: Dict[str, str]) -> None:
+        self._map(lambda kv: self._put(kv[0], kv[1]), items.items())
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        self._map(self._delete, list(keys))
+
+    def _get_one(self, key: str) -> Optional[str]:
+        try:
+            return self._get(key)
+        except Exception as e:
+            code = (getattr(e, "response", None) or {}).get("Error", {}).get("Code")
+            if code not in ("NoSuchKey", "404") and not isinstance(e, FileNotFoundError):
+                print("WARN: chunk fetch failed:", key, str(e))
+            return None
+
+
+class S3ChunkStore(_ChunkStore):
+    def __init__(self, s3_client, bucket: str, prefix: str = "chunks/", **kwargs):
+        super().__init__(**kwargs)
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _get(self, key: str) -> str:
+        obj = self.s3.get_object(Bucket=self.bucket, Key=self.prefix + chunk_object_name(key))
+        return obj["Body"].read().decode("utf-8", errors="ignore")
+
+    def _put(self, key: str, text: str) -> None:
+        self.s3.put_object(Bucket=self.bucket, Key=self.prefix + chunk_object_name(key),
+                           Body=text.encode("utf-8"), ContentType="text/markdown; charset=utf-8")
+
+    def _delete(self, key: str) -> None:
+        self.s3.delete_object(Bucket=self.bucket, Key=self.prefix + chunk_object_name(key))
+
+
+class LocalChunkStore(_ChunkStore):
+    """
+    Same layout as files under a directory; for tests and offline runs.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.path, chunk_object_name(key))
+
+    def _get(self, key: str) -> str:
+        with open(self._path(key), encoding="utf-8") as f:
+            return f.read()
+
+    def _put(self, key: str, text: str) -> None:
+        p = self._path(key)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        with open(p + ".tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(p + ".tmp", p)
+
+    def _delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+def make_chunk_store(backend: str, s3_client=None, bucket: str = "", prefix: str = "chunks/",
+                     path: str = "/tmp/chunks", concurrency: int = 16, cache_size: int = 2048):
+    backend = (backend or "none").lower()
+    if backend == "s3" and bucket:
+        return S3ChunkStore(s3_client, bucket, prefix, concurrency=concurrency, cache_size=cache_size)
+    if backend == "local":
+        return LocalChunkStore(path, concurrency=concurrency, cache_size=cache_size)
+    return None
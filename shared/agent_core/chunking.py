@@ -0,0 +1,193 @@
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Optional
+
+# Page headers emitted by the scraper: "### SOURCE: <url>" then "#### <title>".
+# web_extract.py writes the same pair one level up ("# SOURCE:" / "## title").
+SOURCE_RE = re.compile(r"^#{1,3} SOURCE:\s*(\S+)\s*$")
+TITLE_RE = re.compile(r"^#{2,4} (.+?)\s*$")
+
+# Don't cut at a blank line that would leave a chunk less than this full.
+MIN_FILL = 0.6
+
+
+def approx_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 chars per token for English / markdown).
+    """
+    return (len(text) + 3) // 4
+
+
+@dataclass(frozen=True)
+class Chunk:
+    text: str
+    index: int
+    source_url: Optional[str] = None
+    title: Optional[str] = None
+
+    @property
+    def metadata(self) -> dict:
+        md = {"chunk_index": self.index}
+        if self.source_url:
+            md["source_url"] = self.source_url
+        if self.title:
+            md["title"] = self.title
+        return md
+
+
+def iter_line_blocks(stream: Iterable[str]) -> Iterator[List[str]]:
+    """
+    Split an iterable of text pieces (of any size) into lists of whole lines,
+    one list per piece, without ever holding more than one piece plus a
+    partial line.
+    """
+    tail = ""
+    for piece in stream:
+        if not piece:
+            continue
+        text = tail + piece
+        lines = text.split("\n")
+        tail = lines.pop()
+        if "\r" in text:
+            lines = [line.rstrip("\r") for line in lines]
+        yield lines
+    if tail:
+        yield [tail.rstrip("\r")]
+
+
+def iter_lines(stream: Iterable[str]) -> Iterator[str]:
+    for lines in iter_line_blocks(stream):
+        yield from lines
+
+
+_NOTHING: List[str] = []
+
+
+class _Section:
+    """
+    Packs the lines of one page into token-budgeted chunks with overlap.
+    Prefers to cut at a blank line once the chunk is reasonably full.
+
+    add() runs once per input line, so it returns a (usually empty) list of
+    finished chunks rather than being a generator, and the default counter
+    is inlined; both showed up as most of the chunker's CPU time.
+    """
+
+    def __init__(self, max_tokens: int, overlap_tokens: int, count: Callable[[str], int]):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.count = None if count is approx_tokens else count
+        self.lines: List[str] = []
+        self.costs: List[int] = []
+        self.total = 0
+        self.has_new = False  # anything beyond carried-over overlap?
+
+    def add(self, line: str) -> List[str]:
+        # +1 for the newline
+        cost = (len(line) + 3) // 4 + 1 if self.count is None else self.count(line) + 1
+
+        if cost > self.max_tokens:
+            # one enormous line: flush, then hard-split it
+            out = self.flush()
+            step = max(1, len(line) * self.max_tokens // cost)
+            for i in range(0, len(line), step):
+                out += self.add(line[i : i + step])
+            return out
+
+        out = _NOTHING
+        while self.total + cost > self.max_tokens and self.has_new:
+            out = out + self._emit()
+
+        self.lines.append(line)
+        self.costs.append(cost)
+        self.total += cost
+        self.has_new = True
+        return out
+
+    def _emit(self) -> List[str]:
+        # cut at the last blank line past MIN_FILL, else at the end
+        cut = len(self.lines)
+        filled = 0
+        best = None
+        for i, (ln, c) in enumerate(zip(self.lines, self.costs)):
+            filled += c
+            if not ln.strip() and filled >= self.max_tokens * MIN_FILL:
+                best = i + 1
+        if best is not None and best < cut:
+            cut = best
+
+        text = "\n".join(self.lines[:cut]).strip()
+
+        # carry trailing lines of the emitted part as overlap
+        keep = cut
+        carried = 0
+        while keep > 0 and carried + self.costs[keep - 1] <= self.overlap_tokens:
+            keep -= 1
+            carried += self.costs[keep]
+
+        self.has_new = cut < len(self.lines)
+        self.lines = self.lines[keep:]
+        self.costs = self.costs[keep:]
+        self.total = sum(self.costs)
+        return [text] if text else []
+
+    def flush(self) -> List[str]:
+        text = "\n".join(self.lines).strip() if self.has_new else ""
+        self.lines, self.costs, self.total, self.has_new = [], [], 0, False
+        return [text] if text else []
+
+
+def iter_chunks(
+    stream: Iterable[str],
+    max_tokens: int = 800,
+    overlap_tokens: int = 100,
+    count_tokens: Callable[[str], int] = approx_tokens,
+) -> Iterator[Chunk]:
+    """
+    Chunk a markdown text stream, starting a new chunk at every page boundary
+    ("### SOURCE: <url>") and attaching that page's URL and title.
+
+    Within a page, lines are packed up to max_tokens; whole trailing lines
+    worth up to overlap_tokens are repeated at the start of the next chunk.
+    Overlap never crosses a page boundary.
+    """
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    section = _Section(max_tokens, overlap_tokens, count_tokens)
+    source_url = None
+    title = None
+    expect_title = False
+    index = 0
+
+    def emit(texts: List[str]) -> Iterator[Chunk]:
+        nonlocal index
+        for t in texts:
+            yield Chunk(text=t, index=index, source_url=source_url, title=title)
+            index += 1
+
+    add = section.add
+    for lines in iter_line_blocks(stream):
+        for line in lines:
+            m = SOURCE_RE.match(line) if line.startswith("#") else None
+            if m:
+                yield from emit(section.flush())
+                source_url, title, expect_title = m.group(1), None, True
+                continue
+
+            if expect_title:
+                if not line.strip():
+                    continue
+                expect_title = False
+                t = TITLE_RE.match(line)
+                if t:
+                    title = t.group(1)
+                    continue
+
+            done = add(line)
+            if done:
+                yield from emit(done)
+
+    yield from emit(section.flush())
+
+
+def chunk_markdown(text: str, max_tokens: int = 800, overlap_tokens: int = 100) -> List[Chunk]:
+    return list(iter_chunks([text], max_tokens=max_tokens, overlap_tokens=overlap_tokens))
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batches concurrent embedding requests on one event loop.
+
+    The first request opens a window of `window_ms`. Everything that arrives
+    before it closes, or until `max_batch` distinct texts are waiting, goes
+    out as one embed_batch() call, which shares a single adaptive limiter and
+    worker pool. Identical texts are embedded once, including texts already
+    in a batch that is in flight. Titan takes one text per InvokeModel, so
+    the Bedrock calls saved come from deduplication. Batching only cuts
+    per-call scheduling overhead and keeps concurrency bounded under load.
+    """
+
+    def __init__(self, embedder, window_ms: float = 5.0, max_batch: int = 32):
+        self.embedder = embedder
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.requests = 0
+        self.deduped = 0
+        self.batches = 0
+        self.texts = 0
+        self.max_seen = 0
+        self.wait_sec = 0.0
+
+    async def embed(self, text: str) -> List[float]:
+        self.requests += 1
+        fut = self._inflight.get(text) or self._pending.get(text)
+        if fut is not None:
+            self.deduped += 1
+            return await asyncio.shield(fut)
+
+        loop = asyncio.get_running_loop()
+        fut = self._pending[text] = loop.create_future()
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        t0 = time.perf_counter()
+        try:
+            return await asyncio.shield(fut)
+        finally:
+            self.wait_sec += time.perf_counter() - t0
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        self._inflight.update(batch)
+        self.batches += 1
+        self.texts += len(batch)
+        self.max_seen = max(self.max_seen, len(batch))
+        asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: Dict[str, asyncio.Future]) -> None:
+        texts = list(batch)
+        try:
+            vectors = await self.embedder.aembed_batch(texts)
+        except Exception as e:
+            for fut in batch.values():
+                if not fut.done():
+                    fut.set_exception(e)
+        else:
+            for text, vec in zip(texts, vectors):
+                if not batch[text].done():
+                    batch[text].set_result(vec)
+        finally:
+            for text in texts:
+                self._inflight.pop(text, None)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "deduped": self.deduped,
+            "batches": self.batches,
+            "texts_embedded": self.texts,
+            "avg_batch": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "max_batch": self.max_seen,
+            "pending": len(self._pending),
+            "inflight": len(self._inflight),
+            "avg_wait_ms": round(1000 * self.wait_sec / max(1, self.requests - self.deduped), 2),
+        }
@@ -0,0 +1,323 @@
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+from agent_core.aws import get_client
+
+DEFAULT_MODEL_ID = "amazon.titan-embed-text-v2:0"
+
+THROTTLE_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+# retried like throttles, but without cutting concurrency
+TRANSIENT_CODES = {"InternalServerException", "ModelTimeoutException", "InternalFailure"}
+
+
+@dataclass
+class EmbedStats:
+    texts: int = 0
+    calls: int = 0
+    errors: int = 0
+    throttles: int = 0
+    seconds: float = 0.0  # wall time spent inside embed/embed_batch
+    latency_sum: float = 0.0  # per-call Bedrock latency
+    latency_max: float = 0.0
+    min_limit: int = 0
+    cache_hits: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def texts_per_sec(self) -> float:
+        return self.texts / self.seconds if self.seconds else 0.0
+
+    def record_call(self, latency: float, throttled: bool = False, error: bool = False) -> None:
+        with self._lock:
+            self.calls += 1
+            self.throttles += int(throttled)
+            self.errors += int(error)
+            self.latency_sum += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def record_run(self, texts: int, seconds: float, min_limit: int = 0) -> None:
+        with self._lock:
+            self.texts += texts
+            self.seconds += seconds
+            if min_limit:
+                self.min_limit = min(self.min_limit, min_limit) if self.min_limit else min_limit
+
+    def as_dict(self) -> dict:
+        return {
+            "texts": self.texts,
+            "calls": self.calls,
+            "errors": self.errors,
+            "throttles": self.throttles,
+            "seconds": round(self.seconds, 3),
+            "texts_per_sec": round(self.texts_per_sec, 2),
+            "avg_latency_ms": round(1000 * self.latency_sum / self.calls, 1) if self.calls else 0.0,
+            "max_latency_ms": round(1000 * self.latency_max, 1),
+            "min_concurrency": self.min_limit,
+            "cache_hits": self.cache_hits,
+        }
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit: halve on throttling, grow by one after a run of
+    successes. Workers block in acquire() while the limit is saturated.
+    """
+
+    def __init__(self, max_limit: int, increase_every: int = 10):
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self.min_seen = self.max_limit
+        self._in_flight = 0
+        self._ok_streak = 0
+        self._increase_every = increase_every
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, throttled: bool) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                self.limit = max(1, self.limit // 2)
+                self.min_seen = min(self.min_seen, self.limit)
+                self._ok_streak = 0
+            else:
+                self._ok_streak += 1
+                if self._ok_streak >= self._increase_every and self.limit < self.max_limit:
+                    self.limit += 1
+                    self._ok_streak = 0
+            self._cond.notify_all()
+
+
+def is_throttle(exc: Exception) -> bool:
+    code = (getattr(exc, "response", None) or {}).get("Error", {}).get("Code")
+    return code in THROTTLE_CODES
+
+
+def is_transient(exc: Exception) -> bool:
+    """
+    Server errors, timeouts and dropped connections: worth another attempt,
+    but no sign of overload.
+    """
+    resp = getattr(exc, "response", None) or {}
+    if resp.get("Error", {}).get("Code") in TRANSIENT_CODES:
+        return True
+    if (resp.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0) >= 500:
+        return True
+    try:
+        from botocore.exceptions import ConnectionError as BotoConnectionError, HTTPClientError
+    except ImportError:
+        return False
+    return isinstance(exc, (BotoConnectionError, HTTPClientError))
+
+
+# Worker threads for embed_batch, shared by every client in the process; each
+# batch's AdaptiveLimiter still caps its own in-flight calls.
+EMBED_WORKERS = int(os.environ.get("EMBED_WORKERS", "32"))
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=EMBED_WORKERS, thread_name_prefix="embed")
+    return _pool
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, str(default)))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, str(default)))
+
+
+class EmbeddingClient:
+    """
+    Titan text embedding client shared by ingest and the agent.
+
+    The underlying bedrock-runtime client comes from agent_core.aws on first
+    use, with a sized connection pool and explicit timeouts. botocore's own
+    retries are off: this class is the one retry layer, so every throttle
+    reaches the limiter. embed_batch() fans out on a shared worker pool that
+    halves its concurrency on throttling; throttles and transient errors are
+    retried up to `max_retries` times with full-jitter backoff. Results keep
+    input order.
+    Pass `client` to use a preconfigured (or fake) bedrock-runtime client.
+    """
+
+    def __init__(
+        self,
+        model_id: str = DEFAULT_MODEL_ID,
+        client=None,
+        region: Optional[str] = None,
+        max_pool_connections: int = 16,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 20.0,
+        concurrency: int = 8,
+        max_retries: int = 6,
+        backoff_base: float = 0.25,
+        backoff_cap: float = 8.0,
+    ):
+        self.model_id = model_id
+        self.region = region
+        self.max_pool_connections = max_pool_connections
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.stats = EmbedStats()
+        self._client = client
+        self._client_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, model_id: Optional[str] = None, **overrides) -> "EmbeddingClient":
+        """
+        Build from EMBED_* environment variables; keyword overrides win.
+        """
+        kwargs = dict(
+            model_id=model_id or os.environ.get("EMBED_MODEL_ID", DEFAULT_MODEL_ID),
+            max_pool_connections=_env_int("EMBED_POOL_SIZE", 16),
+            connect_timeout=_env_float("EMBED_CONNECT_TIMEOUT_SEC", 3.0),
+            read_timeout=_env_float("EMBED_READ_TIMEOUT_SEC", 20.0),
+            concurrency=_env_int("EMBED_CONCURRENCY", 8),
+            max_retries=_env_int("EMBED_MAX_RETRIES", 6),
+            backoff_base=_env_float("EMBED_BACKOFF_BASE_SEC", 0.25),
+        )
+        kwargs.update(overrides)
+        return cls(**kwargs)
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    # shared (and traced) through agent_core.aws; clients
+                    # with the same settings get the same connection pool
+                    self._client = get_client(
+                        "bedrock-runtime",
+                        self.region or "",
+                        max_pool_connections=self.max_pool_connections,
+                        connect_timeout=self.connect_timeout,
+                        read_timeout=self.read_timeout,
+                        retries={"mode": "standard", "total_max_attempts": 1},
+                        tcp_keepalive=True,
+                    )
+        return self._client
+
+    def _invoke(self, text: str) -> List[float]:
+        resp = self.client.invoke_model(
+            modelId=self.model_id,
+            body=json.dumps({"inputText": text}),
+            contentType="application/json",
+            accept="application/json",
+        )
+        body = json.loads(resp["body"].read())
+        # Force float32 (S3 Vectors expects float32 values)
+        return array("f", body["embedding"]).tolist()
+
+    def _record(self, run: Optional[EmbedStats], latency: float, throttled: bool = False, error: bool = False):
+        self.stats.record_call(latency, throttled, error)
+        if run is not None:
+            run.record_call(latency, throttled, error)
+
+    def _call(self, text: str, limiter: Optional[AdaptiveLimiter], run: Optional[EmbedStats]) -> List[float]:
+        attempt = 0
+        while True:
+            if limiter:
+                limiter.acquire()
+            throttled = False
+            t0 = time.perf_counter()
+            try:
+                vec = self._invoke(text)
+            except Exception as e:
+                throttled = is_throttle(e)
+                fatal = not (throttled or is_transient(e)) or attempt >= self.max_retries
+                self._record(run, time.perf_counter() - t0, throttled, error=fatal)
+                if fatal:
+                    raise
+            else:
+                self._record(run, time.perf_counter() - t0)
+                return vec
+            finally:
+                if limiter:
+                    limiter.release(throttled)
+            time.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt))))
+            attempt += 1
+
+    def embed(self, text: str) -> List[float]:
+        t0 = time.perf_counter()
+        vec = self._call(text, None, None)
+        self.stats.record_run(1, time.perf_counter() - t0)
+        return vec
+
+    def embed_batch(self, texts: Sequence[str], stats: Optional[EmbedStats] = None) -> List[List[float]]:
+        """
+        Embed texts concurrently; vectors come back in input order. `stats`, if
+        given, accumulates this run's counters alongside the client totals.
+        """
+        if not texts:
+            return []
+
+        limiter = AdaptiveLimiter(self.concurrency)
+        results: List[Optional[List[float]]] = [None] * len(texts)
+
+        def work(i: int) -> None:
+            results[i] = self._call(texts[i], limiter, stats)
+
+        t0 = time.perf_counter()
+        pool = _get_pool()
+        # each item in its own context copy, so AWS spans reach the trace
+        futures = [pool.submit(contextvars.copy_context().run, work, i) for i in range(len(texts))]
+        try:
+            for f in futures:
+                f.result()
+        except BaseException:
+            for f in futures:
+                f.cancel()
+            raise
+        elapsed = time.perf_counter() - t0
+        for s in (self.stats, stats):
+            if s is not None:
+                s.record_run(len(texts), elapsed, limiter.min_seen)
+
+        return results  # type: ignore[return-value]
+
+    # run_in_executor doesn't carry contextvars over; copy them so embed
+    # spans stay in the caller's trace
+    async def aembed(self, text: str) -> List[float]:
+        return await _in_executor(self.embed, text)
+
+    async def aembed_batch(self, texts: Sequence[str], stats: Optional[EmbedStats] = None) -> List[List[float]]:
+        return await _in_executor(self.embed_batch, texts, stats)
+
+
+async def _in_executor(fn, *args):
+    # the loop's default executor, not the embed pool: embed_batch blocks on
+    # that pool, and a batch waiting inside it could starve its own items
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(ctx.run, fn, *args))
@@ -0,0 +1,436 @@
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import struct
+import zlib
+from array import array
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# ---------- tokenizer (shared by ingest and query) ----------
+_WORD = re.compile(r"[a-z0-9]+")
+# "CS 6375" / "cs-6375" also index as "cs6375", so either spelling matches
+_COURSE_CODE = re.compile(r"\b([a-z]{2,4})[ \t\-](\d{4})\b")
+_CODE_TOKEN = re.compile(r"[a-z]{2,4}\d{4}")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do for from has have how i in is it me my of on or that the this "
+    "to was what when where which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    text = text.lower()
+    words = [w for w in _WORD.findall(text) if w not in STOPWORDS]
+    return words + [a + b for a, b in _COURSE_CODE.findall(text)]
+
+
+def course_codes(text: str) -> List[str]:
+    """
+    Normalized course codes mentioned in the text ("CS 6375" -> "cs6375").
+    """
+    return sorted({t for t in tokenize(text) if _CODE_TOKEN.fullmatch(t)})
+
+
+# ---------- per-document segments (written by ingest) ----------
+def segment_name(doc_id: str, part: int = 0) -> str:
+    """
+    Ingest writes a document's postings in parts of a bounded number of chunks,
+    so its memory doesn't grow with the document.
+    """
+    return f"{doc_id}.{part:04d}.json.gz"
+
+
+def doc_segment_prefix(doc_id: str) -> str:
+    # also matches the single {doc_id}.json.gz segment older ingests wrote
+    return f"{doc_id}."
+
+
+def segment_entry(key: str, text: str, preview_chars: int = 1000) -> dict:
+    """
+    One chunk's postings: length in tokens, term frequencies and a text preview.
+    """
+    toks = tokenize(text)
+    return {"key": key, "len": len(toks), "tf": dict(Counter(toks)), "text": text[:preview_chars]}
+
+
+def build_segment(doc_id: str, source_key: str, entries: List[dict], part: int = 0) -> bytes:
+    # mtime=0 keeps the bytes (and so the S3 ETag) stable for unchanged content
+    body = {"version": 1, "doc_id": doc_id, "source_key": source_key, "part": part, "chunks": entries}
+    return gzip.compress(json.dumps(body, separators=(",", ":")).encode("utf-8"), mtime=0)
+
+
+def parse_segment(raw: bytes) -> dict:
+    return json.loads(gzip.decompress(raw).decode("utf-8"))
+
+
+# ---------- merged index ----------
+_MAGIC = b"BM25\x01"
+
+
+class LexicalIndex:
+    """
+    BM25 over every chunk in the catalog. Postings are flat arrays (doc ids
+    uint32, term frequencies uint16) addressed by per-term offsets, so the
+    serialized form loads with a JSON header parse and three frombytes calls
+    and only the query's terms are ever touched.
+
+    `etags` is the segment listing the index was built from and `spans` the
+    range of keys each segment contributed, so an update only has to fetch
+    the segments that changed since.
+    """
+
+    def __init__(self, keys: List[str], lengths: Sequence[int], texts: List[str], terms: List[str],
+                 offsets: array, doc_ids: array, tfs: array, etags: Optional[Dict[str, str]] = None,
+                 spans: Optional[Dict[str, Tuple[int, int]]] = None, k1: float = 1.2, b: float = 0.75):
+        self.keys = keys
+        self.lengths = lengths
+        self.texts = texts
+        self.term_ids = {t: i for i, t in enumerate(terms)}
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.etags = etags or {}
+        self.spans = spans or {}
+        self.fingerprint = hashlib.sha1(json.dumps(self.etags, sort_keys=True).encode("utf-8")).hexdigest()
+        self.k1 = k1
+        self.b = b
+        self.avgdl = (sum(lengths) / len(lengths)) if lengths else 0.0
+        self._key_index = {k: i for i, k in enumerate(keys)}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Tuple[str, dict]],
+                      etags: Optional[Dict[str, str]] = None) -> "LexicalIndex":
+        """
+        Merge (segment name, parsed segment) pairs.
+        """
+        keys, lengths, texts, seen, spans = [], [], [], set(), {}
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for name, seg in segments:
+            start = len(keys)
+            for c in seg["chunks"]:
+                if c["key"] in seen:
+                    continue
+                seen.add(c["key"])
+                i = len(keys)
+                keys.append(c["key"])
+                lengths.append(c["len"])
+                texts.append(c["text"])
+                for t, n in c["tf"].items():
+                    postings.setdefault(t, []).append((i, n))
+            spans[name] = (start, len(keys))
+        terms = sorted(postings)
+        offsets, doc_ids, tfs = array("I", [0]), array("I"), array("H")
+        for t in terms:
+            for i, n in postings[t]:
+                doc_ids.append(i)
+                tfs.append(min(n, 65535))
+            offsets.append(len(doc_ids))
+        return cls(keys, lengths, texts, terms, offsets, doc_ids, tfs, etags, spans)
+
+    def segments(self, names: Iterable[str]) -> Dict[str, dict]:
+        """
+        Rebuild the parsed segments `names` from the postings, for merging
+        into a new index without fetching them again.
+        """
+        wanted = {}
+        for name in names:
+            lo, hi = self.spans[name]
+            for d in range(lo, hi):
+                wanted[d] = {}
+        for tid, t in enumerate(self.terms):
+            for j in range(self.offsets[tid], self.offsets[tid + 1]):
+                tf = wanted.get(self.doc_ids[j])
+                if tf is not None:
+                    tf[t] = self.tfs[j]
+        out = {}
+        for name in names:
+            lo, hi = self.spans[name]
+            out[name] = {"chunks": [
+                {"key": self.keys[d], "len": self.lengths[d], "tf": wanted[d], "text": self.texts[d]}
+                for d in range(lo, hi)
+            ]}
+        return out
+
+    def to_bytes(self) -> bytes:
+        header = json.dumps({
+            "keys": self.keys, "lengths": list(self.lengths), "texts": self.texts,
+            "terms": self.terms, "etags": self.etags, "spans": self.spans,
+        }, separators=(",", ":")).encode("utf-8")
+        body = (_MAGIC + struct.pack("<IIII", len(header), len(self.offsets), len(self.doc_ids), len(self.tfs))
+                + header + self.offsets.tobytes() + self.doc_ids.tobytes() + self.tfs.tobytes())
+        return zlib.compress(body, 6)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "LexicalIndex":
+        body = zlib.decompress(raw)
+        if body[:5] != _MAGIC:
+            raise ValueError("not a lexical index snapshot")
+        hlen, n_off, n_ids, n_tfs = struct.unpack_from("<IIII", body, 5)
+        pos = 5 + 16
+        header = json.loads(body[pos : pos + hlen].decode("utf-8"))
+        pos += hlen
+        arrays = []
+        for code, n in (("I", n_off), ("I", n_ids), ("H", n_tfs)):
+            a = array(code)
+            a.frombytes(body[pos : pos + n * a.itemsize])
+            pos += n * a.itemsize
+            arrays.append(a)
+        # snapshots written before spans existed are rebuilt in full once
+        spans = {n: tuple(r) for n, r in header.get("spans", {}).items()}
+        return cls(header["keys"], header["lengths"], header["texts"], header["terms"], *arrays,
+                   etags=header["etags"], spans=spans)
+
+    def text(self, key: str) -> Optional[str]:
+        i = self._key_index.get(key)
+        return None if i is None else self.texts[i]
+
+    def keys_with(self, term: str) -> List[str]:
+        """
+        Keys of every chunk containing the (already tokenized) term.
+        """
+        tid = self.term_ids.get(term)
+        if tid is None:
+            return []
+        return [self.keys[self.doc_ids[j]] for j in range(self.offsets[tid], self.offsets[tid + 1])]
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """
+        (vector key, BM25 score) for the best `top_k` chunks.
+        """
+        n = len(self.keys)
+        if not n:
+            return []
+        scores: Dict[int, float] = {}
+        for t in set(tokenize(query)):
+            tid = self.term_ids.get(t)
+            if tid is None:
+                continue
+            lo, hi = self.offsets[tid], self.offsets[tid + 1]
+            df = hi - lo
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            for j in range(lo, hi):
+                d, tf = self.doc_ids[j], self.tfs[j]
+                norm = self.k1 * (1.0 - self.b + self.b * self.lengths[d] / (self.avgdl or 1.0))
+                scores[d] = scores.get(d, 0.0) + idf * tf * (self.k1 + 1.0) / (tf + norm)
+        best = sorted(scores.items(), key=lambda x: -x[1])[:top_k]
+        return [(self.keys[d], s) for d, s in best]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked key lists: score(key) = sum over lists of 1 / (k + rank).
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda x: -x[1])
+
+
+# ---------- storage ----------
+SNAPSHOT_NAME = "_snapshot.bin"
+
+
+class LocalLexicalStore:
+    """
+    Segments and snapshot as files under a directory; for tests and offline runs.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _seg_dir(self) -> str:
+        return os.path.join(self.path, "segments")
+
+    def list_segments(self, prefix: str = "") -> Dict[str, str]:
+        try:
+            names = os.listdir(self._seg_dir())
+        except FileNotFoundError:
+            return {}
+        out = {}
+        for n in names:
+            if not n.startswith(prefix) or n.endswith(".tmp"):
+                continue
+            out[n] = self._etag(os.path.join(self._seg_dir(), n))
+        return out
+
+    def get_segment(self, name: str) -> bytes:
+        with open(os.path.join(self._seg_dir(), name), "rb") as f:
+            return f.read()
+
+    def put_segment(self, name: str, raw: bytes) -> None:
+        os.makedirs(self._seg_dir(), exist_ok=True)
+        self._write(os.path.join(self._seg_dir(), name), raw)
+
+    def delete_segment(self, name: str) -> None:
+        try:
+            os.remove(os.path.join(self._seg_dir(), name))
+        except FileNotFoundError:
+            pass
+
+    def get_snapshot(self) -> Tuple[Optional[bytes], Optional[str]]:
+        path = os.path.join(self.path, SNAPSHOT_NAME)
+        try:
+            with open(path, "rb") as f:
+                return f.read(), self._etag(path)
+        except FileNotFoundError:
+            return None, None
+
+    def put_snapshot(self, raw: bytes, if_match: Optional[str] = None) -> bool:
+        # the check and the replace aren't atomic; good enough offline
+        path = os.path.join(self.path, SNAPSHOT_NAME)
+        if self._etag(path) != if_match:
+            return False
+        os.makedirs(self.path, exist_ok=True)
+        self._write(path, raw)
+        return True
+
+    @staticmethod
+    def _etag(path: str) -> Optional[str]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return f"{st.st_mtime_ns}-{st.st_size}"
+
+    @staticmethod
+    def _write(path: str, raw: bytes) -> None:
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(raw)
+        os.replace(tmp, path)
+
+
+class S3LexicalStore:
+    """
+    {prefix}segments/{doc_id}.{part}.json.gz per document plus {prefix}_snapshot.bin.
+    """
+
+    def __init__(self, s3_client, bucket: str, prefix: str = "lexical/"):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def list_segments(self, prefix: str = "") -> Dict[str, str]:
+        out, token = {}, None
+        seg_prefix = f"{self.prefix}segments/"
+        while True:
+            kwargs = {"Bucket": self.bucket, "Prefix": seg_prefix + prefix}
+            if token:
+                kwargs["ContinuationToken"] = token
+            resp = self.s3.list_objects_v2(**kwargs)
+            for obj in resp.get("Contents", []):
+                out[obj["Key"][len(seg_prefix):]] = obj["ETag"].strip('"')
+            if not resp.get("IsTruncated"):
+                return out
+            token = resp.get("NextContinuationToken")
+
+    def get_segment(self, name: str) -> bytes:
+        return self.s3.get_object(Bucket=self.bucket, Key=f"{self.prefix}segments/{name}")["Body"].read()
+
+    def put_segment(self, name: str, raw: bytes) -> None:
+        self.s3.put_object(Bucket=self.bucket, Key=f"{self.prefix}segments/{name}", Body=raw,
+                           ContentType="application/json", ContentEncoding="gzip")
+
+    def delete_segment(self, name: str) -> None:
+        self.s3.delete_object(Bucket=self.bucket, Key=f"{self.prefix}segments/{name}")
+
+    def get_snapshot(self) -> Tuple[Optional[bytes], Optional[str]]:
+        try:
+            resp = self.s3.get_object(Bucket=self.bucket, Key=f"{self.prefix}{SNAPSHOT_NAME}")
+            return resp["Body"].read(), resp.get("ETag")
+        except Exception as e:
+            code = (getattr(e, "response", None) or {}).get("Error", {}).get("Code")
+            if code not in ("NoSuchKey", "404"):
+                print("WARN: lexical snapshot load failed:", str(e))
+            return None, None
+
+    def put_snapshot(self, raw: bytes, if_match: Optional[str] = None) -> bool:
+        """
+        Conditional write: replaces the snapshot only if it still has the ETag
+        `if_match` (or, with None, only if there is none yet). False if another
+        writer got there first.
+        """
+        cond = {"IfMatch": if_match} if if_match else {"IfNoneMatch": "*"}
+        try:
+            self.s3.put_object(Bucket=self.bucket, Key=f"{self.prefix}{SNAPSHOT_NAME}", Body=raw,
+                               ContentType="application/octet-stream", **cond)
+            return True
+        except Exception as e:
+            code = (getattr(e, "response", None) or {}).get("Error", {}).get("Code")
+            if code in ("PreconditionFailed", "ConditionalRequestConflict", "412", "409"):
+                return False
+            raise
+
+
+def make_lexical_store(backend: str, s3_client=None, bucket: str = "", prefix: str = "lexical/",
+                       path: str = "/tmp/lexical"):
+    backend = (backend or "none").lower()
+    if backend == "s3" and bucket:
+        return S3LexicalStore(s3_client, bucket, prefix)
+    if backend == "local":
+        return LocalLexicalStore(path)
+    return None
+
+
+def read_lexical_snapshot(store) -> Optional[LexicalIndex]:
+    """
+    The last merged index written, whatever segments it was built from; one
+    GET. None if there is none yet.
+    """
+    return _decode_snapshot(store.get_snapshot()[0])
+
+
+def _decode_snapshot(raw: Optional[bytes]) -> Optional[LexicalIndex]:
+    if not raw:
+        return None
+    try:
+        return LexicalIndex.from_bytes(raw)
+    except Exception as e:
+        print("WARN: lexical snapshot unreadable:", str(e))
+        return None
+
+
+def load_lexical_index(store, current: Optional[LexicalIndex] = None, write_back: bool = False,
+                       concurrency: int = 16) -> LexicalIndex:
+    """
+    Bring the merged index up to date with the segments listed now: `current`
+    (or the stored snapshot) as is if it was built from exactly this listing,
+    otherwise merged again with only the new and changed segments fetched.
+
+    Readers leave the snapshot alone. Its one writer passes write_back=True,
+    which stores a changed index only if the snapshot is still the one the
+    merge started from.
+    """
+    etag = None
+    if current is None:
+        raw, etag = store.get_snapshot()
+        current = _decode_snapshot(raw)
+    elif write_back:
+        raise ValueError("write_back merges from the stored snapshot; don't pass current")
+    listing = store.list_segments()
+    if current is not None and current.etags == listing:
+        return current
+
+    names = sorted(listing)
+    reuse = [n for n in names if current is not None and n in current.spans and current.etags.get(n) == listing[n]]
+    segments = current.segments(reuse) if reuse else {}
+    fetch = [n for n in names if n not in segments]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        segments.update(zip(fetch, pool.map(lambda n: parse_segment(store.get_segment(n)), fetch)))
+    index = LexicalIndex.from_segments(((n, segments[n]) for n in names), etags=listing)
+    if write_back:
+        try:
+            if not store.put_snapshot(index.to_bytes(), if_match=etag):
+                print("WARN: lexical snapshot replaced during the merge; keeping the other write")
+        except Exception as e:
+            print("WARN: lexical snapshot save failed:", str(e))
+    return index
@@ -0,0 +1,343 @@
+"""
+Request tracing for the agent: timed spans per request, an in-process
+histogram registry, and one CloudWatch Embedded Metric Format (EMF) log line
+per request, which CloudWatch turns into metrics without any API calls.
+
+    with tracing.start("chat") as trace:        # one per request
+        with tracing.span("step", "embed") as s:
+            ...
+            s.set(bytes_out=123)
+    trace.breakdown()                           # timing for a debug response
+
+The current trace lives in a contextvar, so asyncio tasks (graph branches)
+see it. Pool threads see it only when the work is submitted through
+contextvars.copy_context().run, as rag's in_aws_pool does. Spans recorded
+with no trace still feed the registry.
+
+Span kinds: "node" (graph node), "step" (a phase inside a node: embed, vector
+query, chunk fetch, synthesis), "tool" (search API call, cache included),
+"http" and "aws" (single HTTP / AWS API calls).
+"""
+import contextvars
+import functools
+import inspect
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+TRACE_EMF = os.environ.get("TRACE_EMF", "1") != "0"
+TRACE_NAMESPACE = os.environ.get("TRACE_NAMESPACE", "UTDCareerAgent")
+TRACE_SERVICE = os.environ.get("TRACE_SERVICE", "agent")
+TRACE_MAX_SPANS = int(os.environ.get("TRACE_MAX_SPANS", "200"))
+
+# span attributes that are also observed as histograms / summed into EMF
+NUMERIC_ATTRS = {
+    "bytes_in": "Bytes",
+    "bytes_out": "Bytes",
+    "input_tokens": "Count",
+    "output_tokens": "Count",
+}
+
+_current: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("agent_trace", default=None)
+
+
+class Histogram:
+    """
+    Log-bucketed histogram: bucket i holds values in (1.1^(i-1), 1.1^i], so
+    quantiles are within 10% and memory stays flat however many values are
+    observed.
+    """
+
+    GROWTH = 1.1
+    _LOG = math.log(GROWTH)
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        i = math.ceil(math.log(max(value, 1e-3)) / self._LOG)
+        self.buckets[i] = self.buckets.get(i, 0) + 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for i in sorted(self.buckets):
+            seen += self.buckets[i]
+            if seen >= target:
+                return min(self.GROWTH ** i, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 2) if self.count else 0.0,
+            "p50": round(self.quantile(0.50), 2),
+            "p95": round(self.quantile(0.95), 2),
+            "p99": round(self.quantile(0.99), 2),
+            "max": round(self.max, 2),
+        }
+
+
+class Registry:
+    """
+    Process-wide histograms and counters, keyed by metric name.
+    """
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            h = self._histograms.get(name)
+            if h is None:
+                h = self._histograms[name] = Histogram()
+            h.observe(value)
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "histograms": {k: h.summary() for k, h in sorted(self._histograms.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+registry = Registry()
+
+
+class Span:
+    __slots__ = ("kind", "name", "start", "ms", "attrs")
+
+    def __init__(self, kind: str, name: str, attrs: dict):
+        self.kind = kind
+        self.name = name
+        self.start = time.perf_counter()
+        self.ms = 0.0
+        self.attrs = attrs
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+
+class Trace:
+    def __init__(self, name: str = "request"):
+        self.name = name
+        self.id = uuid.uuid4().hex[:16]
+        self.wall = time.time()
+        self.t0 = time.perf_counter()
+        self.total_ms: Optional[float] = None
+        self.spans: list = []
+        self.caches: Dict[str, Dict[str, int]] = {}
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def add(self, s: Span) -> None:
+        with self._lock:
+            if self.total_ms is not None:
+                return  # e.g. a background cache refresh outliving the request
+            if len(self.spans) < TRACE_MAX_SPANS:
+                self.spans.append(s)
+            else:
+                self.dropped += 1
+
+    def cache_event(self, cache: str, outcome: str) -> None:
+        with self._lock:
+            counts = self.caches.setdefault(cache, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def breakdown(self) -> dict:
+        """
+        JSON-able timing for one request: total, per-node times, cache
+        outcomes and every span in start order (offsets from request start).
+        """
+        total = self.total_ms if self.total_ms is not None else 1000 * (time.perf_counter() - self.t0)
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+            caches = {k: dict(v) for k, v in self.caches.items()}
+        return {
+            "trace_id": self.id,
+            "total_ms": round(total, 1),
+            "nodes": {s.name: round(s.ms, 1) for s in spans if s.kind == "node"},
+            "caches": caches,
+            "spans": [
+                {"kind": s.kind, "name": s.name, "start_ms": round(1000 * (s.start - self.t0), 1),
+                 "ms": round(s.ms, 1), **s.attrs}
+                for s in spans
+            ],
+        }
+
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def start(name: str = "request", trace: Optional[Trace] = None):
+    """
+    Make a trace current for the block; on exit record its total and emit the
+    EMF line. Pass `trace` to keep a handle for breakdown().
+    """
+    trace = trace or Trace(name)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass  # generator closed from another context
+        finish(trace)
+
+
+def finish(trace: Trace) -> None:
+    with trace._lock:
+        if trace.total_ms is not None:
+            return
+        trace.total_ms = 1000 * (time.perf_counter() - trace.t0)
+    registry.observe(f"request.{trace.name}.ms", trace.total_ms)
+    if TRACE_EMF:
+        print(json.dumps(emf(trace), default=str))
+
+
+def record(s: Span) -> None:
+    key = f"{s.kind}.{s.name}"
+    registry.observe(key + ".ms", s.ms)
+    for attr in NUMERIC_ATTRS:
+        value = s.attrs.get(attr)
+        if isinstance(value, (int, float)):
+            registry.observe(f"{key}.{attr}", value)
+    if "error" in s.attrs:
+        registry.incr(key + ".errors")
+    trace = _current.get()
+    if trace is not None:
+        trace.add(s)
+
+
+@contextmanager
+def span(kind: str, name: str, **attrs):
+    s = Span(kind, name, attrs)
+    try:
+        yield s
+    except BaseException as e:
+        # CancelledError here usually means a branch deadline fired
+        s.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        s.ms = 1000 * (time.perf_counter() - s.start)
+        record(s)
+
+
+def add_span(kind: str, name: str, start: float, **attrs) -> None:
+    """
+    Record a span that was timed elsewhere (start is a perf_counter value).
+    """
+    s = Span(kind, name, attrs)
+    s.start = start
+    s.ms = 1000 * (time.perf_counter() - start)
+    record(s)
+
+
+def traced(kind: str, name: str):
+    """
+    Decorator: run the function (sync or async) inside span(kind, name).
+    """
+    def wrap(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                with span(kind, name):
+                    return await fn(*args, **kwargs)
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(kind, name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return wrap
+
+
+def cache_event(cache: str, outcome: str) -> None:
+    """
+    A lookup in a named cache: hit / miss / stale / coalesced / shared_hit.
+    """
+    registry.incr(f"cache.{cache}.{outcome}")
+    trace = _current.get()
+    if trace is not None:
+        trace.cache_event(cache, outcome)
+
+
+def emf(trace: Trace) -> dict:
+    """
+    The trace as one EMF document: per-request metrics under the service and
+    route dimensions, plus the spans as plain properties for Logs Insights.
+    """
+    values: Dict[str, list] = {"request.ms": [round(trace.total_ms or 0.0, 2)]}
+    units = {"request.ms": "Milliseconds"}
+    sums: Dict[str, float] = {}
+    with trace._lock:
+        spans = list(trace.spans)
+        caches = {k: dict(v) for k, v in trace.caches.items()}
+
+    for s in spans:
+        if s.kind in ("node", "step", "tool"):
+            name = f"{s.kind}.{s.name}.ms"
+            values.setdefault(name, []).append(round(s.ms, 2))
+            units[name] = "Milliseconds"
+        for attr, unit in NUMERIC_ATTRS.items():
+            value = s.attrs.get(attr)
+            if isinstance(value, (int, float)):
+                name = f"{s.kind}.{s.name}.{attr}"
+                sums[name] = sums.get(name, 0) + value
+                units[name] = unit
+    for name, total in sums.items():
+        values[name] = [total]
+    for cache, counts in caches.items():
+        for outcome, n in counts.items():
+            name = f"cache.{cache}.{outcome}"
+            values[name] = [n]
+            units[name] = "Count"
+
+    # EMF allows 100 metrics per document and 100 values per metric
+    names = sorted(values)[:100]
+    doc = {
+        "_aws": {
+            "Timestamp": int(trace.wall * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": TRACE_NAMESPACE,
+                "Dimensions": [["service", "route"]],
+                "Metrics": [{"Name": n, "Unit": units[n]} for n in names],
+            }],
+        },
+        "service": TRACE_SERVICE,
+        "route": trace.name,
+        "trace_id": trace.id,
+        "spans": [{"kind": s.kind, "name": s.name, "ms": round(s.ms, 1), **s.attrs} for s in spans],
+    }
+    for n in names:
+        v = values[n][:100]
+        doc[n] = v[0] if len(v) == 1 else v
+    return doc
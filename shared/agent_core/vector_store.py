@@ -0,0 +1,419 @@
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from agent_core.aws import get_client
+
+# Vectors go in and hits come out in S3 Vectors' shapes, so callers don't care
+# which backend they talk to:
+#   put:   [{"key": str, "data": {"float32": [...]}, "metadata": {...}}, ...]
+#   query: [{"key": str, "distance": float, "metadata": {...}}, ...]  (cosine distance)
+
+
+class S3VectorsStore:
+    """
+    Amazon S3 Vectors index, addressed by ARN or by vector bucket + index
+    name. The client comes from agent_core.aws on first use (shared and
+    traced); pass `client` to inject one.
+    """
+
+    def __init__(self, client=None, index_arn: Optional[str] = None, vector_bucket: Optional[str] = None,
+                 index_name: Optional[str] = None, region: Optional[str] = None):
+        if not index_arn and not (vector_bucket and index_name):
+            raise ValueError("S3VectorsStore needs index_arn or vector_bucket + index_name")
+        self.index_arn = index_arn
+        self.vector_bucket = vector_bucket
+        self.index_name = index_name
+        self.region = region
+        self._client = client
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = get_client("s3vectors", self.region or "")
+        return self._client
+
+    def _index(self) -> dict:
+        if self.index_arn:
+            return {"indexArn": self.index_arn}
+        return {"vectorBucketName": self.vector_bucket, "indexName": self.index_name}
+
+    def put(self, vectors: Sequence[dict]) -> None:
+        self.client.put_vectors(**self._index(), vectors=list(vectors))
+
+    def delete(self, keys: Iterable[str]) -> None:
+        self.client.delete_vectors(**self._index(), keys=list(keys))
+
+    def query(self, vector: Sequence[float], top_k: int = 5, return_metadata: bool = True) -> List[dict]:
+        resp = self.client.query_vectors(
+            **self._index(),
+            topK=top_k,
+            queryVector={"float32": [float(x) for x in vector]},
+            returnMetadata=return_metadata,
+            returnDistance=True,
+        )
+        return [
+            {"key": v.get("key"), "distance": v.get("distance"),
+             "metadata": v.get("metadata") or v.get("Metadata") or {}}
+            for v in resp.get("vectors", [])
+        ]
+
+    def query_batch(self, vectors: Sequence[Sequence[float]], top_k: int = 5) -> List[List[dict]]:
+        # no batch query API
+        return [self.query(v, top_k) for v in vectors]
+
+
+class LocalVectorStore:
+    """
+    On-disk cosine index for offline runs and load tests (requires numpy).
+
+    Layout under `path`:
+      vectors.f32         unit-normalised float32 rows, memory-mapped
+      meta.json           dim, row count, key and metadata per row (None = free row)
+      vectors.i8          optional int8 copy (quantize()) with per-row scales.npy
+      ivf_centroids.npy   optional IVF coarse quantiser (build_ivf()) with ivf_assign.npy
+
+    Search is batched brute force over the memmap. With IVF it scores only
+    the `nprobe` closest lists. With use_quantized and the int8 copy it scores
+    approximately and re-ranks the best `rerank * top_k` rows exactly; that
+    touches 4x fewer bytes, which pays off once the index outgrows the page
+    cache, but numpy has no int8 GEMM so it is slower when everything is
+    resident. Both derived structures are kept up to date by put(). Readers
+    reopen the files when meta.json changes, so an agent can query while
+    ingest writes.
+    """
+
+    BLOCK = 65536
+
+    def __init__(self, path: str, read_only: bool = False, nprobe: int = 8, use_quantized: bool = False,
+                 rerank: int = 4):
+        import numpy as np
+
+        self.np = np
+        self.path = path
+        self.read_only = read_only
+        self.nprobe = nprobe
+        self.use_quantized = use_quantized
+        self.rerank = rerank
+        self._lock = threading.RLock()
+        self._meta_mtime = None
+        if not read_only:
+            os.makedirs(path, exist_ok=True)
+        self._load()
+
+    # ---------- files ----------
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self) -> None:
+        np = self.np
+        try:
+            with open(self._file("meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            self._meta_mtime = os.stat(self._file("meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            meta = {"dim": None, "keys": [], "metadata": []}
+        self.dim = meta["dim"]
+        self.keys: List[Optional[str]] = meta["keys"]
+        self.metadata: List[Optional[dict]] = meta["metadata"]
+        self.rows: Dict[str, int] = {k: i for i, k in enumerate(self.keys) if k is not None}
+        self._free = [i for i, k in enumerate(self.keys) if k is None]
+        self.vectors = self._open_matrix("vectors.f32", np.float32)
+        self.qvectors = self._open_matrix("vectors.i8", np.int8) if os.path.exists(self._file("vectors.i8")) else None
+        self.scales = self._load_npy("scales.npy")
+        self.centroids = self._load_npy("ivf_centroids.npy")
+        self.assign = self._load_npy("ivf_assign.npy")
+        self._lists = None
+        self._live = None
+
+    def _load_npy(self, name: str):
+        try:
+            return self.np.load(self._file(name))
+        except FileNotFoundError:
+            return None
+
+    def _save_npy(self, name: str, arr) -> None:
+        tmp = self._file(name + ".tmp.npy")
+        self.np.save(tmp, arr)
+        os.replace(tmp, self._file(name))
+
+    def _open_matrix(self, name: str, dtype, rows: Optional[int] = None):
+        np = self.np
+        fname = self._file(name)
+        if not self.dim or (not os.path.exists(fname) and rows is None):
+            return None
+        itemsize = np.dtype(dtype).itemsize
+        if rows is not None:
+            with open(fname, "ab") as f:
+                f.truncate(rows * self.dim * itemsize)
+        n = os.path.getsize(fname) // (self.dim * itemsize)
+        if n == 0:
+            return None
+        return np.memmap(fname, dtype=dtype, mode="r" if self.read_only else "r+", shape=(n, self.dim))
+
+    def _save_meta(self) -> None:
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "dim": self.dim, "keys": self.keys, "metadata": self.metadata}, f)
+        os.replace(tmp, self._file("meta.json"))
+        self._meta_mtime = os.stat(self._file("meta.json")).st_mtime_ns
+
+    def _maybe_reload(self) -> None:
+        try:
+            mtime = os.stat(self._file("meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._meta_mtime:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    # ---------- writes ----------
+    def _normalize(self, x):
+        np = self.np
+        x = np.asarray(x, dtype=np.float32)
+        norms = np.linalg.norm(x, axis=-1, keepdims=True)
+        return x / np.where(norms == 0, 1, norms)
+
+    def _quantize_rows(self, x):
+        np = self.np
+        scales = np.abs(x).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(x / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def _ensure_capacity(self, rows: int) -> None:
+        cap = 0 if self.vectors is None else self.vectors.shape[0]
+        if rows <= cap:
+            return
+        new_cap = max(rows, cap * 2, 1024)
+        self.vectors = self._open_matrix("vectors.f32", self.np.float32, new_cap)
+        if self.qvectors is not None:
+            self.qvectors = self._open_matrix("vectors.i8", self.np.int8, new_cap)
+            self.scales = self.np.resize(self.scales, new_cap)
+        if self.assign is not None:
+            self.assign = self.np.resize(self.assign, new_cap)
+
+    def put(self, vectors: Sequence[dict]) -> None:
+        if self.read_only:
+            raise RuntimeError("LocalVectorStore opened read-only")
+        vectors = list(vectors)
+        if not vectors:
+            return
+        np = self.np
+        with self._lock:
+            data = self._normalize([v["data"]["float32"] for v in vectors])
+            if self.dim is None:
+                self.dim = int(data.shape[1])
+            elif data.shape[1] != self.dim:
+                raise ValueError(f"vector dim {data.shape[1]} != index dim {self.dim}")
+
+            idx = []
+            for v in vectors:
+                row = self.rows.get(v["key"])
+                if row is None:
+                    row = self._free.pop() if self._free else len(self.keys)
+                    if row == len(self.keys):
+                        self.keys.append(None)
+                        self.metadata.append(None)
+                    self.rows[v["key"]] = row
+                self.keys[row] = v["key"]
+                self.metadata[row] = v.get("metadata") or {}
+                idx.append(row)
+
+            idx = np.asarray(idx)
+            self._ensure_capacity(len(self.keys))
+            self.vectors[idx] = data
+            self.vectors.flush()
+            if self.qvectors is not None:
+                self.qvectors[idx], self.scales[idx] = self._quantize_rows(data)
+                self.qvectors.flush()
+                self._save_npy("scales.npy", self.scales)
+            if self.centroids is not None:
+                self.assign[idx] = np.argmax(data @ self.centroids.T, axis=1)
+                self._save_npy("ivf_assign.npy", self.assign)
+            self._lists = self._live = None
+            self._save_meta()
+
+    def delete(self, keys: Iterable[str]) -> None:
+        if self.read_only:
+            raise RuntimeError("LocalVectorStore opened read-only")
+        with self._lock:
+            for k in keys:
+                row = self.rows.pop(k, None)
+                if row is not None:
+                    self.keys[row] = None
+                    self.metadata[row] = None
+                    self._free.append(row)
+            self._lists = self._live = None
+            self._save_meta()
+
+    # ---------- derived indexes ----------
+    def quantize(self) -> None:
+        """
+        Build the int8 copy (4x smaller scans) used for approximate scoring.
+        """
+        with self._lock:
+            n = len(self.keys)
+            if not n:
+                return
+            cap = self.vectors.shape[0]
+            self.qvectors = self._open_matrix("vectors.i8", self.np.int8, cap)
+            self.scales = self.np.ones(cap, dtype=self.np.float32)
+            for s in range(0, n, self.BLOCK):
+                e = min(n, s + self.BLOCK)
+                self.qvectors[s:e], self.scales[s:e] = self._quantize_rows(self.np.asarray(self.vectors[s:e]))
+            self.qvectors.flush()
+            self._save_npy("scales.npy", self.scales)
+            self._save_meta()
+
+    def build_ivf(self, nlist: int, iters: int = 10, sample: int = 50000, seed: int = 0) -> None:
+        """
+        Spherical k-means over (a sample of) the live rows; every row is then
+        assigned to its nearest centroid.
+        """
+        np = self.np
+        with self._lock:
+            live = np.asarray(sorted(self.rows.values()))
+            if len(live) < nlist:
+                raise ValueError(f"need at least {nlist} vectors to build {nlist} lists")
+            rng = np.random.default_rng(seed)
+            train = np.asarray(self.vectors[np.sort(rng.choice(live, min(sample, len(live)), replace=False))])
+            cents = train[rng.choice(len(train), nlist, replace=False)].copy()
+            for _ in range(iters):
+                a = np.argmax(train @ cents.T, axis=1)
+                sums = np.zeros_like(cents)
+                np.add.at(sums, a, train)
+                counts = np.bincount(a, minlength=nlist)
+                nonempty = counts > 0
+                cents[nonempty] = self._normalize(sums[nonempty])
+            n = len(self.keys)
+            assign = np.zeros(self.vectors.shape[0], dtype=np.int32)
+            for s in range(0, n, self.BLOCK):
+                e = min(n, s + self.BLOCK)
+                assign[s:e] = np.argmax(self.vectors[s:e] @ cents.T, axis=1)
+            self.centroids, self.assign, self._lists = cents, assign, None
+            self._save_npy("ivf_centroids.npy", cents)
+            self._save_npy("ivf_assign.npy", assign)
+            self._save_meta()
+
+    def _live_rows(self):
+        if self._live is None:
+            self._live = self.np.asarray(sorted(self.rows.values()), dtype=self.np.int64)
+        return self._live
+
+    def _ivf_lists(self):
+        if self._lists is None:
+            np = self.np
+            live = self._live_rows()
+            order = live[np.argsort(self.assign[live], kind="stable")]
+            bounds = np.searchsorted(self.assign[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[i] : bounds[i + 1]] for i in range(len(self.centroids))]
+        return self._lists
+
+    # ---------- queries ----------
+    def _approx(self) -> bool:
+        return self.use_quantized and self.qvectors is not None
+
+    def _scores(self, rows, Q):
+        """
+        (len(rows), len(Q)) scores for a row index array or slice: int8
+        approximations when quantized, else exact.
+        """
+        np = self.np
+        if self._approx():
+            return (self.qvectors[rows].astype(np.float32) @ Q.T) * self.scales[rows][:, None]
+        return np.asarray(self.vectors[rows]) @ Q.T
+
+    def _topk(self, rows, scores, k: int):
+        np = self.np
+        if len(rows) > k:
+            part = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[part], scores[part]
+        order = np.argsort(-scores, kind="stable")
+        return rows[order], scores[order]
+
+    def _finish(self, rows, scores, q, k: int, return_metadata: bool) -> List[dict]:
+        valid = scores > -self.np.inf
+        rows, scores = rows[valid], scores[valid]
+        if self._approx():
+            # exact re-rank of the approximate candidates
+            scores = self.np.asarray(self.vectors[rows]) @ q
+        rows, scores = self._topk(rows, scores, k)
+        out = []
+        for r, s in zip(rows.tolist(), scores.tolist()):
+            hit = {"key": self.keys[r], "distance": 1.0 - s}
+            if return_metadata:
+                hit["metadata"] = self.metadata[r]
+            out.append(hit)
+        return out
+
+    def query(self, vector: Sequence[float], top_k: int = 5, return_metadata: bool = True) -> List[dict]:
+        return self.query_batch([vector], top_k, return_metadata)[0]
+
+    def query_batch(self, vectors: Sequence[Sequence[float]], top_k: int = 5,
+                    return_metadata: bool = True) -> List[List[dict]]:
+        np = self.np
+        with self._lock:
+            self._maybe_reload()
+            if not self.rows:
+                return [[] for _ in vectors]
+            Q = self._normalize(vectors).reshape(len(vectors), -1)
+            # candidates carried to the exact re-rank when scoring approximately
+            keep = top_k * self.rerank if self._approx() else top_k
+
+            if self.centroids is not None and self.nprobe < len(self.centroids):
+                lists = self._ivf_lists()
+                probes = np.argsort(-(Q @ self.centroids.T), axis=1)[:, : self.nprobe]
+                results = []
+                for q, probe in zip(Q, probes):
+                    rows = np.concatenate([lists[p] for p in probe])
+                    rows, scores = self._topk(rows, self._scores(rows, q[None, :])[:, 0], keep)
+                    results.append(self._finish(rows, scores, q, top_k, return_metadata))
+                return results
+
+            # batched brute force: one matmul per block for all queries
+            # contiguous slices (no gather copy); free rows are masked out
+            n = len(self.keys)
+            dead = np.ones(n, dtype=bool)
+            dead[self._live_rows()] = False
+            best = [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)) for _ in range(len(Q))]
+            for s in range(0, n, self.BLOCK):
+                e = min(n, s + self.BLOCK)
+                block_rows = np.arange(s, e)
+                S = self._scores(slice(s, e), Q)
+                S[dead[s:e]] = -np.inf
+                for j in range(len(Q)):
+                    best[j] = self._topk(np.concatenate([best[j][0], block_rows]),
+                                         np.concatenate([best[j][1], S[:, j]]), keep)
+            return [self._finish(rows, scores, q, top_k, return_metadata) for (rows, scores), q in zip(best, Q)]
+
+
+def vector_store_from_env(read_only: bool = False, **overrides):
+    """
+    VECTOR_STORE_BACKEND=s3vectors (default; S3V_INDEX_ARN or VECTOR_BUCKET_NAME
+    + VECTOR_INDEX_NAME) or local (LOCAL_VECTOR_PATH, LOCAL_VECTOR_NPROBE,
+    LOCAL_VECTOR_QUANTIZED). `read_only` applies to the local store, for
+    query-only callers. Keyword overrides win.
+    """
+    backend = os.environ.get("VECTOR_STORE_BACKEND", "s3vectors").lower()
+    if backend == "local":
+        kwargs = dict(
+            path=os.environ.get("LOCAL_VECTOR_PATH", "/tmp/vector-index"),
+            read_only=read_only,
+            nprobe=int(os.environ.get("LOCAL_VECTOR_NPROBE", "8")),
+            use_quantized=os.environ.get("LOCAL_VECTOR_QUANTIZED", "0") == "1",
+        )
+        kwargs.update(overrides)
+        return LocalVectorStore(**kwargs)
+    kwargs = dict(
+        index_arn=os.environ.get("S3V_INDEX_ARN") or None,
+        vector_bucket=os.environ.get("VECTOR_BUCKET_NAME") or None,
+        index_name=os.environ.get("VECTOR_INDEX_NAME") or None,
+    )
+    kwargs.update(overrides)
+    return S3VectorsStore(**kwargs)
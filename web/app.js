@@ -0,0 +1,85 @@
+// Streaming client for the agent's server-sent events.
+//
+// The agent emits: event "context" (once), "token" ({text}) per delta, then
+// "done" or "error". The same framing comes back whether the endpoint truly
+// streams (Function URL + Lambda Web Adapter) or API Gateway buffers it.
+
+// ✅ Set to the streaming Function URL (bare, or already ending in
+// /chat/stream) to get token-by-token output; leave empty to keep using API
+// Gateway (the answer then arrives in one piece).
+const STREAM_URL = "";
+
+function streamEndpoint(url) {
+  // stream_server.py only answers /chat and /chat/stream
+  const base = url.replace(/\/+$/, "");
+  return base.endsWith("/chat/stream") ? base : base + "/chat/stream";
+}
+
+function parseSSE(buffer, onEvent) {
+  // Returns whatever trailing partial event is left in the buffer.
+  const parts = buffer.split(/\r?\n\r?\n/);
+  const rest = parts.pop();
+  for (const block of parts) {
+    let name = "message";
+    const data = [];
+    for (const line of block.split(/\r?\n/)) {
+      if (line.startsWith("event:")) name = line.slice(6).trim();
+      else if (line.startsWith("data:")) data.push(line.slice(5).trimStart());
+    }
+    if (!data.length) continue;
+    let payload;
+    try { payload = JSON.parse(data.join("\n")); } catch { payload = { text: data.join("\n") }; }
+    onEvent(name, payload);
+  }
+  return rest;
+}
+
+async function streamChat(url, question, onToken) {
+  const resp = await fetch(streamEndpoint(url), {
+    method: "POST",
+    headers: { "Content-Type": "application/json", "Accept": "text/event-stream" },
+    body: JSON.stringify({ question, stream: true })
+  });
+
+  if (!resp.ok) {
+    const raw = await resp.text();
+    throw new Error(raw || ("HTTP " + resp.status));
+  }
+
+  let answer = "";
+  let failure = null;
+  const onEvent = (name, data) => {
+    if (name === "token" && data.text) {
+      answer += data.text;
+      onToken(answer);
+    } else if (name === "error") {
+      failure = data.message || "stream error";
+    }
+  };
+
+  const ctype = resp.headers.get("content-type") || "";
+  if (!ctype.includes("text/event-stream") || !resp.body) {
+    // Buffered: API Gateway may wrap the Lambda result as {statusCode, body}.
+    const raw = await resp.text();
+    let text = raw;
+    try {
+      const outer = JSON.parse(raw);
+      if (typeof outer.body === "string") text = outer.body;
+      else if (outer.answer) { onToken(outer.answer); return outer.answer; }
+    } catch { /* raw SSE */ }
+    parseSSE(text + "\n\n", onEvent);
+  } else {
+    const reader = resp.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer = parseSSE(buffer + decoder.decode(value, { stream: true }), onEvent);
+    }
+    parseSSE(buffer + decoder.decode() + "\n\n", onEvent);
+  }
+
+  if (failure) throw new Error(failure);
+  return answer;
+}